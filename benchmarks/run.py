@@ -0,0 +1,265 @@
+"""Benchmark the parse, group, analyze and export stages on a synthetic feed.
+
+Usage:
+    python -m benchmarks.run --vessels 2000 --messages-per-vessel 500 --output results.json
+    python -m benchmarks.run --compare baseline.json --output results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from vessel_tracker.core import GeoJSONExporter, MessageProcessor, VesselAnalyzer
+from vessel_tracker.models.position import Position
+
+from .synthetic import DEFAULT_MESSAGE_MIX, SyntheticConfig, generate
+
+RESULTS_VERSION = 1
+# Seconds between resident set size samples while a stage runs
+RSS_SAMPLE_INTERVAL = 0.005
+# Allowed slowdown before a stage counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class PeakRSS:
+    """Samples resident memory on a background thread to find a stage's peak."""
+
+    def __init__(self):
+        self.start = 0
+        self.peak = 0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._done.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self) -> 'PeakRSS':
+        self.start = self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def measure(fn: Callable[[], object], count: Callable[[object], int], unit: str) -> tuple:
+    """Run one stage with its output suppressed; returns (result, metrics)."""
+    sink = io.StringIO()
+    with PeakRSS() as rss, contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        result = fn()
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+    items = count(result)
+    return result, {
+        "seconds": wall,
+        "cpu_seconds": cpu,
+        "items": items,
+        "unit": unit,
+        "throughput": items / wall if wall > 0 else 0.0,
+        "peak_rss_mb": rss.peak / 2 ** 20,
+        "rss_growth_mb": (rss.peak - rss.start) / 2 ** 20,
+    }
+
+
+def position_footprint(positions: List[Position], min_duration: int) -> dict:
+    """Memory per Position object and the rate of creating and analyzing them.
+
+    The memory is that of the objects and their list slots, not of the
+    field values, which the copies share with ``positions``.
+    """
+    fields = [(pos.lat, pos.lon, pos.timestamp, pos.mmsi) for pos in positions]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copies = [Position(*values) for values in fields]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    wall = time.perf_counter()
+    copies = [Position(*values) for values in fields]
+    created = time.perf_counter() - wall
+
+    vessels: Dict[str, List[Position]] = {}
+    for pos in reversed(copies):
+        vessels.setdefault(pos.mmsi, []).append(pos)
+    analyzer = VesselAnalyzer(min_duration=min_duration)
+    wall = time.perf_counter()
+    for vessel in vessels.values():
+        analyzer._analyze_vessel_positions(vessel)
+    analyzed = time.perf_counter() - wall
+    return {
+        "bytes_per_position": used / len(fields) if fields else 0.0,
+        "created_per_second": len(fields) / created if created > 0 else 0.0,
+        "analyzed_per_second": len(fields) / analyzed if analyzed > 0 else 0.0,
+    }
+
+
+def run_stages(input_path: str, output_path: str, min_duration: int) -> Dict[str, dict]:
+    """Time each pipeline stage separately on one input."""
+    stages = {}
+    positions, stages["parse"] = measure(
+        lambda: list(MessageProcessor(input_path).process_messages()), len, "messages")
+    stages["parse"]["positions"] = position_footprint(positions, min_duration)
+    analyzer = VesselAnalyzer(min_duration=min_duration)
+    _, stages["group"] = measure(
+        lambda: analyzer.group_positions(positions), lambda _: len(positions), "positions")
+    del positions
+    stops, stages["analyze"] = measure(analyzer.find_stops, lambda _: len(analyzer.store), "positions")
+    _, stages["export"] = measure(
+        lambda: GeoJSONExporter(output_path).export(stops), lambda _: len(stops), "stops")
+    stages["analyze"]["stops"] = len(stops)
+    return stages
+
+
+def best_of(runs: List[Dict[str, dict]]) -> Dict[str, dict]:
+    """Keep each stage's fastest run, which is the least disturbed by noise."""
+    return {name: min((run[name] for run in runs), key=lambda stage: stage["seconds"])
+            for name in runs[0]}
+
+
+def git_revision() -> Optional[str]:
+    """Current git commit of the working tree, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Print a per-stage comparison and return the stages that regressed."""
+    if results["config"] != baseline.get("config"):
+        print("warning: baseline was run with a different config", file=sys.stderr)
+    regressions = []
+    print(f"\n{'stage':<10}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, stage in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        change = stage["seconds"] / previous["seconds"] - 1 if previous["seconds"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<10}{previous['seconds']:>11.3f}s{stage['seconds']:>11.3f}s{change:>+10.1%}{flag}")
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    """Print a human-readable summary of the stage timings."""
+    feed = results["feed"]
+    print(f"Feed: {feed['lines']:,} lines, {feed['positions']:,} positions, {feed['bytes'] / 2 ** 20:.1f} MB")
+    print(f"\n{'stage':<10}{'seconds':>10}{'throughput':>22}{'peak RSS':>12}")
+    for name, stage in results["stages"].items():
+        throughput = f"{stage['throughput']:,.0f} {stage['unit']}/s"
+        print(f"{name:<10}{stage['seconds']:>10.3f}{throughput:>22}{stage['peak_rss_mb']:>10.0f}MB")
+    footprint = results["stages"]["parse"]["positions"]
+    print(f"\nPosition objects: {footprint['bytes_per_position']:.0f} bytes each, "
+          f"{footprint['created_per_second']:,.0f} created/s, "
+          f"{footprint['analyzed_per_second']:,.0f} analyzed/s (sorted and scanned per vessel)")
+
+
+def parse_mix(value: str) -> Dict[int, float]:
+    """Parse a MessageID mix such as '1:0.7,18:0.2,5:0.1'."""
+    mix = {}
+    for item in value.split(','):
+        message_id, weight = item.split(':')
+        mix[int(message_id)] = float(weight)
+    return mix
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(
+        description="Benchmark vessel_tracker stages on a synthetic AIS feed.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--vessels", type=int, default=defaults.vessels)
+    parser.add_argument("--messages-per-vessel", type=int, default=defaults.messages_per_vessel)
+    parser.add_argument("--stop-ratio", type=float, default=defaults.stop_ratio,
+                        help="Probability that each track segment is a stop")
+    parser.add_argument("--message-mix", type=parse_mix,
+                        default=",".join(f"{k}:{v}" for k, v in DEFAULT_MESSAGE_MIX.items()),
+                        help="MessageID weights as id:weight pairs")
+    parser.add_argument("--malformed-rate", type=float, default=defaults.malformed_rate,
+                        help="Fraction of lines that are invalid JSON")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the generated feed")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--min-duration", type=int, default=3600, help="Minimum stop duration in seconds")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--workdir", help="Directory for the generated feed (default: a temporary one)")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Slowdown fraction that counts as a regression")
+    return parser.parse_args(args)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Generate a feed, run the stages and report or compare the results."""
+    args = parse_args(args)
+    config = SyntheticConfig(
+        vessels=args.vessels,
+        messages_per_vessel=args.messages_per_vessel,
+        stop_ratio=args.stop_ratio,
+        message_mix=args.message_mix,
+        malformed_rate=args.malformed_rate,
+        gzip=args.gzip,
+        seed=args.seed
+    )
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        input_path = os.path.join(workdir, f"feed{config.suffix}")
+        output_path = os.path.join(workdir, "stops.geojson")
+        feed = generate(input_path, config)
+        runs = [run_stages(input_path, output_path, args.min_duration) for _ in range(args.repeat)]
+
+    results = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {**config.to_dict(), "min_duration": args.min_duration},
+        "feed": vars(feed),
+        "stages": best_of(runs),
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Benchmark command line start-up against an import time budget.
+
+Runs ``python -X importtime -m vessel_tracker.cli --help`` and adds up the
+time spent importing modules, failing when it exceeds the budget or when a
+module that only some runs need (numpy, tqdm, asyncio and so on) is
+imported just to print the help.
+
+Usage:
+    python -m benchmarks.startup --budget 0.15 --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .run import git_revision
+
+# Seconds of imports allowed before --help is printed; generous for a cold bytecode cache
+DEFAULT_BUDGET = 0.25
+# Modules that --help must not import; each is only needed by some runs
+DEFERRED_MODULES = ('numpy', 'tqdm', 'asyncio', 'multiprocessing', 'orjson', 'simdjson', 'pyarrow')
+STARTUP_COMMAND = ('-X', 'importtime', '-m', 'vessel_tracker.cli', '--help')
+
+
+def parse_importtime(output: str) -> Dict[str, int]:
+    """Microseconds spent importing each module itself, from ``-X importtime`` output."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules[fields[2].strip()] = int(fields[0])
+    return modules
+
+
+def measure_startup() -> dict:
+    """Run the command line once with import timing; returns its timings and imports."""
+    wall = time.perf_counter()
+    result = subprocess.run([sys.executable, *STARTUP_COMMAND], capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - wall
+    modules = parse_importtime(result.stderr)
+    return {
+        "seconds": wall,
+        "import_seconds": sum(modules.values()) / 1e6,
+        "modules": len(modules),
+        "deferred_imported": [name for name in DEFERRED_MODULES if name in modules],
+        "slowest": sorted(modules.items(), key=lambda item: -item[1])[:10],
+    }
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark vessel_tracker command line start-up against an import time budget.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Import time budget in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs; the fastest is kept")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    return parser.parse_args(args)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Measure start-up and report it; returns 1 when it is over budget or imports too much."""
+    args = parse_args(args)
+    runs = [measure_startup() for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run["import_seconds"])
+    results = {"revision": git_revision(), "budget": args.budget, **best}
+
+    print(f"Start-up: {best['seconds']:.3f}s wall, {best['import_seconds']:.3f}s importing "
+          f"{best['modules']} modules (budget {args.budget:.3f}s)")
+    for name, micros in best["slowest"]:
+        print(f"  {micros / 1e3:>8.1f}ms  {name}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if best["import_seconds"] > args.budget:
+        print("Start-up is over budget", file=sys.stderr)
+        failed = True
+    if best["deferred_imported"]:
+        print(f"--help imported: {', '.join(best['deferred_imported'])}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Deterministic synthetic AIS feed generator for benchmarks."""
+import gzip
+import io
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, TextIO
+
+from vessel_tracker.utils.parsing import POSITION_MESSAGE_TYPES
+
+# Default MessageID mix: mostly class A/B position reports, some non-position traffic
+DEFAULT_MESSAGE_MIX = {1: 0.55, 3: 0.1, 18: 0.2, 27: 0.05, 5: 0.05, 24: 0.05}
+# Seconds between consecutive reports of a vessel
+REPORT_INTERVAL = 60
+# Speed of a moving vessel, in knots
+CRUISE_SPEED = 12.0
+# Range of segment lengths (moving or stopped), in reports
+SEGMENT_LENGTH = (30, 120)
+START_TIME = 1704067200  # 2024-01-01T00:00:00Z
+
+
+@dataclass
+class SyntheticConfig:
+    """Shape of a synthetic AIS feed.
+
+    ``stop_ratio`` is the probability that each track segment is a stop.
+    ``message_mix`` maps MessageIDs to relative weights; IDs that are not
+    position reports produce lines without coordinates. ``malformed_rate`` is
+    the fraction of lines that are truncated, invalid JSON.
+    """
+    vessels: int = 1000
+    messages_per_vessel: int = 500
+    stop_ratio: float = 0.3
+    message_mix: Dict[int, float] = field(default_factory=lambda: dict(DEFAULT_MESSAGE_MIX))
+    malformed_rate: float = 0.001
+    gzip: bool = False
+    seed: int = 0
+
+    @property
+    def suffix(self) -> str:
+        """File suffix matching the compression setting."""
+        return '.json.gz' if self.gzip else '.json'
+
+    def to_dict(self) -> dict:
+        """Plain representation for results files."""
+        data = asdict(self)
+        data["message_mix"] = {str(key): value for key, value in self.message_mix.items()}
+        return data
+
+
+@dataclass
+class SyntheticStats:
+    """Counts of what a generated feed contains."""
+    lines: int = 0
+    positions: int = 0
+    non_position: int = 0
+    malformed: int = 0
+    bytes: int = 0
+
+
+class _Track:
+    """Per-vessel state: position, heading and the current moving or stopped segment."""
+
+    __slots__ = ('lat', 'lon', 'heading', 'stopped', 'remaining')
+
+    def __init__(self, rng: random.Random):
+        self.lat = rng.uniform(-60.0, 60.0)
+        self.lon = rng.uniform(-170.0, 170.0)
+        self.heading = rng.uniform(0.0, 2 * math.pi)
+        self.stopped = False
+        self.remaining = 0
+
+    def advance(self, rng: random.Random, stop_ratio: float) -> None:
+        """Move one report interval along the track."""
+        if self.remaining == 0:
+            self.stopped = rng.random() < stop_ratio
+            self.remaining = rng.randint(*SEGMENT_LENGTH)
+            self.heading = rng.uniform(0.0, 2 * math.pi)
+        self.remaining -= 1
+        if self.stopped:
+            return
+        step = CRUISE_SPEED * REPORT_INTERVAL / 3600 / 60  # nautical miles to degrees
+        self.lat = max(-85.0, min(85.0, self.lat + step * math.cos(self.heading)))
+        self.lon += step * math.sin(self.heading) / max(math.cos(math.radians(self.lat)), 0.01)
+        self.lon = (self.lon + 180.0) % 360.0 - 180.0
+
+
+def generate(path: str, config: SyntheticConfig) -> SyntheticStats:
+    """Write a synthetic feed to ``path`` and return what it contains.
+
+    The same config and seed always produce the same bytes. Reports are
+    written interleaved across vessels in timestamp order, like a live feed.
+    """
+    rng = random.Random(config.seed)
+    stats = SyntheticStats()
+    message_ids = list(config.message_mix)
+    weights = list(config.message_mix.values())
+    tracks = [_Track(rng) for _ in range(config.vessels)]
+    mmsis = [200000000 + i * 7919 for i in range(config.vessels)]
+
+    with open(path, 'wb') as raw:
+        # A fixed gzip mtime keeps compressed output byte-identical between runs
+        stream = gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) if config.gzip else raw
+        with io.TextIOWrapper(stream, encoding='utf-8', newline='\n') as f:
+            for step in range(config.messages_per_vessel):
+                base_time = START_TIME + step * REPORT_INTERVAL
+                for vessel, track in enumerate(tracks):
+                    track.advance(rng, config.stop_ratio)
+                    message_id = rng.choices(message_ids, weights)[0]
+                    _write_message(f, rng, config, stats, message_id, mmsis[vessel], track,
+                                   base_time + vessel % REPORT_INTERVAL)
+    return stats
+
+
+def _write_message(f: TextIO, rng: random.Random, config: SyntheticConfig, stats: SyntheticStats,
+                   message_id: int, mmsi: int, track: _Track, timestamp: int) -> None:
+    """Write one message line, possibly malformed."""
+    message = {"MessageID": message_id, "UserID": mmsi}
+    is_position = message_id in POSITION_MESSAGE_TYPES
+    if is_position:
+        message["Latitude"] = round(track.lat, 6)
+        message["Longitude"] = round(track.lon, 6)
+    line = json.dumps({"Message": message, "UTCTimeStamp": timestamp}, separators=(',', ':'))
+    if rng.random() < config.malformed_rate:
+        line = line[:len(line) // 2]
+        stats.malformed += 1
+    elif is_position:
+        stats.positions += 1
+    else:
+        stats.non_position += 1
+    f.write(line + '\n')
+    stats.lines += 1
+    stats.bytes += len(line) + 1
@@ -3,6 +3,10 @@ from setuptools import setup, find_packages
 setup(
     name="vessel_tracker",
     version="0.1.0",
-    packages=find_packages(),
-    python_requires=">=3.10"
+    packages=find_packages(exclude=["tests", "benchmarks"]),
+    python_requires=">=3.10",
+    extras_require={
+        "fast": ["orjson", "numpy"],
+        "arrow": ["pyarrow"]
+    }
 )
\ No newline at end of file
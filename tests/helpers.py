@@ -0,0 +1,56 @@
+"""Synthetic tracks shared by the tests."""
+import random
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.models.position import Position
+from vessel_tracker.models.store import PositionStore
+
+
+def random_vessel_data(seed=7, vessels=20, points=200):
+    """Random tracks alternating between drifting and steaming, with duplicate timestamps."""
+    rng = random.Random(seed)
+    data = {}
+    for v in range(vessels):
+        mmsi = str(200000000 + v)
+        lat, lon, t = rng.uniform(-60, 60), rng.uniform(-170, 170), 1_700_000_000
+        positions = []
+        for _ in range(points):
+            t += rng.choice([0, 60, 300, 900, 1800])
+            step = rng.choice([0.0, 0.00001, 0.05])
+            lat += rng.uniform(-step, step)
+            lon += rng.uniform(-step, step)
+            positions.append(Position(lat=lat, lon=lon, timestamp=t, mmsi=mmsi))
+        rng.shuffle(positions)
+        data[mmsi] = positions
+    return data
+
+
+def time_ordered_feed(seed=11, vessels=10, points=150):
+    """Interleave several vessels' tracks into one feed ordered by time."""
+    rng = random.Random(seed)
+    feed = []
+    for v in range(vessels):
+        lat, lon, t = rng.uniform(-50, 50), rng.uniform(-150, 150), 1_700_000_000
+        for _ in range(points):
+            t += rng.choice([60, 300, 900, 1800])
+            step = rng.choice([0.0, 0.00001, 0.05])
+            lat += rng.uniform(-step, step)
+            lon += rng.uniform(-step, step)
+            feed.append(Position(lat=lat, lon=lon, timestamp=t, mmsi=str(v)))
+    feed.sort(key=lambda p: p.timestamp)
+    return feed
+
+
+def batch_stops(feed, min_duration, speed_threshold=1.0):
+    """Stops the batch analyzer finds in a feed."""
+    analyzer = VesselAnalyzer(min_duration=min_duration, speed_threshold=speed_threshold)
+    analyzer.group_positions(feed)
+    return analyzer.find_stops()
+
+
+def make_store(data):
+    """A sorted store of the positions of random_vessel_data."""
+    store = PositionStore()
+    for positions in data.values():
+        store.extend(positions)
+    store.sort()
+    return store
@@ -1,5 +1,9 @@
 import pytest
+from vessel_tracker.core import analyzer as analyzer_module
 from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.models.position import Position
+from vessel_tracker.utils.geo import calculate_speed
+from helpers import random_vessel_data
 
 
 def test_find_stops(sample_positions):
@@ -51,4 +55,100 @@ def test_find_stops_short_duration(sample_positions):
 
     stops = analyzer.find_stops()
 
-    assert len(stops) == 0
\ No newline at end of file
+    assert len(stops) == 0
+
+def reference_stops(vessel_data, min_duration):
+    """The original object-based stop detection loop, used as a reference."""
+    stops = []
+    for positions in vessel_data.values():
+        positions = sorted(positions, key=lambda x: x.timestamp)
+        stop_start = None
+        prev_pos = None
+        for pos in positions:
+            if prev_pos is None:
+                prev_pos = pos
+                continue
+            if calculate_speed(prev_pos, pos) < 1.0:
+                if stop_start is None:
+                    stop_start = prev_pos
+            elif stop_start is not None:
+                if pos.timestamp - stop_start.timestamp >= min_duration:
+                    stops.append(stop_start)
+                stop_start = None
+            prev_pos = pos
+        if stop_start is not None and positions[-1].timestamp - stop_start.timestamp >= min_duration:
+            stops.append(stop_start)
+    return stops
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_find_stops_matches_reference(engine, monkeypatch):
+    """Test that each engine finds the same stops as the original loop."""
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    # Force the numpy engine to split the vessels over several chunks
+    monkeypatch.setattr(analyzer_module, "CHUNK_ROWS", 500)
+    data = random_vessel_data()
+    expected = reference_stops(data, 1800)
+
+    analyzer = VesselAnalyzer(min_duration=1800, engine=engine)
+    analyzer.group_positions(p for positions in data.values() for p in positions)
+    stops = analyzer.find_stops()
+
+    assert len(expected) > 0
+    assert [stop.start for stop in stops] == expected
+
+
+def test_find_stops_trailing_and_single_point_vessels():
+    """Test the trailing-stop check and vessels with a single fix in the numpy engine."""
+    pytest.importorskip("numpy")
+    base = 1_700_000_000
+    data = {
+        "1": [Position(lat=0.0, lon=0.0, timestamp=base, mmsi="1")],
+        "2": [Position(lat=1.0, lon=1.0, timestamp=base + i * 1200, mmsi="2") for i in range(4)],
+        "3": [Position(lat=2.0, lon=2.0, timestamp=base, mmsi="3"),
+              Position(lat=2.0, lon=2.0, timestamp=base, mmsi="3")],
+    }
+
+    for engine in ("python", "numpy"):
+        analyzer = VesselAnalyzer(min_duration=3600, engine=engine)
+        analyzer.vessel_data = data
+
+        stops = analyzer.find_stops()
+
+        assert [(s.mmsi, s.timestamp) for s in stops] == [("2", base)]
+
+
+def test_find_stops_episode(sample_positions):
+    """Test the end, duration, point count, centroid and extent of a stop."""
+    # The vessel steams off after the fourth fix
+    moving_off = Position(lat=52.0, lon=0.5, timestamp=sample_positions[-1].timestamp + 600, mmsi="123456789")
+    for engine in ("python", "numpy"):
+        if engine == "numpy":
+            pytest.importorskip("numpy")
+        analyzer = VesselAnalyzer(min_duration=3600, engine=engine)
+        analyzer.vessel_data = {"123456789": sample_positions + [moving_off]}
+
+        stop, = analyzer.find_stops()
+
+        assert stop.start == sample_positions[0]
+        assert stop.end_timestamp == moving_off.timestamp
+        assert stop.duration == 6000
+        assert stop.points == 4
+        assert stop.centroid_lat == pytest.approx((51.5074 * 3 + 51.5075) / 4)
+        assert stop.centroid_lon == pytest.approx((-0.1278 * 3 - 0.1279) / 4)
+        assert (stop.min_lat, stop.min_lon, stop.max_lat, stop.max_lon) == (51.5074, -0.1279, 51.5075, -0.1278)
+
+
+def test_find_stops_episodes_match_between_engines():
+    """Test that both engines report identical episodes."""
+    pytest.importorskip("numpy")
+    data = random_vessel_data(seed=11)
+    episodes = {}
+    for engine in ("python", "numpy"):
+        analyzer = VesselAnalyzer(min_duration=1800, engine=engine)
+        analyzer.group_positions(p for positions in data.values() for p in positions)
+        episodes[engine] = analyzer.find_stops()
+
+    assert len(episodes["python"]) > 0
+    assert episodes["python"] == episodes["numpy"]
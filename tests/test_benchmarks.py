@@ -0,0 +1,62 @@
+import hashlib
+import json
+
+from benchmarks.run import main
+from benchmarks.startup import main as startup_main
+from benchmarks.synthetic import SyntheticConfig, generate
+from vessel_tracker.core import MessageProcessor
+
+
+def _digest(path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def test_generate_is_deterministic(tmp_path):
+    """Test that the same config produces identical feeds, gzipped or not."""
+    for use_gzip in (False, True):
+        config = SyntheticConfig(vessels=5, messages_per_vessel=50, gzip=use_gzip, malformed_rate=0.05)
+        first, second = tmp_path / f"a{config.suffix}", tmp_path / f"b{config.suffix}"
+        generate(str(first), config)
+        generate(str(second), config)
+        assert _digest(first) == _digest(second)
+
+
+def test_generate_counts_match_processor(tmp_path):
+    """Test that the generator's stats agree with what the processor parses."""
+    config = SyntheticConfig(vessels=10, messages_per_vessel=100, malformed_rate=0.02, gzip=True)
+    path = tmp_path / f"feed{config.suffix}"
+    stats = generate(str(path), config)
+
+    positions = list(MessageProcessor(str(path)).process_messages())
+    assert stats.lines == 1000
+    assert stats.malformed > 0
+    assert len(positions) == stats.positions
+    assert len({pos.mmsi for pos in positions}) == 10
+
+
+def test_benchmark_compare(tmp_path):
+    """Test that results are written and a much faster baseline flags a regression."""
+    results_path = tmp_path / "results.json"
+    args = ["--vessels", "5", "--messages-per-vessel", "200", "--workdir", str(tmp_path)]
+    assert main(args + ["--output", str(results_path)]) == 0
+
+    baseline = json.loads(results_path.read_text())
+    assert set(baseline["stages"]) == {"parse", "group", "analyze", "export"}
+    # A slotted Position with an interned MMSI: object header, four slots and a list slot
+    assert baseline["stages"]["parse"]["positions"]["bytes_per_position"] < 100
+    for stage in baseline["stages"].values():
+        stage["seconds"] /= 100
+    results_path.write_text(json.dumps(baseline))
+    assert main(args + ["--compare", str(results_path)]) == 1
+
+
+def test_startup_budget(tmp_path):
+    """Test that --help imports none of the deferred modules and is judged against the budget."""
+    results_path = tmp_path / "startup.json"
+    assert startup_main(["--repeat", "1", "--budget", "5", "--output", str(results_path)]) == 0
+
+    results = json.loads(results_path.read_text())
+    assert results["deferred_imported"] == []
+    assert 0 < results["import_seconds"] < results["seconds"]
+    assert startup_main(["--repeat", "1", "--budget", "0"]) == 1
@@ -0,0 +1,79 @@
+import json
+import os
+import pytest
+from vessel_tracker.core import process_vessel_data
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.cache import ParseCache, cache_key
+from vessel_tracker.models import store as store_module
+from vessel_tracker.utils.metrics import Metrics
+from helpers import random_vessel_data
+
+
+def stops_of(analyzer):
+    return [(p.mmsi, p.timestamp, p.lat, p.lon) for p in analyzer.find_stops()]
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+def test_cache_round_trip(engine, tmp_path, monkeypatch):
+    """Test that a mapped entry analyzes to the same stops as the original store."""
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(store_module, "np", None)
+    data = random_vessel_data(vessels=10)
+    analyzer = VesselAnalyzer(min_duration=1800, engine=engine)
+    analyzer.group_positions(p for vessel in data.values() for p in vessel)
+
+    cache = ParseCache(str(tmp_path))
+    cache.save("key", analyzer.store, {"lines_read": 5})
+    store, counters = cache.load("key")
+
+    cached = VesselAnalyzer(min_duration=1800, engine=engine)
+    cached.store = store
+    assert stops_of(cached) == stops_of(analyzer)
+    assert store.mmsi_table == analyzer.store.mmsi_table
+    assert counters["lines_read"] == 5
+    assert cache.load("missing") is None
+
+
+def test_cache_key_tracks_content(tmp_path):
+    """Test that the key changes when an input changes."""
+    path = tmp_path / "feed.json"
+    path.write_text("a\n")
+    key = cache_key([str(path)])
+    assert cache_key([str(path)]) == key
+    path.write_text("b\n")
+    os.utime(path, ns=(0, 0))
+    assert cache_key([str(path)]) != key
+
+
+def test_cache_eviction(tmp_path):
+    """Test eviction by age and then by total size, oldest first."""
+    cache = ParseCache(str(tmp_path), max_bytes=250, max_age=1000)
+    for name, age in (("old", 5000), ("a", 30), ("b", 20), ("c", 10)):
+        path = cache.path(name)
+        with open(path, "wb") as f:
+            f.write(bytes(100))
+        os.utime(path, (0, os.path.getmtime(path) - age))
+
+    assert cache.evict() == 2
+    assert sorted(entry.name for entry in cache.entries()) == ["b.vtc", "c.vtc"]
+
+
+def test_process_vessel_data_uses_cache(sample_message, tmp_path):
+    """Test that a second run loads the positions from the cache with the same output."""
+    input_path = tmp_path / "messages.json"
+    input_path.write_text("\n".join(
+        json.dumps({**sample_message, "UTCTimeStamp": sample_message["UTCTimeStamp"] + i * 1800})
+        for i in range(4)) + "\n")
+    cache = ParseCache(str(tmp_path / "cache"))
+
+    outputs = []
+    for run in range(2):
+        metrics = Metrics()
+        output_path = tmp_path / f"stops{run}.geojson"
+        process_vessel_data(str(input_path), str(output_path), cache=cache, metrics=metrics)
+        outputs.append(output_path.read_text())
+    assert metrics.counters["cache_hits"] == 1
+    assert metrics.counters["lines_read"] == 4
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,148 @@
+import gzip
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from vessel_tracker.core import process_vessel_data
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.checkpoint import load_checkpoint, run_incremental
+from vessel_tracker.models.position import Position
+from vessel_tracker.utils.filters import PositionFilter
+
+
+def feed_lines(seed=5, vessels=6, points=120):
+    """Time-ordered AIS lines for a handful of vessels."""
+    rng = random.Random(seed)
+    messages = []
+    for v in range(vessels):
+        lat, lon, t = rng.uniform(-50, 50), rng.uniform(-150, 150), 1_700_000_000
+        for _ in range(points):
+            t += rng.choice([60, 600, 1200])
+            step = rng.choice([0.0, 0.0, 0.05])
+            lat += rng.uniform(-step, step)
+            lon += rng.uniform(-step, step)
+            messages.append({
+                "Message": {"MessageID": 1, "UserID": str(v), "Latitude": lat, "Longitude": lon},
+                "UTCTimeStamp": t
+            })
+    messages.sort(key=lambda m: m["UTCTimeStamp"])
+    return [(json.dumps(m) + "\n").encode() for m in messages]
+
+
+def full_recompute(lines, min_duration):
+    analyzer = VesselAnalyzer(min_duration=min_duration)
+    for line in lines:
+        m = json.loads(line)
+        analyzer.store.append(m["Message"]["Latitude"], m["Message"]["Longitude"],
+                              m["UTCTimeStamp"], m["Message"]["UserID"])
+    return analyzer.find_stops()
+
+
+def episodes(stops):
+    """Every field of each stop, in a canonical order."""
+    features = [s.to_dict() for s in stops]
+    return sorted(features, key=lambda f: (f["properties"]["mmsi"], f["properties"]["timestamp"]))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_incremental_matches_full_recompute(tmp_path: Path, compress: bool):
+    """Test that stops accumulated over appending runs match a full recompute."""
+    lines = feed_lines()
+    data = b"".join(lines)
+    input_path = tmp_path / ("feed.json.gz" if compress else "feed.json")
+    checkpoint_path = str(tmp_path / "feed.checkpoint")
+
+    # Cut points fall mid-line for plain input to exercise the held-back partial line
+    cuts = [0, len(data) // 3 + 7, 2 * len(data) // 3 + 3, len(data)]
+    collected = []
+    resumed_runs = []
+    for start, end in zip(cuts, cuts[1:]):
+        chunk = data[start:end]
+        with open(input_path, "ab") as f:
+            f.write(gzip.compress(chunk) if compress else chunk)
+        stops, resumed, commit = run_incremental(str(input_path), checkpoint_path, min_duration=1800)
+        commit()
+        collected.extend(stops)
+        resumed_runs.append(resumed)
+    assert load_checkpoint(checkpoint_path).offset == input_path.stat().st_size
+
+    # The input is complete: report the stops still open at its end
+    stops, resumed, commit = run_incremental(str(input_path), checkpoint_path, min_duration=1800, final=True)
+    commit()
+    collected.extend(stops)
+    resumed_runs.append(resumed)
+
+    assert resumed_runs == [False, True, True, True]
+    expected = full_recompute(lines, 1800)
+    assert len(expected) > 0
+    assert episodes(collected) == episodes(expected)
+    assert not Path(checkpoint_path).exists()
+
+
+def test_incremental_restarts_on_changed_input(tmp_path: Path):
+    """Test that a rewritten input is reprocessed from the start."""
+    lines = feed_lines()
+    input_path = tmp_path / "feed.json"
+    checkpoint_path = str(tmp_path / "feed.checkpoint")
+
+    input_path.write_bytes(b"".join(lines))
+    first, _, commit = run_incremental(str(input_path), checkpoint_path, min_duration=1800)
+    commit()
+
+    input_path.write_bytes(b"\n" + b"".join(lines))
+    second, resumed, _ = run_incremental(str(input_path), checkpoint_path, min_duration=1800)
+
+    assert not resumed
+    assert episodes(second) == episodes(first)
+
+
+def test_incremental_uncommitted_run_is_repeated(tmp_path: Path):
+    """Test that the checkpoint only moves on once the caller commits the run."""
+    lines = feed_lines()
+    input_path = tmp_path / "feed.json"
+    checkpoint_path = str(tmp_path / "feed.checkpoint")
+    input_path.write_bytes(b"".join(lines[:300]))
+    _, _, commit = run_incremental(str(input_path), checkpoint_path, min_duration=1800)
+    commit()
+    with open(input_path, "ab") as f:
+        f.write(b"".join(lines[300:]))
+
+    # As if exporting these stops failed
+    first, _, _ = run_incremental(str(input_path), checkpoint_path, min_duration=1800)
+    second, resumed, _ = run_incremental(str(input_path), checkpoint_path, min_duration=1800)
+
+    assert resumed
+    assert len(first) > 0
+    assert episodes(second) == episodes(first)
+
+
+@pytest.mark.parametrize("changed", [
+    {"min_duration": 900},
+    {"speed_threshold": 2.0},
+    {"position_filter": PositionFilter(bbox=(-180, -10, 180, 10))},
+    {"position_filter": PositionFilter(since=1_700_010_000)},
+])
+def test_incremental_refuses_changed_settings(tmp_path: Path, changed):
+    """Test that a checkpoint is not resumed with settings that find different stops."""
+    input_path = tmp_path / "feed.json"
+    checkpoint_path = str(tmp_path / "feed.checkpoint")
+    input_path.write_bytes(b"".join(feed_lines()))
+    settings = {"min_duration": 1800, "position_filter": PositionFilter(since=1_700_000_000)}
+    _, _, commit = run_incremental(str(input_path), checkpoint_path, **settings)
+    commit()
+
+    with pytest.raises(ValueError, match="different"):
+        run_incremental(str(input_path), checkpoint_path, **{**settings, **changed})
+    _, resumed, _ = run_incremental(str(input_path), checkpoint_path, **settings)
+    assert resumed
+
+
+def test_finalize_needs_checkpoint(tmp_path: Path):
+    """Test that finalizing a run without a checkpoint is refused rather than ignored."""
+    input_path = tmp_path / "feed.json"
+    input_path.write_bytes(b"".join(feed_lines()))
+
+    with pytest.raises(ValueError, match="checkpoint"):
+        process_vessel_data(str(input_path), str(tmp_path / "stops.geojson"), finalize=True)
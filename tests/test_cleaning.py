@@ -0,0 +1,85 @@
+import random
+import pytest
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.cleaning import Cleaning, clean_track, running_median
+from vessel_tracker.models.position import Position
+from helpers import random_vessel_data
+
+BASE = 1_700_000_000
+
+
+def find(positions, engine, cleaning=None, min_duration=3600):
+    analyzer = VesselAnalyzer(min_duration=min_duration, engine=engine, cleaning=cleaning)
+    analyzer.group_positions(positions)
+    return analyzer.find_stops()
+
+
+@pytest.fixture(params=["python", "numpy"])
+def engine(request):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def test_dedupe_removes_fake_stops(engine):
+    """Test that repeated reports of a moving vessel no longer look like stops."""
+    positions = []
+    for i in range(6):
+        fix = Position(lat=50.0 + i * 0.1, lon=0.0, timestamp=BASE + i * 1800, mmsi="1")
+        positions += [fix, fix]
+
+    assert len(find(positions, engine, min_duration=1800)) == 5
+    assert find(positions, engine, Cleaning(), min_duration=1800) == []
+
+
+def test_max_speed_rejects_gps_jump(engine):
+    """Test that a single far-off fix no longer splits a stop."""
+    positions = [Position(lat=50.0, lon=0.0, timestamp=BASE + i * 600, mmsi="1") for i in range(13)]
+    positions[6] = Position(lat=51.0, lon=0.0, timestamp=BASE + 3600, mmsi="1")
+
+    assert find(positions, engine, min_duration=5400) == []
+    stop, = find(positions, engine, Cleaning(max_speed=50), min_duration=5400)
+    assert stop.timestamp == BASE
+    assert stop.duration == 7200
+    assert stop.points == 12
+    assert stop.max_lat == 50.0
+
+
+def test_clean_track_smoothing():
+    """Test the running median and that the ends of the track repeat."""
+    assert running_median([1.0, 9.0, 2.0, 3.0, 4.0], 3) == [1.0, 2.0, 3.0, 3.0, 4.0]
+    lat = [0.0, 0.0, 5.0, 0.0, 0.0]
+    rows, smooth_lat, _, timestamp = clean_track(lat, [0.0] * 5, [0, 10, 10, 20, 30], 0, 5,
+                                                 Cleaning(smooth_window=3))
+    assert rows == [0, 1, 3, 4]
+    assert smooth_lat == [0.0] * 4
+    assert timestamp == [0, 10, 20, 30]
+
+
+@pytest.mark.parametrize("cleaning", [
+    Cleaning(),
+    Cleaning(dedupe=False, max_speed=30),
+    Cleaning(max_speed=30, smooth_window=5),
+])
+def test_engines_agree(cleaning):
+    """Test that both engines clean tracks identically."""
+    pytest.importorskip("numpy")
+    data = random_vessel_data(vessels=30)
+    rng = random.Random(5)
+    for positions in data.values():
+        for fix in rng.sample(positions, 10):
+            fix.lat += rng.choice([-0.5, 0.5])
+    positions = [p for vessel in data.values() for p in vessel]
+
+    expected = find(positions, "python", cleaning, min_duration=1800)
+    assert len(expected) > 0
+    assert find(positions, "numpy", cleaning, min_duration=1800) == expected
+
+
+def test_cleaning_validation():
+    """Test rejection of invalid settings."""
+    with pytest.raises(ValueError):
+        Cleaning(smooth_window=4)
+    with pytest.raises(ValueError):
+        Cleaning(max_speed=0)
+    assert not Cleaning(dedupe=False).active
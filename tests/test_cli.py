@@ -0,0 +1,31 @@
+import sys
+import pytest
+from vessel_tracker import cli
+
+
+@pytest.mark.parametrize("options, rejected", [
+    (["--format", "csv"], "--format"),
+    (["--checkpoint", "run.checkpoint"], "--checkpoint"),
+    (["--workers", "2"], "--workers"),
+    (["--cache"], "--cache"),
+    (["--partitions", "4"], "--partitions"),
+    (["--streaming"], "--streaming"),
+    (["--exact-count"], "--exact-count"),
+])
+def test_live_rejects_unsupported_options(tmp_path, monkeypatch, capsys, options, rejected):
+    """Test that live mode refuses options it would otherwise ignore, before reading the feed."""
+    output_path = tmp_path / "out.csv"
+    monkeypatch.setattr(sys, "argv", ["vessel_tracker", "-", str(output_path), "--live", *options])
+
+    assert cli.main() == 1
+    assert rejected in capsys.readouterr().err
+    assert not output_path.exists()
+
+
+def test_append_needs_live(tmp_path, monkeypatch, capsys):
+    """Test that --append is refused outside live mode."""
+    argv = ["vessel_tracker", str(tmp_path / "in.json"), str(tmp_path / "out.geojson"), "--append"]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    assert cli.main() == 1
+    assert "--append" in capsys.readouterr().err
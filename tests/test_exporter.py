@@ -1,7 +1,14 @@
+import csv
+import gzip
 import json
 import tempfile
 from pathlib import Path
-from vessel_tracker.core.exporter import GeoJSONExporter
+import pytest
+from vessel_tracker.core.exporter import (
+    ArrowExporter, CSVExporter, GeoJSONExporter, GeoJSONSeqExporter, StopExporter, batch_positions,
+    feature_json, get_exporter
+)
+from vessel_tracker.models.episode import StopEpisode
 
 
 def test_export_stops(sample_positions):
@@ -47,3 +54,132 @@ def test_export_empty_stops():
         assert len(data["features"]) == 0
     finally:
         output_path.unlink()
+
+
+def test_feature_json_matches_to_dict(sample_positions):
+    """Test that the streamed feature encoding matches Position.to_dict()."""
+    for stop in sample_positions:
+        assert json.loads(feature_json(stop)) == stop.to_dict()
+
+
+def test_export_stop_episodes(sample_positions, tmp_path):
+    """Test that stop episodes carry their end, duration and extent as properties and columns."""
+    start = sample_positions[0]
+    episode = StopEpisode(lat=start.lat, lon=start.lon, timestamp=start.timestamp, mmsi=start.mmsi,
+                          end_timestamp=start.timestamp + 5400, points=4, centroid_lat=51.50745,
+                          centroid_lon=-0.12785, min_lat=51.5074, min_lon=-0.1279, max_lat=51.5075,
+                          max_lon=-0.1278)
+    assert json.loads(feature_json(episode)) == episode.to_dict()
+
+    output_path = tmp_path / "stops.geojson"
+    get_exporter(str(output_path)).export([episode])
+    properties = json.loads(output_path.read_text())["features"][0]["properties"]
+    assert properties["duration"] == 5400
+    assert properties["points"] == 4
+    assert properties["centroid"] == [-0.12785, 51.50745]
+    assert properties["bbox"] == [-0.1279, 51.5074, -0.1278, 51.5075]
+
+    output_path = tmp_path / "stops.csv"
+    get_exporter(str(output_path)).export([episode])
+    with open(output_path) as f:
+        row, = csv.DictReader(f)
+    assert row["end_timestamp"] == str(start.timestamp + 5400)
+    assert row["duration"] == "5400"
+    assert row["max_lat"] == "51.5075"
+
+
+def test_export_compact_from_generator(sample_positions, tmp_path):
+    """Test streaming a generator of stops to a compact FeatureCollection."""
+    output_path = tmp_path / "out.geojson"
+
+    count = GeoJSONExporter(str(output_path)).export(iter(sample_positions))
+
+    text = output_path.read_text()
+    assert count == len(sample_positions)
+    assert "\n  " not in text
+    assert json.loads(text)["features"] == [p.to_dict() for p in sample_positions]
+
+
+def test_export_geojsonseq_gzip(sample_positions, tmp_path):
+    """Test newline-delimited GeoJSONSeq output with gzip compression."""
+    output_path = tmp_path / "out.geojsonl.gz"
+
+    exporter = GeoJSONExporter(str(output_path))
+    exporter.export(sample_positions[:2])
+    exporter.export(sample_positions[2:], append=True)
+
+    with gzip.open(output_path, "rt") as f:
+        features = [json.loads(line) for line in f]
+    assert exporter.sequence
+    assert features == [p.to_dict() for p in sample_positions]
+
+
+def test_export_append_to_collection(sample_positions, tmp_path):
+    """Test appending to compact, empty and indented FeatureCollections."""
+    for indent in (None, 2):
+        output_path = tmp_path / f"out{indent}.geojson"
+        GeoJSONExporter(str(output_path), indent=indent).export([])
+        GeoJSONExporter(str(output_path), indent=indent).export(sample_positions[:1], append=True)
+        GeoJSONExporter(str(output_path)).export(sample_positions[1:], append=True)
+
+        with open(output_path) as f:
+            data = json.load(f)
+        assert data["features"] == [p.to_dict() for p in sample_positions]
+
+
+def test_get_exporter_infers_format(tmp_path):
+    """Test that the exporter is picked from the output extension."""
+    assert type(get_exporter(str(tmp_path / "stops.geojson"))) is GeoJSONExporter
+    assert isinstance(get_exporter(str(tmp_path / "stops.geojsonl.gz")), GeoJSONSeqExporter)
+    assert isinstance(get_exporter(str(tmp_path / "stops.csv")), CSVExporter)
+    assert isinstance(get_exporter(str(tmp_path / "stops.txt"), "csv"), CSVExporter)
+    with pytest.raises(ValueError):
+        get_exporter(str(tmp_path / "stops.txt"), "xml")
+
+
+def test_export_csv_append(sample_positions, tmp_path):
+    """Test CSV export from batches, appending without a second header."""
+    output_path = tmp_path / "stops.csv"
+    exporter = CSVExporter(str(output_path))
+    assert exporter.export_batches(batch_positions(sample_positions[:2], size=1)) == 2
+    assert exporter.export(sample_positions[2:], append=True) == len(sample_positions) - 2
+
+    with open(output_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row["mmsi"] for row in rows] == [pos.mmsi for pos in sample_positions]
+    assert [float(row["lat"]) for row in rows] == [pos.lat for pos in sample_positions]
+    assert [row["datetime"] for row in rows] == [pos.datetime.isoformat() for pos in sample_positions]
+
+
+@pytest.mark.parametrize("suffix", [".arrow", ".parquet"])
+def test_export_columnar(sample_positions, tmp_path, suffix):
+    """Test Arrow IPC and Parquet export of stop batches."""
+    pa = pytest.importorskip("pyarrow")
+    output_path = str(tmp_path / f"stops{suffix}")
+    exporter = get_exporter(output_path)
+    assert exporter.export(sample_positions) == len(sample_positions)
+
+    if suffix == ".arrow":
+        table = pa.ipc.open_file(output_path).read_all()
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(output_path)
+    assert table.column("mmsi").to_pylist() == [pos.mmsi for pos in sample_positions]
+    assert table.column("timestamp").to_pylist() == [pos.timestamp for pos in sample_positions]
+    assert table.column("lon").to_pylist() == [pos.lon for pos in sample_positions]
+    with pytest.raises(ValueError):
+        exporter.export(sample_positions, append=True)
+
+
+@pytest.mark.parametrize("suffix", [".arrow.gz", ".parquet.gz"])
+def test_export_columnar_refuses_gzip(tmp_path, suffix):
+    """Test that Arrow and Parquet paths ending in .gz are refused rather than written uncompressed."""
+    with pytest.raises(ValueError):
+        get_exporter(str(tmp_path / f"stops{suffix}"))
+    assert not list(tmp_path.iterdir())
+
+
+def test_stop_exporter_is_abstract(tmp_path):
+    """Test that the exporter base class needs a subclass implementing export_batches."""
+    with pytest.raises(TypeError):
+        StopExporter(str(tmp_path / "stops.out"))
@@ -0,0 +1,114 @@
+import gzip
+import io
+import os
+import shutil
+import threading
+import pytest
+from vessel_tracker.utils import file as file_module
+from vessel_tracker.utils.file import (
+    ReadAhead, count_lines, iter_line_chunks, iter_lines, open_file_with_raw, resolve_gzip_backend
+)
+
+LINES = [f'{{"n": {i}}}\n'.encode() for i in range(5000)] + [b'{"n": "last"}']
+
+
+@pytest.fixture
+def gzip_input(tmp_path):
+    path = tmp_path / "input.json.gz"
+    with gzip.open(path, 'wb') as f:
+        f.write(b''.join(LINES))
+    return str(path)
+
+
+def read_all_lines(path):
+    f, raw = open_file_with_raw(path)
+    with raw, f:
+        lines = list(iter_lines(f, block_bytes=1000))
+        return lines, raw.tell()
+
+
+def test_iter_lines_gzip(gzip_input):
+    """Test that block-split lines of a gzip input match the original lines."""
+    lines, consumed = read_all_lines(gzip_input)
+    assert lines == LINES
+    assert consumed == shutil.os.path.getsize(gzip_input)
+    assert count_lines(gzip_input) == len(LINES)
+
+
+def test_pigz_backend(gzip_input, monkeypatch):
+    """Test the subprocess backend, using gzip -dc in place of pigz."""
+    if shutil.which("gzip") is None:
+        pytest.skip("gzip executable not available")
+    monkeypatch.setattr(file_module, "PIGZ_COMMAND", ("gzip", "-dc"))
+    file_module.set_gzip_backend("pigz")
+    try:
+        f, raw = open_file_with_raw(gzip_input)
+        assert isinstance(f, file_module.PigzReader)
+        f.close()
+        raw.close()
+        lines, consumed = read_all_lines(gzip_input)
+    finally:
+        file_module.set_gzip_backend("auto")
+    assert lines == LINES
+    assert consumed == shutil.os.path.getsize(gzip_input)
+
+
+def test_pigz_backend_reports_corrupt_input(tmp_path, monkeypatch):
+    """Test that a failing decompression process raises instead of ending quietly."""
+    if shutil.which("gzip") is None:
+        pytest.skip("gzip executable not available")
+    monkeypatch.setattr(file_module, "PIGZ_COMMAND", ("gzip", "-dc"))
+    path = tmp_path / "corrupt.json.gz"
+    path.write_bytes(gzip.compress(b''.join(LINES))[:-20])
+    with open(path, 'rb') as raw, pytest.raises(OSError):
+        reader = file_module.open_gzip(raw, "pigz")
+        with reader:
+            while reader.read(1 << 16):
+                pass
+
+
+def test_read_ahead():
+    """Test sized and unsized reads and the propagation of reader errors."""
+    data = bytes(range(256)) * 100
+    reader = ReadAhead(io.BytesIO(data), block_bytes=1000, depth=2)
+    assert reader.read(10) == data[:10]
+    assert reader.read(2500) == data[10:2510]
+    assert reader.read() == data[2510:]
+    assert reader.read(10) == b''
+    reader.close()
+
+    class Broken(io.BytesIO):
+        def read(self, size=-1):
+            raise EOFError("truncated")
+
+    reader = ReadAhead(Broken())
+    with pytest.raises(EOFError):
+        reader.read(10)
+    reader.close()
+
+
+def test_resolve_gzip_backend():
+    """Test backend resolution and fallbacks."""
+    assert resolve_gzip_backend("gzip") == "gzip"
+    assert resolve_gzip_backend("pigz", subprocess_ok=False) in ("isal", "zlib-ng", "gzip")
+    assert resolve_gzip_backend("auto") in ("isal", "zlib-ng", "pigz", "gzip")
+    with pytest.raises(ValueError):
+        file_module.set_gzip_backend("bzip2")
+
+
+def test_iter_line_chunks_pipe_yields_lines_as_they_arrive():
+    """Test that a pipe's lines are yielded without waiting for a full block."""
+    read_fd, write_fd = os.pipe()
+    with open(read_fd, 'rb') as f, open(write_fd, 'wb', buffering=0) as writer:
+        writer.write(b'{"n": 1}\n{"n": 2}\n{"n": ')
+        chunks = iter_line_chunks(f, block_bytes=1 << 20)
+        received = []
+        reader = threading.Thread(target=lambda: received.append(next(chunks)), daemon=True)
+        reader.start()
+        reader.join(5)
+        writer.write(b'3}\n')
+        writer.close()
+        reader.join(5)
+
+        assert received[0] == [b'{"n": 1}\n', b'{"n": 2}\n']
+        assert list(chunks) == [[b'{"n": 3}\n']]
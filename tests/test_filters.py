@@ -0,0 +1,95 @@
+import json
+import pytest
+from vessel_tracker.utils.filters import PositionFilter, load_mmsi_file, parse_bbox, parse_timestamp
+from vessel_tracker.utils.parsing import Decoder
+from vessel_tracker.utils.spatial import GridIndex, Polygon, polygons_from_geojson
+
+SQUARE = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0), (0.0, 0.0)]
+HOLE = [(4.0, 4.0), (6.0, 4.0), (6.0, 6.0), (4.0, 6.0), (4.0, 4.0)]
+
+
+def test_parse_timestamp():
+    """Test parsing epoch seconds and ISO 8601 times."""
+    assert parse_timestamp("1704067200") == 1704067200
+    assert parse_timestamp("2024-01-01") == 1704067200
+    assert parse_timestamp("2024-01-01T00:00:00Z") == 1704067200
+    assert parse_timestamp("2024-01-01T01:00:00+01:00") == 1704067200
+
+
+def test_parse_bbox():
+    """Test parsing a bounding box."""
+    assert parse_bbox("-10,50,2.5,60") == (-10.0, 50.0, 2.5, 60.0)
+    with pytest.raises(ValueError):
+        parse_bbox("1,2,3")
+    with pytest.raises(ValueError):
+        parse_bbox("0,60,1,50")
+
+
+def test_load_mmsi_file(tmp_path):
+    """Test reading MMSIs with comments and mixed separators."""
+    path = tmp_path / "fleet.txt"
+    path.write_text("# fleet\n123456789, 987654321\n111111111  # tug\n")
+    assert load_mmsi_file(str(path)) == {"123456789", "987654321", "111111111"}
+
+
+def test_accepts_window_and_fleet(sample_position):
+    """Test the time window (since inclusive, until exclusive) and MMSI filters."""
+    ts = sample_position.timestamp
+    position_filter = PositionFilter(since=ts, until=ts + 10, mmsis={"123456789"})
+    assert position_filter.accepts(0.0, 0.0, ts, "123456789")
+    assert not position_filter.accepts(0.0, 0.0, ts + 10, "123456789")
+    assert not position_filter.accepts(0.0, 0.0, ts - 1, "123456789")
+    assert not position_filter.accepts(0.0, 0.0, ts, "987654321")
+
+
+def test_accepts_bbox_across_antimeridian():
+    """Test a bounding box that wraps around 180 degrees."""
+    position_filter = PositionFilter(bbox=(170, -10, -170, 10))
+    assert position_filter.accepts(0.0, 175.0, 0, "1")
+    assert position_filter.accepts(0.0, -175.0, 0, "1")
+    assert not position_filter.accepts(0.0, 0.0, 0, "1")
+    assert not position_filter.accepts(20.0, 175.0, 0, "1")
+
+
+def test_prefilter(sample_message):
+    """Test that raw lines are only rejected when the values are unambiguous."""
+    line = json.dumps(sample_message).encode()
+    ts = sample_message["UTCTimeStamp"]
+    assert PositionFilter(mmsis={"123456789"}).prefilter(line)
+    assert not PositionFilter(mmsis={"987654321"}).prefilter(line)
+    assert not PositionFilter(since=ts + 1).prefilter(line)
+    assert PositionFilter(since=ts).prefilter(line)
+    # A float timestamp is left to the full decode
+    assert PositionFilter(since=ts + 1).prefilter(line.replace(b'1704067200', b'1704067200.0'))
+
+
+def test_decoder_counts_filtered(sample_message):
+    """Test that the decoder applies the filter and counts rejections."""
+    decoder = Decoder('json', position_filter=PositionFilter(mmsis={"987654321"}))
+    assert decoder.parse_fields(json.dumps(sample_message).encode()) is None
+    assert decoder.parse_fields(json.dumps(sample_message)) is None
+    assert decoder.filtered == 2
+
+
+def test_polygon_with_hole():
+    """Test point-in-polygon with a hole."""
+    polygon = Polygon(SQUARE, [HOLE])
+    assert polygon.contains(2.0, 2.0)
+    assert not polygon.contains(5.0, 5.0)
+    assert not polygon.contains(11.0, 5.0)
+
+
+def test_grid_index():
+    """Test region lookup through the grid index."""
+    data = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"name": "a"},
+         "geometry": {"type": "Polygon", "coordinates": [SQUARE, HOLE]}},
+        {"type": "Feature", "properties": {"name": "b"},
+         "geometry": {"type": "MultiPolygon", "coordinates": [[HOLE]]}},
+    ]}
+    index = GridIndex(polygons_from_geojson(data), cell_size=2.0)
+    assert index.polygons[index.locate(1.0, 1.0)].properties["name"] == "a"
+    assert index.polygons[index.locate(5.0, 5.0)].properties["name"] == "b"
+    assert index.locate(20.0, 20.0) == -1
+    assert PositionFilter(region=index).accepts(1.0, 1.0, 0, "1")
+    assert not PositionFilter(region=index).accepts(-1.0, 1.0, 0, "1")
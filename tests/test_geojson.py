@@ -0,0 +1,9 @@
+import json
+import pytest
+from vessel_tracker.utils.geojson import json_number
+
+
+@pytest.mark.parametrize("value", [0.0, -0.1278, 51.5074, 1e-7, 1e22, float("nan"), float("inf")])
+def test_json_number_matches_json_dumps(value):
+    """Test that floats are formatted exactly as json.dumps formats them."""
+    assert json_number(value) == json.dumps(value)
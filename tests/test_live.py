@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+import pytest
+from vessel_tracker.core.live import (
+    GeoJSONSeqSink, LiveIngest, close_source, open_source, parse_source, replay, serve_replay
+)
+from vessel_tracker.core.streaming import StreamingStopDetector
+from vessel_tracker.models.episode import StopEpisode
+from vessel_tracker.replay import parse_args, serve
+from vessel_tracker.utils.metrics import Metrics
+from helpers import batch_stops, time_ordered_feed
+
+
+def write_feed(path, feed):
+    with open(path, 'w') as f:
+        for p in feed:
+            message = {"Message": {"MessageID": 1, "UserID": p.mmsi, "Latitude": p.lat, "Longitude": p.lon},
+                       "UTCTimeStamp": p.timestamp}
+            f.write(json.dumps(message) + "\n")
+        f.write("not json\n")
+
+
+async def ingest_from_replay(paths, output_path, queue_size=8, rate=None):
+    server = await serve_replay(paths, rate=rate)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader = await open_source(f"tcp://127.0.0.1:{port}")
+        sink = GeoJSONSeqSink(str(output_path))
+        ingest = LiveIngest(StreamingStopDetector(min_duration=1800), sink, queue_size=queue_size)
+        try:
+            return await ingest.run(reader)
+        finally:
+            sink.close()
+            await close_source(reader)
+            assert reader.writer.is_closing()
+
+
+def test_live_ingest_matches_batch(tmp_path):
+    """Test that stops read from a replay server match batch detection."""
+    feed = time_ordered_feed()
+    write_feed(tmp_path / "feed.json", feed)
+    output_path = tmp_path / "stops.geojsonl"
+
+    stats = asyncio.run(ingest_from_replay([tmp_path / "feed.json"], output_path, queue_size=1))
+
+    features = [json.loads(line) for line in output_path.read_text().splitlines()]
+    expected = batch_stops(feed, 1800)
+    assert len(expected) > 0
+    assert sorted((f["properties"]["mmsi"], f["properties"]["timestamp"], f["properties"]["end_timestamp"])
+                  for f in features) == \
+        sorted((stop.mmsi, stop.timestamp, stop.end_timestamp) for stop in expected)
+    assert stats.lines == len(feed) + 1
+    assert stats.positions == len(feed)
+    assert stats.json_errors == 1
+    assert stats.stops == len(expected)
+    assert stats.queue_peak <= 1
+    metrics = Metrics()
+    stats.record(metrics)
+    latency = metrics.to_dict()["distributions"]["latency_ms"]
+    assert latency["count"] == stats.stops
+    assert 0 <= latency["min"] <= latency["mean"] <= latency["max"]
+    assert "latency_mean_ms" not in metrics.counters
+
+
+def test_sink_overwrites_unless_appending(tmp_path):
+    """Test that a sink replaces the output by default and adds to it with append."""
+    path = tmp_path / "stops.geojsonl"
+    stop = StopEpisode(lat=1.0, lon=2.0, timestamp=10, mmsi="987", end_timestamp=20)
+    for append, lines in ((False, 1), (False, 1), (True, 2)):
+        sink = GeoJSONSeqSink(str(path), append=append)
+        sink.write([stop])
+        sink.close()
+        assert len(path.read_text().splitlines()) == lines
+
+
+def test_replay_rate(tmp_path):
+    """Test that the replay server paces lines at the requested rate."""
+    path = tmp_path / "feed.json"
+    path.write_text("{}\n" * 200)
+
+    async def discard(reader, writer):
+        await reader.read()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(discard, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            start = time.monotonic()
+            sent = await replay([str(path)], writer, rate=1000)
+            elapsed = time.monotonic() - start
+            writer.close()
+            await writer.wait_closed()
+            return sent, elapsed
+
+    sent, elapsed = asyncio.run(run())
+    assert sent == 200
+    assert elapsed >= 0.15
+
+
+def test_replay_server(tmp_path, capsys):
+    """Test that the replay command serves its files to a client, reporting its address."""
+    path = tmp_path / "feed.json"
+    path.write_text("{}\n" * 20)
+
+    async def run():
+        server = asyncio.create_task(serve(parse_args([str(path), "--port", "0"])))
+        while "tcp://" not in (announced := capsys.readouterr().err):
+            await asyncio.sleep(0.01)
+        port = int(announced.strip().rsplit(":", 1)[1])
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        data = await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        server.cancel()
+        return data
+
+    assert asyncio.run(run()) == b"{}\n" * 20
+
+
+def test_parse_source():
+    """Test live source parsing."""
+    assert parse_source("-") is None
+    assert parse_source("tcp://localhost:5631") == ("localhost", 5631)
+    assert parse_source("tcp://[::1]:5631") == ("::1", 5631)
+    with pytest.raises(ValueError):
+        parse_source("feed.json")
+    with pytest.raises(ValueError):
+        parse_source("tcp://localhost")
@@ -0,0 +1,77 @@
+import json
+import time
+
+from vessel_tracker.core import process_vessel_data
+from vessel_tracker.utils.metrics import Metrics
+
+
+def test_stage_times_are_exclusive():
+    """Test that time in a nested stage is not charged to the outer one."""
+    metrics = Metrics()
+    with metrics.stage("outer"):
+        with metrics.stage("inner"):
+            time.sleep(0.05)
+
+    assert metrics.stages["inner"]["wall_seconds"] >= 0.05
+    assert metrics.stages["outer"]["wall_seconds"] < 0.05
+
+
+def test_distributions():
+    """Test that observed values are summarised as count, min, mean and max."""
+    metrics = Metrics()
+    metrics.observe("latency", 0.5, count=3)
+    metrics.observe("latency", 2.0)
+    other = Metrics()
+    other.distribution("latency").merge(metrics.distribution("latency"), scale=1000)
+
+    assert metrics.to_dict()["distributions"] == {"latency": {"count": 4, "min": 0.5, "mean": 0.875, "max": 2.0}}
+    assert other.to_dict()["distributions"]["latency"] == {"count": 4, "min": 500, "mean": 875, "max": 2000}
+    assert "distributions" not in Metrics().to_dict()
+
+
+def test_timed_charges_only_item_production():
+    """Test that a timed iterable excludes the consumer's time between items."""
+    def produce():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+
+    metrics = Metrics()
+    with metrics.stage("consume"):
+        for _ in metrics.timed("produce", produce()):
+            time.sleep(0.02)
+
+    assert metrics.stages["produce"]["calls"] == 4
+    assert 0.03 <= metrics.stages["produce"]["wall_seconds"] < 0.06
+    assert metrics.stages["consume"]["wall_seconds"] >= 0.06
+
+
+def test_profiling_hooks(tmp_path):
+    """Test the cProfile and tracemalloc hooks."""
+    profile_path = tmp_path / "run.prof"
+    with Metrics(profile_path=str(profile_path), trace_memory=True) as metrics:
+        data = [bytes(1024) for _ in range(100)]
+
+    assert profile_path.exists()
+    assert metrics.memory["peak_bytes"] >= 100 * 1024
+    assert metrics.total["wall_seconds"] > 0
+    del data
+
+
+def test_process_vessel_data_metrics(sample_message, tmp_path):
+    """Test that a pipeline run records its stages and counters."""
+    input_path = tmp_path / "input.json"
+    input_path.write_text(json.dumps(sample_message) + "\nnot json\n")
+    output_path = tmp_path / "output.geojson"
+    metrics_path = tmp_path / "metrics.json"
+
+    with Metrics() as metrics:
+        process_vessel_data(str(input_path), str(output_path), metrics=metrics)
+    metrics.write(str(metrics_path))
+
+    data = json.loads(metrics_path.read_text())
+    assert set(data["stages"]) == {"read", "parse", "group", "analyze", "export"}
+    assert data["counters"]["lines_read"] == 2
+    assert data["counters"]["json_errors"] == 1
+    assert data["counters"]["vessels"] == 1
+    assert data["counters"]["stops"] == 0
@@ -0,0 +1,98 @@
+import json
+import gzip
+import tempfile
+from pathlib import Path
+
+from vessel_tracker.core.parallel import parallel_batches, parse_block, byte_ranges
+from vessel_tracker.core.processor import MessageProcessor
+
+
+def create_feed(sample_message: dict, count: int, compress: bool = False) -> Path:
+    """Helper to create a feed mixing valid, invalid and malformed lines."""
+    lines = []
+    for i in range(count):
+        message = json.loads(json.dumps(sample_message))
+        message["Message"]["UserID"] = str(100000000 + i % 7)
+        message["Message"]["Latitude"] += i * 0.001
+        message["UTCTimeStamp"] += i
+        if i % 5 == 0:
+            message["Message"]["MessageID"] = 5
+        lines.append(json.dumps(message))
+        if i % 11 == 0:
+            lines.append("{not json")
+    data = ("\n".join(lines) + "\n").encode()
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.json.gz' if compress else '.json') as f:
+        f.write(gzip.compress(data) if compress else data)
+        return Path(f.name)
+
+
+def test_parse_block_counts_lines(sample_message):
+    """Test that blank and malformed lines are counted but skipped."""
+    block = f"{json.dumps(sample_message)}\n\n{{bad\n".encode()
+
+    batch = parse_block(block)
+
+    assert len(batch) == 1
+    assert batch.lines == 3
+    assert batch.mmsi_table == ["123456789"]
+
+
+def test_byte_ranges_cover_file(sample_message):
+    """Test that byte ranges are contiguous and cover the whole file."""
+    test_file = create_feed(sample_message, 50)
+
+    try:
+        ranges = byte_ranges(str(test_file), 1000)
+
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == test_file.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    finally:
+        test_file.unlink()
+
+
+def test_parallel_matches_serial(sample_message):
+    """Test that parallel parsing yields the same positions as the serial path."""
+    for compress in (False, True):
+        test_file = create_feed(sample_message, 300, compress=compress)
+
+        try:
+            serial = list(MessageProcessor(str(test_file)).process_messages())
+            batches = list(parallel_batches(str(test_file), workers=2, chunk_bytes=997))
+            parallel = [pos for batch in batches for pos in batch.positions()]
+
+            assert len(batches) > 1
+            assert parallel == serial
+        finally:
+            test_file.unlink()
+
+
+def test_processor_workers(sample_message):
+    """Test the processor's workers option."""
+    test_file = create_feed(sample_message, 40)
+
+    try:
+        processor = MessageProcessor(str(test_file), workers=2)
+        positions = list(processor.process_messages())
+
+        assert positions == list(MessageProcessor(str(test_file)).process_messages())
+        assert processor.lines_read == 44
+    finally:
+        test_file.unlink()
+
+
+def test_parallel_splits_only_at_newlines(sample_message, tmp_path):
+    """Test that a bare \\r (valid JSON whitespace) does not split a line, serially or in parallel."""
+    data = (json.dumps(sample_message, separators=(",\r", ":")) + "\n").encode() * 20
+
+    for name, content in (("feed.json", data), ("feed.json.gz", gzip.compress(data))):
+        path = tmp_path / name
+        path.write_bytes(content)
+        serial = MessageProcessor(str(path))
+        positions = list(serial.process_messages())
+        parallel = MessageProcessor(str(path), workers=2)
+
+        assert list(parallel.process_messages()) == positions
+        assert len(positions) == 20
+        assert (parallel.lines_read, parallel.json_errors) == (serial.lines_read, serial.json_errors) == (20, 0)
@@ -0,0 +1,42 @@
+import json
+import pytest
+
+from vessel_tracker.utils.parsing import Decoder, is_position_candidate, resolve_backend
+
+
+def test_prefilter_rejects_non_position_types(sample_message):
+    """Test that static and voyage reports are skipped before decoding."""
+    for msg_id in (5, 24):
+        message = {**sample_message, "Message": {**sample_message["Message"], "MessageID": msg_id}}
+        assert not is_position_candidate(json.dumps(message).encode())
+
+    assert is_position_candidate(json.dumps(sample_message).encode())
+
+
+def test_prefilter_defers_ambiguous_lines():
+    """Test that lines the prefilter can't decide on are left to the decoder."""
+    assert is_position_candidate(b'{"Message": {"MessageID": "5"}}')
+    assert is_position_candidate(b'{"Message": {"MessageID": 0.5e1}}')
+    assert is_position_candidate(b'{"MessageID": 5, "Message": {"MessageID": 1}}')
+    assert is_position_candidate(b'not json at all')
+
+
+@pytest.mark.parametrize("backend", ["json", "auto"])
+def test_decoder_parse_line(sample_message, backend):
+    """Test decoding a raw line into a Position."""
+    decoder = Decoder(backend)
+
+    position = decoder.parse_line(json.dumps(sample_message).encode())
+
+    assert position.mmsi == "123456789"
+    assert position.lat == 51.5074
+    assert position.timestamp == 1704067200
+    assert decoder.parse_line(b'[1, 2]') is None
+    with pytest.raises(ValueError):
+        decoder.parse_line(b'{broken')
+
+
+def test_resolve_backend():
+    """Test that explicit backends are kept and auto resolves to an installed one."""
+    assert resolve_backend("json") == "json"
+    assert resolve_backend("auto") in ("orjson", "simdjson", "json")
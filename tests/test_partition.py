@@ -0,0 +1,75 @@
+import os
+import pytest
+from vessel_tracker.core import partition as partition_module
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.cleaning import Cleaning
+from vessel_tracker.core.partition import PartitionedAnalyzer, read_partition
+from vessel_tracker.models import store as store_module
+from helpers import random_vessel_data
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    """Run with numpy, or with numpy hidden to exercise the pure Python paths."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(partition_module, "np", None)
+        monkeypatch.setattr(store_module, "np", None)
+    return request.param
+
+
+def in_memory_stops(positions, min_duration, cleaning=None):
+    analyzer = VesselAnalyzer(min_duration=min_duration, cleaning=cleaning)
+    analyzer.group_positions(positions)
+    return analyzer.find_stops()
+
+
+@pytest.mark.parametrize("options", [
+    {"partitions": 1},
+    {"partitions": 7},
+    {"partitions": 3, "memory_budget": 72 * 500},
+    {"partitions": 4, "workers": 2},
+])
+def test_partitioned_matches_in_memory(backend, options, tmp_path, monkeypatch):
+    """Test that partitioned analysis finds the same stops, in the same order."""
+    monkeypatch.setattr(partition_module, "SPILL_ROWS", 1000)
+    data = random_vessel_data(vessels=30)
+    positions = [p for vessel in data.values() for p in vessel]
+    expected = in_memory_stops(positions, 1800)
+
+    engine = "python" if backend == "python" else "auto"
+    with PartitionedAnalyzer(min_duration=1800, spill_dir=str(tmp_path), engine=engine,
+                             **options) as analyzer:
+        analyzer.group_positions(positions)
+        stops = analyzer.find_stops()
+        directory = analyzer.directory
+
+    assert len(expected) > 0
+    assert stops == expected
+    assert not os.path.exists(directory)
+
+
+def test_partitioned_cleaning(tmp_path):
+    """Test that partition workers clean tracks like the in-memory analyzer."""
+    cleaning = Cleaning(max_speed=20, smooth_window=3)
+    positions = [p for vessel in random_vessel_data(vessels=30).values() for p in vessel]
+    expected = in_memory_stops(positions, 1800, cleaning)
+
+    with PartitionedAnalyzer(min_duration=1800, partitions=4, workers=2, spill_dir=str(tmp_path),
+                             cleaning=cleaning) as analyzer:
+        analyzer.group_positions(positions)
+        assert analyzer.find_stops() == expected
+
+
+def test_memory_budget_splits_partitions(tmp_path):
+    """Test that a partition over the memory budget is re-partitioned into files that fit."""
+    data = random_vessel_data(vessels=40)
+    with PartitionedAnalyzer(partitions=1, memory_budget=72 * 1000, spill_dir=str(tmp_path)) as analyzer:
+        analyzer.group_positions(p for vessel in data.values() for p in vessel)
+        files = analyzer._partition_files()
+
+        assert len(files) > 1
+        assert sum(len(read_partition(path)[2]) for path in files) == analyzer.rows == 8000
+        vessels = [set(read_partition(path)[3]) for path in files]
+        assert sum(len(v) for v in vessels) == len(set().union(*vessels)) == 40
@@ -0,0 +1,94 @@
+import csv
+import json
+import random
+import pytest
+from vessel_tracker.core import process_vessel_data
+from vessel_tracker.core.ports import PortIndex
+from vessel_tracker.utils import spatial
+from vessel_tracker.utils.spatial import GridIndex, Polygon
+
+BASE = 1_704_067_200
+
+
+def square(lon, lat, size, **properties):
+    ring = [(lon, lat), (lon + size, lat), (lon + size, lat + size), (lon, lat + size), (lon, lat)]
+    return Polygon(ring, properties=properties)
+
+
+def port_features(polygons):
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": p.properties,
+         "geometry": {"type": "Polygon", "coordinates": [[list(point) for point in p.exterior]]}}
+        for p in polygons
+    ]}
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_locate_many_matches_locate(use_numpy, monkeypatch):
+    """Test that batch lookups agree with single lookups, with and without numpy."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(spatial, "np", None)
+    rng = random.Random(3)
+    polygons = [square(rng.uniform(-10, 10), rng.uniform(-10, 10), rng.uniform(0.05, 0.5))
+                for _ in range(500)]
+    index = GridIndex(polygons, cell_size=None)
+    lat = [rng.uniform(-10, 10.5) for _ in range(5000)]
+    lon = [rng.uniform(-10, 10.5) for _ in range(5000)]
+
+    found = index.locate_many(lat, lon)
+    assert list(found) == [index.locate(y, x) for y, x in zip(lat, lon)]
+    assert sum(i >= 0 for i in found) > 100
+    assert index.cell_size < 1.0
+
+
+def test_port_index_prefers_smallest_polygon():
+    """Test that an anchorage inside a port area takes precedence, and unnamed features."""
+    index = PortIndex([square(0, 0, 1.0, name="Harbour"), square(0.2, 0.2, 0.1, name="Anchorage"),
+                       square(5, 5, 1.0)])
+    assert index.label(0.25, 0.25) == "Anchorage"
+    assert index.label(0.5, 0.5) == "Harbour"
+    assert index.label(5.5, 5.5) == "2"
+    assert index.label(3.0, 3.0) is None
+
+
+def write_stops_input(path):
+    """Three vessels stopping for two hours, two in the harbour and one at sea, each then moving off."""
+    stops = [("1", 0.5, 0.5), ("2", 0.6, 0.6), ("3", 3.0, 3.0)]
+    with open(path, "w") as f:
+        for mmsi, lat, lon in stops:
+            for i, offset in enumerate((0, 1800, 3600, 5400, 7200, 9000)):
+                moved = 1.0 if i == 5 else 0.0
+                f.write(json.dumps({"Message": {"MessageID": 1, "UserID": mmsi, "Latitude": lat + moved,
+                                                "Longitude": lon}, "UTCTimeStamp": BASE + offset}) + "\n")
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_process_with_ports(tmp_path, streaming):
+    """Test stop labels in the output and the per-port summary."""
+    write_stops_input(tmp_path / "input.json")
+    ports_path = tmp_path / "ports.geojson"
+    ports_path.write_text(json.dumps(port_features([square(0, 0, 1.0, name="Harbour")])))
+
+    process_vessel_data(str(tmp_path / "input.json"), str(tmp_path / "stops.geojson"), streaming=streaming,
+                        ports=PortIndex.from_file(str(ports_path)), port_summary=str(tmp_path / "ports.csv"))
+
+    features = json.loads((tmp_path / "stops.geojson").read_text())["features"]
+    labels = {f["properties"]["mmsi"]: f["properties"].get("port") for f in features}
+    assert labels == {"1": "Harbour", "2": "Harbour", "3": None}
+    with open(tmp_path / "ports.csv") as f:
+        summary = list(csv.DictReader(f))
+    assert summary == [{"port": "Harbour", "stops": "2", "vessels": "2", "dwell": "18000",
+                        "mean_dwell": "9000.0"}]
+
+
+def test_csv_port_column(tmp_path):
+    """Test that labelled stops get a port column in CSV output."""
+    write_stops_input(tmp_path / "input.json")
+    index = PortIndex([square(0, 0, 1.0, name="Harbour")])
+    process_vessel_data(str(tmp_path / "input.json"), str(tmp_path / "stops.csv"), ports=index)
+
+    with open(tmp_path / "stops.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["port"] for row in rows] == ["Harbour", "Harbour", ""]
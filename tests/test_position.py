@@ -0,0 +1,98 @@
+import dataclasses
+import pickle
+import threading
+import pytest
+from vessel_tracker.models.episode import StopEpisode
+from vessel_tracker.models.position import MMSI_TABLE, Position, intern_mmsi
+from vessel_tracker.utils.parsing import Decoder, parse_position_fields
+
+
+def test_position_interns_mmsi(sample_position):
+    """Test that positions share one interned MMSI, given as text or as an integer."""
+    other = Position(lat=0.0, lon=0.0, timestamp=0, mmsi=123456789)
+    assert other.mmsi_id == sample_position.mmsi_id
+    assert other.mmsi == "123456789"
+    assert MMSI_TABLE[sample_position.mmsi_id] is other.mmsi
+    assert not hasattr(sample_position, "__dict__")
+
+
+def test_position_compatibility(sample_position):
+    """Test that to_dict, datetime, equality and repr still read as the MMSI text."""
+    feature = sample_position.to_dict()
+    assert feature["properties"] == {"mmsi": "123456789", "timestamp": 1704067200,
+                                     "datetime": "2024-01-01T00:00:00"}
+    assert sample_position.datetime.year == 2024
+    assert sample_position == Position(51.5074, -0.1278, 1704067200, "123456789")
+    assert "mmsi='123456789'" in repr(sample_position)
+
+
+def test_position_pickles_mmsi_text(sample_position):
+    """Test that pickles carry the MMSI itself, since ids are per process."""
+    episode = StopEpisode(lat=1.0, lon=2.0, timestamp=10, mmsi="987", end_timestamp=20, port="Harbour")
+    assert b"123456789" in pickle.dumps(sample_position)
+    assert pickle.loads(pickle.dumps(sample_position)) == sample_position
+    assert pickle.loads(pickle.dumps(episode)) == episode
+
+
+def test_frozen_position(sample_position):
+    """Test that a frozen copy is hashable and immutable."""
+    frozen = sample_position.frozen()
+    assert frozen.mmsi == sample_position.mmsi
+    assert frozen.to_dict() == sample_position.to_dict()
+    assert len({frozen, sample_position.frozen()}) == 1
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        frozen.lat = 0.0
+
+
+def test_parsed_mmsi_is_shared(sample_message):
+    """Test that repeated reports from a vessel reuse one MMSI string."""
+    message = {**sample_message, "Message": {**sample_message["Message"], "UserID": 555}}
+    first, second = parse_position_fields(message), parse_position_fields(dict(message))
+    assert first[3] == "555"
+    assert first[3] is second[3]
+
+
+def test_parse_skips_malformed_fields(sample_message):
+    """Test that wrongly typed fields skip the message or are read as text, never raise."""
+    def with_field(field, value):
+        return {**sample_message, "Message": {**sample_message["Message"], field: value}}
+
+    assert parse_position_fields(with_field("Latitude", None)) is None
+    assert parse_position_fields(with_field("UserID", [1, 2]))[3] == "[1, 2]"
+
+
+@pytest.mark.parametrize("backend", ["json", "auto"])
+def test_parse_skips_mistyped_message(backend):
+    """Test that a Message that isn't an object is counted as a non-position, not raised."""
+    line = b'{"Message": [1], "UTCTimeStamp": 1}'
+    decoder = Decoder(backend)
+
+    assert decoder.parse_fields(line) is None
+    assert decoder.non_position == 1
+    assert parse_position_fields({"Message": [1], "UTCTimeStamp": 1}) is None
+
+
+def test_mmsi_is_interned_by_text():
+    """Test that raw values with equal hashes but different text get their own MMSI."""
+    assert Position(0.0, 0.0, 0, True).mmsi == "True"
+    assert Position(0.0, 0.0, 0, 1).mmsi == "1"
+    assert Position(0.0, 0.0, 0, 5.0).mmsi == "5.0"
+    assert Position(0.0, 0.0, 0, 5).mmsi == "5"
+
+
+def test_intern_mmsi_across_threads():
+    """Test that threads interning the same new MMSIs agree on one id each."""
+    mmsis = [f"thread-{i}" for i in range(2000)]
+    results = []
+
+    def intern_all():
+        results.append([intern_mmsi(mmsi) for mmsi in mmsis])
+
+    threads = [threading.Thread(target=intern_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(ids == results[0] for ids in results)
+    assert [MMSI_TABLE[mmsi_id] for mmsi_id in results[0]] == mmsis
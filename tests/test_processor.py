@@ -3,8 +3,12 @@ import json
 import tempfile
 import gzip
 from pathlib import Path
-from vessel_tracker.core.processor import MessageProcessor
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.processor import MessageProcessor, MultiFileProcessor
 from vessel_tracker.utils.parsing import parse_position_message
+from vessel_tracker.utils.file import expand_inputs, read_sidecar_count, sidecar_path
+from vessel_tracker.utils.filters import PositionFilter
+from vessel_tracker.utils.metrics import Metrics
 
 
 def create_test_file(messages: list[dict], compress: bool = False) -> Path:
@@ -60,3 +64,139 @@ def test_process_invalid_file():
     with pytest.raises(FileNotFoundError):
         processor = MessageProcessor("/nonexistent/file.json")
         list(processor.process_messages())
+
+
+def test_process_messages_single_pass(sample_message, monkeypatch):
+    """Test that the default mode does not pre-scan the input."""
+    test_file = create_test_file([sample_message] * 3, compress=True)
+
+    def fail(_):
+        raise AssertionError("count_lines should not be called")
+
+    monkeypatch.setattr("vessel_tracker.core.processor.count_lines", fail)
+    try:
+        processor = MessageProcessor(str(test_file))
+        positions = list(processor.process_messages())
+
+        assert len(positions) == 3
+        assert processor.lines_read == 3
+    finally:
+        test_file.unlink()
+
+
+def test_process_messages_exact_count(sample_message):
+    """Test the opt-in exact count pre-scan."""
+    test_file = create_test_file([sample_message] * 2, compress=True)
+
+    try:
+        processor = MessageProcessor(str(test_file), exact_count=True)
+        positions = list(processor.process_messages())
+
+        assert len(positions) == 2
+        assert processor.total_messages == 2
+    finally:
+        test_file.unlink()
+
+
+def test_process_messages_sidecar(sample_message):
+    """Test writing and reading the sidecar line count index."""
+    test_file = create_test_file([sample_message] * 2)
+    sidecar = Path(sidecar_path(str(test_file)))
+
+    try:
+        list(MessageProcessor(str(test_file), write_sidecar=True).process_messages())
+
+        assert read_sidecar_count(str(test_file)) == 2
+
+        # Appending to the input invalidates the count
+        with open(test_file, 'a') as f:
+            f.write(json.dumps(sample_message) + "\n")
+        assert read_sidecar_count(str(test_file)) is None
+    finally:
+        test_file.unlink()
+        sidecar.unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_counters(sample_message, tmp_path, workers):
+    """Test that rejected lines are counted by reason, serially and in parallel."""
+    path = tmp_path / "messages.json"
+    lines = [
+        json.dumps(sample_message),
+        json.dumps({**sample_message, "Message": {**sample_message["Message"], "MessageID": 5}}),
+        json.dumps({**sample_message, "Message": {**sample_message["Message"], "Latitude": "invalid"}}),
+        '{"Message": {"MessageID": 1',
+    ]
+    path.write_text("\n".join(lines) + "\n")
+
+    metrics = Metrics()
+    processor = MessageProcessor(str(path), workers=workers, metrics=metrics)
+    assert len(list(processor.process_messages())) == 1
+    assert metrics.counters == {
+        "lines_read": 4,
+        "json_errors": 1,
+        "non_position": 1,
+        "invalid_positions": 1,
+        "filtered": 0,
+        "positions": 1,
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_position_filter(sample_message, tmp_path, workers):
+    """Test that filtered positions are dropped and counted, serially and in parallel."""
+    path = tmp_path / "messages.json"
+    messages = [
+        sample_message,
+        {**sample_message, "Message": {**sample_message["Message"], "UserID": "999999999"}},
+        {**sample_message, "UTCTimeStamp": sample_message["UTCTimeStamp"] - 1},
+        {**sample_message, "Message": {**sample_message["Message"], "Latitude": 10.0}},
+    ]
+    path.write_text("".join(json.dumps(message) + "\n" for message in messages))
+
+    position_filter = PositionFilter(bbox=(-1, 51, 1, 52), since=sample_message["UTCTimeStamp"],
+                                     mmsis={"123456789"})
+    processor = MessageProcessor(str(path), workers=workers, position_filter=position_filter)
+    positions = list(processor.process_messages())
+
+    assert [pos.mmsi for pos in positions] == ["123456789"]
+    assert processor.filtered == 3
+
+
+def test_expand_inputs(tmp_path):
+    """Test expansion of files, globs and directories into a sorted, deduplicated list."""
+    for name in ("b.json.gz", "a.json", "notes.txt"):
+        (tmp_path / name).write_text("")
+    (tmp_path / "sub").mkdir()
+
+    directory = expand_inputs([str(tmp_path)])
+    assert directory == [str(tmp_path / "a.json"), str(tmp_path / "b.json.gz")]
+    assert expand_inputs([str(tmp_path / "*.gz"), str(tmp_path)]) == \
+        [str(tmp_path / "b.json.gz"), str(tmp_path / "a.json")]
+    with pytest.raises(FileNotFoundError):
+        expand_inputs([str(tmp_path / "missing.json")])
+    with pytest.raises(FileNotFoundError):
+        expand_inputs([str(tmp_path / "*.csv")])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_multi_file_stop_across_boundary(sample_message, tmp_path, workers):
+    """Test that a stop spanning two input files is found when they are processed together."""
+    messages = [
+        {**sample_message, "UTCTimeStamp": sample_message["UTCTimeStamp"] + offset}
+        for offset in (0, 1800, 3600, 5400)
+    ]
+    messages.append({**sample_message, "UTCTimeStamp": sample_message["UTCTimeStamp"] + 7200,
+                     "Message": {**sample_message["Message"], "Latitude": 52.5}})
+    with gzip.open(tmp_path / "day1.json.gz", "wt") as f:
+        f.writelines(json.dumps(msg) + "\n" for msg in messages[:2])
+    (tmp_path / "day2.json").write_text("".join(json.dumps(msg) + "\n" for msg in messages[2:]))
+
+    processor = MultiFileProcessor(expand_inputs([str(tmp_path)]), workers=workers)
+    analyzer = VesselAnalyzer()
+    analyzer.group_batches(processor.process_batches())
+    stops = analyzer.find_stops()
+
+    assert processor.lines_read == 5
+    assert len(stops) == 1
+    assert stops[0].timestamp == sample_message["UTCTimeStamp"]
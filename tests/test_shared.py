@@ -0,0 +1,87 @@
+import errno
+import os
+import pytest
+from vessel_tracker.core import analyzer as analyzer_module, shared as shared_module
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.cleaning import Cleaning
+from vessel_tracker.core.shared import SharedColumns, map_columns, parallel_episodes
+from helpers import make_store, random_vessel_data
+
+
+def test_shared_columns_round_trip(tmp_path):
+    """Test that a mapped column file matches the store and is removed on exit."""
+    store = make_store(random_vessel_data(vessels=3, points=20))
+
+    with SharedColumns(store, directory=str(tmp_path)) as shared:
+        lat, lon, timestamp, offsets = map_columns(shared.path)
+        assert list(lat) == list(store.lat)
+        assert list(lon) == list(store.lon)
+        assert list(timestamp) == list(store.timestamp)
+        assert list(offsets) == list(store.offsets)
+
+    assert not os.path.exists(shared.path)
+
+
+def test_shared_columns_fall_back_when_shared_dir_is_full(tmp_path, monkeypatch):
+    """Test that a failed write to the shared directory is removed and retried in the temp directory."""
+    store = make_store(random_vessel_data(vessels=3, points=20))
+    full, temp = tmp_path / "shm", tmp_path / "tmp"
+    full.mkdir()
+    temp.mkdir()
+    monkeypatch.setattr(shared_module, "SHARED_DIR", str(full))
+    monkeypatch.setattr(shared_module.tempfile, "tempdir", str(temp))
+    fdopen, calls = os.fdopen, []
+
+    def no_space(data):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    def fill_first(fd, mode):
+        f = fdopen(fd, mode)
+        calls.append(fd)
+        if len(calls) == 1:
+            f.write = no_space
+        return f
+
+    monkeypatch.setattr(shared_module.os, "fdopen", fill_first)
+
+    with SharedColumns(store, directory=str(full)) as shared:
+        assert os.path.dirname(shared.path) == str(temp)
+        assert list(map_columns(shared.path)[0]) == list(store.lat)
+        assert os.listdir(full) == []
+
+    with pytest.raises(OSError):
+        calls.clear()
+        SharedColumns(store, directory=str(temp))
+    assert os.listdir(temp) == []
+
+
+def test_parallel_ranges_cover_every_vessel_in_order():
+    """Test that the worker ranges cover each vessel once, in order."""
+    store = make_store(random_vessel_data(vessels=9, points=50))
+
+    vessels = sum(count for count, _, _ in parallel_episodes(store, 2, min_duration=1800))
+
+    assert vessels == store.vessel_count
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+@pytest.mark.parametrize("cleaning", [None, Cleaning()])
+def test_parallel_find_stops_matches_serial(engine, cleaning, monkeypatch):
+    """Test that a process pool finds the same stops, in the same order, as one process."""
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    data = random_vessel_data(vessels=12, points=150)
+    positions = [p for track in data.values() for p in track]
+
+    serial = VesselAnalyzer(min_duration=1800, engine=engine, cleaning=cleaning)
+    serial.group_positions(positions)
+    expected = serial.find_stops()
+
+    # Use the pool even for this small input
+    monkeypatch.setattr(analyzer_module, "PARALLEL_MIN_ROWS", 1)
+    parallel = VesselAnalyzer(min_duration=1800, engine=engine, cleaning=cleaning, workers=2)
+    parallel.group_positions(positions)
+    stops = parallel.find_stops()
+
+    assert len(expected) > 0
+    assert [stop.to_dict() for stop in stops] == [stop.to_dict() for stop in expected]
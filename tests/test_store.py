@@ -0,0 +1,49 @@
+import pytest
+
+from vessel_tracker.models import store as store_module
+from vessel_tracker.models.batch import PositionBatch
+from vessel_tracker.models.position import Position
+from vessel_tracker.models.store import PositionStore
+
+
+@pytest.fixture(params=["numpy", "python"])
+def sort_backend(request, monkeypatch):
+    """Run a test with both the numpy and pure Python sort."""
+    if request.param == "python":
+        monkeypatch.setattr(store_module, "np", None)
+    elif store_module.np is None:
+        pytest.skip("numpy not installed")
+    return request.param
+
+
+def test_store_groups_by_vessel_and_time(sort_backend):
+    """Test that sorting groups vessels in first-appearance order and orders by time."""
+    store = PositionStore()
+    store.append(1.0, 1.0, 30, "b")
+    store.append(2.0, 2.0, 10, "a")
+    store.append(3.0, 3.0, 20, "b")
+    store.append(4.0, 4.0, 20, "b")
+    store.append(5.0, 5.0, 10, "b")
+
+    data = store.to_dict()
+
+    assert list(data) == ["b", "a"]
+    assert [p.timestamp for p in data["b"]] == [10, 20, 20, 30]
+    # Equal timestamps keep insertion order
+    assert [p.lat for p in data["b"]] == [5.0, 3.0, 4.0, 1.0]
+    assert data["a"] == [Position(lat=2.0, lon=2.0, timestamp=10, mmsi="a")]
+
+
+def test_store_extend_batch(sort_backend):
+    """Test that batch MMSI ids are remapped onto the store's table."""
+    store = PositionStore()
+    store.append(0.0, 0.0, 0, "x")
+
+    batch = PositionBatch()
+    batch.append(1.0, 1.0, 5, "y")
+    batch.append(2.0, 2.0, 6, "x")
+    store.extend_batch(batch)
+
+    assert store.mmsi_table == ["x", "y"]
+    assert list(store.mmsi_ids) == [0, 1, 0]
+    assert [(mmsi, start, end) for mmsi, start, end in store.vessels()] == [("x", 0, 2), ("y", 2, 3)]
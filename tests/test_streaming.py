@@ -0,0 +1,72 @@
+from vessel_tracker.core.streaming import StreamingStopDetector
+from helpers import batch_stops, time_ordered_feed
+
+
+def stop_keys(stops):
+    return sorted((stop.mmsi, stop.timestamp, stop.lat, stop.lon, stop.end_timestamp, stop.points,
+                   stop.centroid_lat, stop.centroid_lon, stop.min_lat, stop.max_lon) for stop in stops)
+
+
+def test_streaming_matches_batch():
+    """Test that streaming detection finds the same stops on a time-ordered feed."""
+    feed = time_ordered_feed()
+    detector = StreamingStopDetector(min_duration=1800)
+
+    stops = []
+    for pos in feed:
+        stops.extend(detector.push(pos.lat, pos.lon, pos.timestamp, pos.mmsi))
+    stops.extend(detector.flush())
+
+    assert stop_keys(stops) == stop_keys(batch_stops(feed, 1800))
+    assert detector.vessels == {}
+
+
+def test_streaming_speed_threshold():
+    """Test that a custom speed threshold gives the same stops as the batch analyzer."""
+    feed = time_ordered_feed()
+    detector = StreamingStopDetector(min_duration=1800, speed_threshold=5.0)
+
+    stops = []
+    for pos in feed:
+        stops.extend(detector.push(pos.lat, pos.lon, pos.timestamp, pos.mmsi))
+    stops.extend(detector.flush())
+
+    expected = batch_stops(feed, 1800, speed_threshold=5.0)
+    assert stop_keys(stops) == stop_keys(expected)
+    assert len(expected) != len(batch_stops(feed, 1800))
+
+
+def test_streaming_reorder_window():
+    """Test that messages arriving late within the window are reordered."""
+    feed = time_ordered_feed(seed=3)
+    shuffled = list(feed)
+    # Swap neighbours so some messages arrive up to a few minutes late
+    for i in range(0, len(shuffled) - 1, 2):
+        shuffled[i], shuffled[i + 1] = shuffled[i + 1], shuffled[i]
+
+    strict = StreamingStopDetector(min_duration=1800)
+    windowed = StreamingStopDetector(min_duration=1800, reorder_window=3600)
+    stops = []
+    for pos in shuffled:
+        strict.push(pos.lat, pos.lon, pos.timestamp, pos.mmsi)
+        stops.extend(windowed.push(pos.lat, pos.lon, pos.timestamp, pos.mmsi))
+    stops.extend(windowed.flush())
+
+    assert windowed.late_messages == 0
+    assert strict.late_messages > 0
+    assert stop_keys(stops) == stop_keys(batch_stops(feed, 1800))
+
+
+def test_streaming_emits_stop_when_closed(sample_positions):
+    """Test that a stop is returned as soon as the vessel moves off."""
+    detector = StreamingStopDetector(min_duration=3600)
+    for pos in sample_positions:
+        assert detector.push(pos.lat, pos.lon, pos.timestamp, pos.mmsi) == []
+
+    moved = sample_positions[-1]
+    stops = detector.push(moved.lat + 1, moved.lon, moved.timestamp + 60, moved.mmsi)
+
+    assert [stop.start for stop in stops] == [sample_positions[0]]
+    assert stops[0].end_timestamp == moved.timestamp + 60
+    assert stops[0].points == len(sample_positions)
+    assert detector.flush() == []
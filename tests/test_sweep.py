@@ -0,0 +1,60 @@
+import csv
+import json
+import pytest
+from vessel_tracker.core import sweep_vessel_data
+from vessel_tracker.core.analyzer import VesselAnalyzer
+from vessel_tracker.core.sweep import sweep_stops, write_sweep_summary
+from helpers import random_vessel_data
+
+THRESHOLDS = [0.5, 1.0, 3.0]
+DURATIONS = [900, 1800, 7200]
+
+
+@pytest.mark.parametrize("engine", ["numpy", "python"])
+def test_sweep_matches_analyzer(engine):
+    """Test that every swept setting finds the analyzer's stops for that setting."""
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    analyzer = VesselAnalyzer(engine=engine)
+    analyzer.group_positions(p for vessel in random_vessel_data(vessels=15).values() for p in vessel)
+    store = analyzer.store
+
+    results = sweep_stops(store, THRESHOLDS, DURATIONS, engine=engine, keep_stops=True, progress=False)
+
+    assert [(r.speed_threshold, r.min_duration) for r in results] == \
+        [(t, d) for t in THRESHOLDS for d in DURATIONS]
+    for result in results:
+        single = VesselAnalyzer(min_duration=result.min_duration, engine=engine,
+                                speed_threshold=result.speed_threshold)
+        single.store = store
+        expected = [(p.mmsi, p.timestamp) for p in single.find_stops()]
+        assert [(store.mmsi_table[store.mmsi_ids[i]], store.timestamp[i]) for i in result.stop_rows] == expected
+        assert result.stops == len(expected)
+        assert result.vessels == len({mmsi for mmsi, _ in expected})
+
+
+def test_write_sweep_summary(tmp_path):
+    """Test writing the summary as JSON and CSV."""
+    results = sweep_stops(VesselAnalyzer().store, [1.0], [60, 120], progress=False)
+    write_sweep_summary(results, str(tmp_path / "sweep.json"))
+    write_sweep_summary(results, str(tmp_path / "sweep.csv"))
+
+    assert json.loads((tmp_path / "sweep.json").read_text())[1] == \
+        {"speed_threshold": 1.0, "min_duration": 120, "stops": 0, "vessels": 0}
+    with open(tmp_path / "sweep.csv") as f:
+        assert [row["min_duration"] for row in csv.DictReader(f)] == ["60", "120"]
+
+
+def test_sweep_vessel_data(sample_message, tmp_path):
+    """Test a sweep from an input file, exporting each setting's stops."""
+    input_path = tmp_path / "messages.json"
+    input_path.write_text("\n".join(
+        json.dumps({**sample_message, "UTCTimeStamp": sample_message["UTCTimeStamp"] + i * 1800})
+        for i in range(4)) + "\n")
+
+    results = sweep_vessel_data(str(input_path), str(tmp_path / "sweep.json"), [1.0], [3600, 7200],
+                                stops_dir=str(tmp_path / "stops"), output_format="csv")
+
+    assert [result.stops for result in results] == [1, 0]
+    assert (tmp_path / "stops" / "stops-1kn-3600s.csv").read_text().count("\n") == 2
+    assert (tmp_path / "stops" / "stops-1kn-7200s.csv").exists()
@@ -0,0 +1,71 @@
+import json
+import pytest
+from vessel_tracker.core import export_tracks
+from vessel_tracker.core.tracks import (
+    Simplification, Track, bucket_rows, douglas_peucker, iter_tracks, track_json
+)
+from vessel_tracker.models.store import PositionStore
+from vessel_tracker.models.position import Position
+from helpers import random_vessel_data
+
+BASE = 1_704_067_200
+
+
+def test_douglas_peucker():
+    """Test that collinear fixes collapse to the ends and a detour survives."""
+    lat = [50.0] * 11
+    lon = [i * 0.01 for i in range(11)]
+    assert douglas_peucker(lat, lon, 10.0) == [0, 10]
+    # 0.001 degrees of latitude is about 111 m
+    lat[5] = 50.001
+    assert douglas_peucker(lat, lon, 100.0) == [0, 5, 10]
+    assert douglas_peucker(lat, lon, 200.0) == [0, 10]
+    assert douglas_peucker(lat, lon, 0.0) == list(range(11))
+
+
+def test_bucket_rows():
+    """Test that the first fix of each bucket and the last fix are kept."""
+    timestamp = [0, 10, 59, 60, 61, 180, 200]
+    assert bucket_rows(timestamp, range(7), 60) == [0, 3, 5, 6]
+
+
+@pytest.mark.parametrize("simplification", [Simplification(), Simplification(500.0, 3600),
+                                            Simplification(0.0)])
+def test_engines_agree(simplification):
+    """Test that both engines keep the same fixes."""
+    pytest.importorskip("numpy")
+    store = PositionStore()
+    store.extend(p for positions in random_vessel_data(vessels=10).values() for p in positions)
+
+    expected = list(iter_tracks(store, simplification, engine="python", progress=False))
+    assert list(iter_tracks(store, simplification, engine="numpy", progress=False)) == expected
+    assert len(expected) == 10
+    if simplification.tolerance:
+        assert sum(len(t.timestamp) for t in expected) < len(store)
+
+
+def test_track_json_matches_to_dict():
+    """Test that the fast serializer matches to_dict."""
+    track = Track("123", [50.0, 50.5], [1.0, 1.5], [BASE, BASE + 60], 7, 1234.5)
+    assert json.loads(track_json(track)) == track.to_dict()
+
+
+def test_export_tracks(tmp_path):
+    """Test that a straight, densely reported track is written as two vertices."""
+    with open(tmp_path / "input.json", "w") as f:
+        for i in range(600):
+            f.write(json.dumps({"Message": {"MessageID": 1, "UserID": "1", "Latitude": 50.0,
+                                            "Longitude": i * 0.001}, "UTCTimeStamp": BASE + i * 10}) + "\n")
+        f.write(json.dumps({"Message": {"MessageID": 1, "UserID": "2", "Latitude": 0.0, "Longitude": 0.0},
+                            "UTCTimeStamp": BASE}) + "\n")
+
+    count = export_tracks(str(tmp_path / "input.json"), str(tmp_path / "tracks.geojsonl"))
+
+    feature, = [json.loads(line) for line in (tmp_path / "tracks.geojsonl").read_text().splitlines()]
+    assert count == 1
+    assert feature["geometry"]["coordinates"] == [[0.0, 50.0], [0.599, 50.0]]
+    assert feature["properties"]["timestamps"] == [BASE, BASE + 5990]
+    assert feature["properties"]["points"] == 600
+    assert feature["properties"]["length"] == pytest.approx(599 * 71.5, rel=0.01)
+    with pytest.raises(ValueError):
+        export_tracks(str(tmp_path / "input.json"), str(tmp_path / "tracks.csv"), output_format="csv")
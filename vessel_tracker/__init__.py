@@ -1,5 +1,11 @@
 """Vessel tracking and analysis package."""
-from vessel_tracker.core import process_vessel_data
 
 __version__ = '0.1.0'
-__all__ = ['process_vessel_data']
\ No newline at end of file
+__all__ = ['process_vessel_data']
+
+
+def __getattr__(name):
+    if name == 'process_vessel_data':
+        from vessel_tracker.core import process_vessel_data
+        return process_vessel_data
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,17 +2,83 @@
 import sys
 import argparse
 import os
-from typing import List, Optional
+from typing import Callable, List, Optional
 from pathlib import Path
 
-from vessel_tracker.core import process_vessel_data
+# Only the modules needed to parse the arguments are imported here; each
+# mode imports what it runs, so --help and small runs start quickly.
+from vessel_tracker.core.cache import DEFAULT_MAX_BYTES, ParseCache
+from vessel_tracker.core.cleaning import Cleaning
+from vessel_tracker.core.exporter import EXPORTERS
+from vessel_tracker.core.ports import DEFAULT_NAME_FIELD, PortIndex
+from vessel_tracker.core.tracks import DEFAULT_TOLERANCE, Simplification
+from vessel_tracker.utils.geo import DEFAULT_SPEED_THRESHOLD
+from vessel_tracker.utils.file import GZIP_BACKENDS, TCP_PREFIX, set_gzip_backend
+from vessel_tracker.utils.filters import PositionFilter, load_mmsi_file, parse_bbox, parse_timestamp
+from vessel_tracker.utils.metrics import Metrics
+from vessel_tracker.utils.parsing import DECODER_BACKENDS
+from vessel_tracker.utils.progress import set_quiet, status
+from vessel_tracker.utils.spatial import GridIndex
 
 
 def resolve_path(path: str) -> str:
     """Convert relative path to absolute path from current working directory."""
+    if path == "-" or path.startswith(TCP_PREFIX):
+        return path
     return str(Path(os.getcwd()) / path)
 
 
+def number_list(cast: Callable[[str], object]) -> Callable[[str], list]:
+    """Argument type for a comma-separated list of numbers."""
+    def parse(value: str) -> list:
+        return [cast(item) for item in value.split(",") if item.strip()]
+    return parse
+
+
+def build_filter(args: argparse.Namespace) -> Optional[PositionFilter]:
+    """Build the position filter requested on the command line, if any."""
+    if not (args.bbox or args.since is not None or args.until is not None
+            or args.mmsi_file or args.region):
+        return None
+    return PositionFilter(
+        bbox=args.bbox,
+        since=args.since,
+        until=args.until,
+        mmsis=load_mmsi_file(args.mmsi_file) if args.mmsi_file else None,
+        region=GridIndex.from_file(args.region) if args.region else None
+    )
+
+
+def build_cleaning(args: argparse.Namespace) -> Optional[Cleaning]:
+    """Build the track cleaning requested on the command line, if any."""
+    cleaning = Cleaning(dedupe=args.dedupe, max_speed=args.max_speed, smooth_window=args.smooth)
+    return cleaning if cleaning.active else None
+
+
+def live_unsupported(args: argparse.Namespace) -> List[str]:
+    """Options given on the command line that live mode does not support."""
+    options = {
+        # Live output is always GeoJSONSeq
+        "--format": args.format not in (None, "geojsonseq"),
+        "--tracks": args.tracks,
+        "--sweep-speeds": args.sweep_speeds,
+        "--sweep-durations": args.sweep_durations,
+        "--sweep-stops": args.sweep_stops,
+        "--port-summary": args.port_summary,
+        "--streaming": args.streaming,
+        "--checkpoint": args.checkpoint,
+        "--finalize": args.finalize,
+        "--partitions": args.partitions,
+        "--memory-budget": args.memory_budget,
+        "--spill-dir": args.spill_dir,
+        "--cache": args.cache,
+        "--workers": args.workers != 1,
+        "--exact-count": args.exact_count,
+        "--write-sidecar": args.write_sidecar,
+    }
+    return [option for option, given in options.items() if given]
+
+
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -21,13 +87,21 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     )
 
     parser.add_argument(
-        "input_file",
-        help="Path to input file (JSON or JSON.gz)",
+        "input_files",
+        nargs="+",
+        help="Input files (JSON or JSON.gz), glob patterns or directories, or - for standard input",
     )
 
     parser.add_argument(
         "output_file",
-        help="Path for output GeoJSON file",
+        help="Path for output file",
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=sorted(EXPORTERS),
+        default=None,
+        help="Output format (default: inferred from the output file extension)",
     )
 
     parser.add_argument(
@@ -37,11 +111,270 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
         help="Minimum stop duration in seconds",
     )
 
+    parser.add_argument(
+        "--speed-threshold",
+        type=float,
+        default=DEFAULT_SPEED_THRESHOLD,
+        help="Speed in knots below which a vessel counts as stopped",
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Keep only the first fix of each vessel reported for a timestamp",
+    )
+
+    parser.add_argument(
+        "--max-speed",
+        type=float,
+        help="Drop single fixes implying a jump faster than this many knots",
+    )
+
+    parser.add_argument(
+        "--smooth",
+        type=int,
+        default=1,
+        help="Smooth each track with a running median over this odd number of fixes",
+    )
+
+    parser.add_argument(
+        "--sweep-speeds",
+        type=number_list(float),
+        help="Sweep these comma-separated speed thresholds; the output file gets a summary (JSON or .csv)",
+    )
+
+    parser.add_argument(
+        "--sweep-durations",
+        type=number_list(int),
+        help="Sweep these comma-separated minimum durations in seconds",
+    )
+
+    parser.add_argument(
+        "--sweep-stops",
+        help="Directory to export the stops of each swept setting to (in --format, default GeoJSON)",
+    )
+
+    parser.add_argument(
+        "--tracks",
+        action="store_true",
+        help="Export each vessel's simplified track as a GeoJSON LineString instead of stops",
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="With --tracks, metres a simplified track may deviate from the fixes (0 keeps them all)",
+    )
+
+    parser.add_argument(
+        "--track-interval",
+        type=int,
+        help="With --tracks, keep at most one fix per this many seconds before simplifying",
+    )
+
+    parser.add_argument(
+        "--exact-count",
+        action="store_true",
+        help="Pre-scan the input for an exact message count (reads the input twice)",
+    )
+
+    parser.add_argument(
+        "--write-sidecar",
+        action="store_true",
+        help="Save the input's line count to a sidecar index (<input>.count) for later runs",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the input (whole files in parallel when several are given) "
+             "and to find the stops of large inputs",
+    )
+
+    parser.add_argument(
+        "--decoder",
+        choices=DECODER_BACKENDS,
+        default="auto",
+        help="JSON decoding backend",
+    )
+
+    parser.add_argument(
+        "--gzip-backend",
+        choices=GZIP_BACKENDS,
+        default="auto",
+        help="Inflate implementation for gzip input (auto: isal, zlib-ng, pigz, then the standard library)",
+    )
+
+    parser.add_argument(
+        "--bbox",
+        type=parse_bbox,
+        help="Keep positions inside min_lon,min_lat,max_lon,max_lat (use --bbox=... for negative values)",
+    )
+
+    parser.add_argument(
+        "--since",
+        type=parse_timestamp,
+        help="Keep positions at or after this time (epoch seconds or ISO 8601, UTC by default)",
+    )
+
+    parser.add_argument(
+        "--until",
+        type=parse_timestamp,
+        help="Keep positions before this time (epoch seconds or ISO 8601, UTC by default)",
+    )
+
+    parser.add_argument(
+        "--mmsi-file",
+        help="Keep only the vessels whose MMSIs are listed in this file",
+    )
+
+    parser.add_argument(
+        "--region",
+        help="Keep positions inside the polygons of this GeoJSON file",
+    )
+
+    parser.add_argument(
+        "--ports",
+        help="Label each stop with the port or anchorage polygon of this GeoJSON file it lies in",
+    )
+
+    parser.add_argument(
+        "--port-name-field",
+        default=DEFAULT_NAME_FIELD,
+        help="Feature property holding the port names in --ports",
+    )
+
+    parser.add_argument(
+        "--port-summary",
+        help="Write stop count, vessel count and total dwell per port to this file (JSON or .csv)",
+    )
+
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Detect stops on the fly instead of buffering all positions",
+    )
+
+    parser.add_argument(
+        "--reorder-window",
+        type=int,
+        default=0,
+        help="Seconds of out-of-order arrival tolerated in streaming mode",
+    )
+
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Detect stops on a live feed (- or tcp://host:port), writing them to a GeoJSONSeq "
+             "output as they close",
+    )
+
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="In live mode, append stops to an existing output instead of overwriting it",
+    )
+
+    parser.add_argument(
+        "--idle-timeout",
+        type=int,
+        help="In live mode, close the stops of vessels silent for this many seconds of feed time",
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="In live mode, chunks of lines buffered ahead of decoding before reading pauses "
+             "(default: 8)",
+    )
+
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        help="In live mode, report throughput and latency every this many seconds",
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        help="Checkpoint file for incremental runs; only data appended since the last run is read",
+    )
+
+    parser.add_argument(
+        "--finalize",
+        action="store_true",
+        help="With --checkpoint, treat the input as complete: report stops still open at its end "
+             "and remove the checkpoint",
+    )
+
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        default=0,
+        help="Analyze out of core, spilling positions to this many on-disk hash partitions",
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        help="Memory budget in MiB per partition analysis; implies out-of-core mode",
+    )
+
+    parser.add_argument(
+        "--spill-dir",
+        help="Directory for partition spill files (default: the system temp directory)",
+    )
+
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache parsed positions between runs, so repeat runs on the same inputs skip parsing",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        help="With --cache, directory of the parsed-position cache (default: ~/.cache/vessel_tracker)",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // 2 ** 20,
+        help="With --cache, size limit of the cache in MiB; least recently used entries are evicted",
+    )
+
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Disable progress bars and status messages",
+    )
+
+    parser.add_argument(
+        "--metrics-out",
+        help="Write per-stage timings and counters to this JSON file",
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="Profile the run with cProfile and save the stats to this file",
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace allocations with tracemalloc and add peak usage to the metrics",
+    )
+
     parsed_args = parser.parse_args(args)
 
     # Resolve relative paths
-    parsed_args.input_file = resolve_path(parsed_args.input_file)
+    parsed_args.input_files = [resolve_path(path) for path in parsed_args.input_files]
     parsed_args.output_file = resolve_path(parsed_args.output_file)
+    for option in ("checkpoint", "metrics_out", "profile", "spill_dir", "mmsi_file", "region", "cache_dir",
+                   "sweep_stops", "ports", "port_summary"):
+        if getattr(parsed_args, option):
+            setattr(parsed_args, option, resolve_path(getattr(parsed_args, option)))
 
     return parsed_args
 
@@ -50,11 +383,106 @@ def main() -> int:
     """Main entry point for the vessel tracker."""
     try:
         args = parse_args()
-        process_vessel_data(
-            input_path=args.input_file,
-            output_path=args.output_file,
-            min_stop_duration=args.min_duration
-        )
+        set_quiet(args.quiet)
+        set_gzip_backend(args.gzip_backend)
+        metrics = Metrics(profile_path=args.profile, trace_memory=args.trace_memory)
+        cache = ParseCache(args.cache_dir, args.cache_size * 2 ** 20) if args.cache else None
+        if args.append and not args.live:
+            raise ValueError("--append is only available in live mode")
+        with metrics:
+            if args.live:
+                if len(args.input_files) != 1:
+                    raise ValueError("Live mode takes a single source")
+                if build_cleaning(args):
+                    raise ValueError("Track cleaning is not available in live mode")
+                if args.ports:
+                    raise ValueError("Port labelling is not available in live mode")
+                unsupported = live_unsupported(args)
+                if unsupported:
+                    raise ValueError(f"Not available in live mode: {', '.join(unsupported)}")
+                from vessel_tracker.core.live import DEFAULT_QUEUE_SIZE, run_live
+                stats = run_live(
+                    source=args.input_files[0],
+                    output_path=args.output_file,
+                    min_duration=args.min_duration,
+                    reorder_window=args.reorder_window,
+                    idle_timeout=args.idle_timeout,
+                    speed_threshold=args.speed_threshold,
+                    decoder=args.decoder,
+                    position_filter=build_filter(args),
+                    queue_size=args.queue_size or DEFAULT_QUEUE_SIZE,
+                    stats_interval=args.stats_interval,
+                    append=args.append,
+                    metrics=metrics
+                )
+                status(f"\nFeed ended. {stats.describe()}")
+            elif args.tracks:
+                if args.ports:
+                    raise ValueError("Port labelling is not available in track mode")
+                from vessel_tracker.core.pipeline import export_tracks
+                export_tracks(
+                    input_path=args.input_files,
+                    output_path=args.output_file,
+                    simplification=Simplification(args.tolerance, args.track_interval),
+                    output_format=args.format,
+                    exact_count=args.exact_count,
+                    write_sidecar=args.write_sidecar,
+                    workers=args.workers,
+                    decoder=args.decoder,
+                    metrics=metrics,
+                    position_filter=build_filter(args),
+                    cache=cache,
+                    cleaning=build_cleaning(args)
+                )
+            elif args.sweep_speeds or args.sweep_durations:
+                if build_cleaning(args):
+                    raise ValueError("Track cleaning is not available in sweep mode")
+                if args.ports:
+                    raise ValueError("Port labelling is not available in sweep mode")
+                from vessel_tracker.core.pipeline import sweep_vessel_data
+                sweep_vessel_data(
+                    input_path=args.input_files,
+                    output_path=args.output_file,
+                    speed_thresholds=args.sweep_speeds or [args.speed_threshold],
+                    min_durations=args.sweep_durations or [args.min_duration],
+                    stops_dir=args.sweep_stops,
+                    output_format=args.format,
+                    exact_count=args.exact_count,
+                    write_sidecar=args.write_sidecar,
+                    workers=args.workers,
+                    decoder=args.decoder,
+                    metrics=metrics,
+                    position_filter=build_filter(args),
+                    cache=cache
+                )
+            else:
+                from vessel_tracker.core.pipeline import process_vessel_data
+                process_vessel_data(
+                    input_path=args.input_files,
+                    output_path=args.output_file,
+                    min_stop_duration=args.min_duration,
+                    exact_count=args.exact_count,
+                    write_sidecar=args.write_sidecar,
+                    workers=args.workers,
+                    decoder=args.decoder,
+                    streaming=args.streaming,
+                    reorder_window=args.reorder_window,
+                    checkpoint_path=args.checkpoint,
+                    output_format=args.format,
+                    metrics=metrics,
+                    partitions=args.partitions,
+                    memory_budget=args.memory_budget * 2 ** 20 if args.memory_budget else None,
+                    spill_dir=args.spill_dir,
+                    position_filter=build_filter(args),
+                    cache=cache,
+                    speed_threshold=args.speed_threshold,
+                    cleaning=build_cleaning(args),
+                    ports=PortIndex.from_file(args.ports, args.port_name_field) if args.ports else None,
+                    port_summary=args.port_summary,
+                    finalize=args.finalize
+                )
+        if args.metrics_out:
+            metrics.write(args.metrics_out)
         return 0
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
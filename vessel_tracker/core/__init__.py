@@ -1,44 +1,47 @@
-"""Core processing functionality."""
-from typing import Generator, List
-import os
-
-# Relative imports for internal core modules
-from .processor import MessageProcessor
-from .analyzer import VesselAnalyzer
-from .exporter import GeoJSONExporter
-
-# Absolute imports for external modules
-from vessel_tracker.models import Position
-
-
-def process_vessel_data(input_path: str, output_path: str, min_stop_duration: int = 3600) -> None:
-    """Main function to process vessel data and identify stops."""
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"Input file not found: {input_path}")
-
-    print(f"\nProcessing input file: {input_path}")
-    print(f"Output will be written to: {output_path}\n")
-
-    # Process messages
-    processor = MessageProcessor(input_path)
-    positions = processor.process_messages()
-
-    # Analyze vessel stops
-    analyzer = VesselAnalyzer(min_duration=min_stop_duration)
-    analyzer.group_positions(positions)
-    stops = analyzer.find_stops()
-
-    # Export results
-    exporter = GeoJSONExporter(output_path)
-    exporter.export(stops)
-
-    print(f"\nProcessing complete. Found {len(stops):,} stops.")
-
-
-__all__ = [
-    'MessageProcessor',
-    'VesselAnalyzer',
-    'GeoJSONExporter',
-    'process_vessel_data',
-    'Position'
-]
+"""Core processing functionality.
+
+The names below are imported from their submodules on first use, so
+importing the package (or one light submodule of it) does not import the
+process pools, asyncio and accelerators the rest of the package uses.
+"""
+import importlib
+
+# Public name -> module it is defined in
+_EXPORTS = {
+    'MessageProcessor': '.processor',
+    'MultiFileProcessor': '.processor',
+    'VesselAnalyzer': '.analyzer',
+    'PartitionedAnalyzer': '.partition',
+    'ParseCache': '.cache',
+    'Cleaning': '.cleaning',
+    'GeoJSONExporter': '.exporter',
+    'EXPORTERS': '.exporter',
+    'get_exporter': '.exporter',
+    'Metrics': 'vessel_tracker.utils.metrics',
+    'StreamingStopDetector': '.streaming',
+    'LiveIngest': '.live',
+    'run_live': '.live',
+    'process_vessel_data': '.pipeline',
+    'sweep_vessel_data': '.pipeline',
+    'export_tracks': '.pipeline',
+    'Simplification': '.tracks',
+    'SweepResult': '.sweep',
+    'PortIndex': '.ports',
+    'PortLabeler': '.ports',
+    'PortStats': '.ports',
+    'Position': 'vessel_tracker.models.position',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
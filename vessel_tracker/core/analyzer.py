@@ -1,68 +1,304 @@
-from typing import Dict, List, Generator
-from tqdm import tqdm
+import math
+from array import array
+from bisect import bisect_right
+from operator import attrgetter
+from typing import TYPE_CHECKING, Dict, Generator, Iterable, List, Optional, Sequence, Tuple
 
+from ..models.batch import PositionBatch, StopBatch
+from ..models.episode import EPISODE_FIELDS, StopEpisode
 from ..models.position import Position
-from ..utils.geo import calculate_speed
-from ..utils.progress import VESSEL_ANALYZER
+from ..models.store import PositionStore
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD, speed_between
+from ..utils.optional import is_loaded, optional_module, worth_using
+from ..utils.progress import VESSEL_ANALYZER, progress_bar, status
+from .cleaning import Cleaning, clean_track
+
+np = optional_module('numpy')
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+ENGINES = ('auto', 'numpy', 'python')
+# Approximate number of rows handed to the numpy engine at a time
+CHUNK_ROWS = 1 << 21
+# Rows below which stops are found in a single process, where starting workers costs more than it saves
+PARALLEL_MIN_ROWS = 1 << 20
+# Number of stops gathered into each batch handed to exporters
+STOP_BATCH_SIZE = 65536
+# Sort key reading Position.timestamp in C, without a Python call per position
+BY_TIMESTAMP = attrgetter('timestamp')
+
+
+def vessel_chunks(offsets, vessel_count: int,
+                  chunk_rows: Optional[int] = None) -> Generator[Tuple[int, int], None, None]:
+    """Split vessels into consecutive [first, last) ranges of about ``chunk_rows`` rows each.
+
+    ``offsets`` holds the vessel row offsets of a sorted store (an array or
+    numpy array). A vessel with more rows than ``chunk_rows`` gets a range
+    of its own.
+    """
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    vessel = 0
+    while vessel < vessel_count:
+        target = offsets[vessel] + chunk_rows
+        end_vessel = max(vessel + 1, bisect_right(offsets, target) - 1)
+        end_vessel = min(end_vessel, vessel_count)
+        yield vessel, end_vessel
+        vessel = end_vessel
+
+
+def scan_episodes(lat: Sequence[float], lon: Sequence[float], timestamp: Sequence[int],
+                  start: int, end: int, min_duration: int,
+                  speed_threshold: float = DEFAULT_SPEED_THRESHOLD) -> List[tuple]:
+    """Find stops, with their episode fields, in the time-sorted rows [start, end) of a single vessel.
+
+    A stop is a run of consecutive fixes slower than ``speed_threshold``
+    knots lasting at least ``min_duration`` seconds. The point count and
+    extent of each stop are accumulated as the scan goes; the centroid is
+    the exactly rounded (math.fsum) mean of the stop's fixes. Returns one
+    tuple per stop: its start row followed by the values of EPISODE_FIELDS.
+    """
+    def episode(close: int) -> tuple:
+        last = stop_start + points
+        return (stop_start, timestamp[close], points,
+                math.fsum(lat[stop_start:last]) / points, math.fsum(lon[stop_start:last]) / points,
+                min_lat, min_lon, max_lat, max_lon)
+
+    episodes = []
+    stop_start = -1
+    points = 0
+    min_lat = min_lon = max_lat = max_lon = 0.0
+
+    for i in range(start + 1, end):
+        speed = speed_between(lat[i - 1], lon[i - 1], timestamp[i - 1],
+                              lat[i], lon[i], timestamp[i])
+
+        if speed < speed_threshold:
+            if stop_start < 0:
+                stop_start = i - 1
+                points = 1
+                min_lat = max_lat = lat[i - 1]
+                min_lon = max_lon = lon[i - 1]
+            y, x = lat[i], lon[i]
+            points += 1
+            min_lat, max_lat = min(min_lat, y), max(max_lat, y)
+            min_lon, max_lon = min(min_lon, x), max(max_lon, x)
+        elif stop_start >= 0:
+            if timestamp[i] - timestamp[stop_start] >= min_duration:
+                episodes.append(episode(i))
+            stop_start = -1
+
+    # Check final stop
+    if stop_start >= 0 and timestamp[end - 1] - timestamp[stop_start] >= min_duration:
+        episodes.append(episode(end - 1))
+
+    return episodes
+
+
+def scan_stops(lat: Sequence[float], lon: Sequence[float], timestamp: Sequence[int],
+               start: int, end: int, min_duration: int,
+               speed_threshold: float = DEFAULT_SPEED_THRESHOLD) -> List[int]:
+    """Row index at which each stop of ``scan_episodes`` starts."""
+    return [episode[0] for episode in scan_episodes(lat, lon, timestamp, start, end, min_duration,
+                                                    speed_threshold)]
+
+
+def scan_vessels(lat: Sequence[float], lon: Sequence[float], timestamp: Sequence[int], offsets: Sequence[int],
+                 first: int, last: int, min_duration: int, speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+                 cleaning: Optional[Cleaning] = None) -> Generator[List[tuple], None, None]:
+    """Yield the ``scan_episodes`` tuples of each vessel in [first, last) of sorted columns.
+
+    With ``cleaning`` each vessel's fixes are cleaned first; the start rows
+    still index the columns given.
+    """
+    for vessel in range(first, last):
+        start, end = offsets[vessel], offsets[vessel + 1]
+        if cleaning is None:
+            yield scan_episodes(lat, lon, timestamp, start, end, min_duration, speed_threshold)
+        else:
+            kept, track_lat, track_lon, track_timestamp = clean_track(lat, lon, timestamp, start, end, cleaning)
+            yield [(kept[row], *fields) for row, *fields in
+                   scan_episodes(track_lat, track_lon, track_timestamp, 0, len(kept), min_duration,
+                                 speed_threshold)]
+
+
+def find_chunk_episodes(lat, lon, timestamp, offsets, first: int, last: int, min_duration: int,
+                        speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+                        cleaning: Optional[Cleaning] = None) -> tuple:
+    """Find the stops of vessels [first, last) of sorted numpy columns with the numpy engine.
+
+    Returns the start rows of the stops as a numpy array and their
+    EPISODE_FIELDS columns.
+    """
+    from .vectorized import clean_positions, find_stop_episodes
+
+    lo, hi = offsets[first], offsets[last]
+    chunk = lat[lo:hi], lon[lo:hi], timestamp[lo:hi], offsets[first:last + 1] - lo
+    if cleaning is None:
+        starts, columns = find_stop_episodes(*chunk, min_duration, speed_threshold)
+    else:
+        kept, *chunk = clean_positions(*chunk, cleaning)
+        starts, columns = find_stop_episodes(*chunk, min_duration, speed_threshold)
+        starts = kept[starts]
+    return starts + lo, columns
+
 
 class VesselAnalyzer:
-    """Analyzes vessel positions to identify stops."""
+    """Analyzes vessel positions to identify stops.
 
-    def __init__(self, min_duration: int = 3600):
+    Positions are held in a columnar PositionStore; objects are only created
+    for the stops that are found, as StopEpisode records carrying the start
+    position, end time, duration, point count, centroid and extent. ``engine`` selects the numpy
+    implementation, the pure Python loop, or ('auto') numpy when installed
+    and the store is large enough to repay importing it.
+    A vessel is stopped while moving slower than ``speed_threshold`` knots.
+
+    With ``cleaning`` each vessel's fixes are first deduplicated, rid of GPS
+    jumps and optionally smoothed (see ``core.cleaning``). Stops then start
+    at a reported fix, and their centroid and extent use the cleaned
+    coordinates.
+
+    With ``workers`` > 1, stores of at least PARALLEL_MIN_ROWS positions
+    are analyzed across that many processes (see ``core.shared``); the
+    stops and their order are the same as a single process finds.
+    """
+
+    def __init__(self, min_duration: int = 3600, engine: str = 'auto',
+                 speed_threshold: float = DEFAULT_SPEED_THRESHOLD, cleaning: Optional[Cleaning] = None,
+                 workers: int = 1):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == 'numpy' and np is None:
+            raise ImportError("The numpy engine requires numpy to be installed")
         self.min_duration = min_duration
-        self.vessel_data: Dict[str, List[Position]] = {}
+        self.speed_threshold = speed_threshold
+        self.cleaning = cleaning if cleaning is not None and cleaning.active else None
+        self.engine = engine
+        self.workers = workers
+        self.store = PositionStore()
+
+    @property
+    def vessel_data(self) -> Dict[str, List[Position]]:
+        """Positions grouped by vessel MMSI, materialized from the store."""
+        return self.store.to_dict()
 
-    def group_positions(self, positions: Generator[Position, None, None]) -> None:
+    @vessel_data.setter
+    def vessel_data(self, data: Dict[str, List[Position]]) -> None:
+        self.store = PositionStore()
+        for positions in data.values():
+            self.store.extend(positions)
+
+    def group_positions(self, positions: Iterable[Position]) -> None:
         """Group positions by vessel MMSI."""
-        print("\nGrouping positions by vessel...")
-        for pos in positions:
-            if pos.mmsi not in self.vessel_data:
-                self.vessel_data[pos.mmsi] = []
-            self.vessel_data[pos.mmsi].append(pos)
+        status("\nGrouping positions by vessel...")
+        self.store.extend(positions)
+
+    def group_batches(self, batches: Iterable[PositionBatch]) -> None:
+        """Group position batches by vessel MMSI without creating Position objects."""
+        status("\nGrouping positions by vessel...")
+        for batch in batches:
+            self.store.extend_batch(batch)
 
     def _analyze_vessel_positions(self, positions: List[Position]) -> List[Position]:
         """Analyze positions for a single vessel to find stops."""
-        positions.sort(key=lambda x: x.timestamp)
-        stops = []
-        stop_start = None
-        prev_pos = None
+        positions.sort(key=BY_TIMESTAMP)
+        stops = scan_stops(
+            [pos.lat for pos in positions],
+            [pos.lon for pos in positions],
+            [pos.timestamp for pos in positions],
+            0, len(positions), self.min_duration, self.speed_threshold
+        )
+        return [positions[i] for i in stops]
 
-        for pos in positions:
-            if prev_pos is None:
-                prev_pos = pos
-                continue
+    def find_stops(self) -> List[StopEpisode]:
+        """Find vessel stops across all vessels."""
+        return list(self.iter_stops())
 
-            speed = calculate_speed(prev_pos, pos)
+    def iter_stops(self) -> Generator[StopEpisode, None, None]:
+        """Yield vessel stops across all vessels, a chunk of vessels at a time."""
+        for batch in self.iter_stop_batches():
+            yield from batch.positions()
 
-            if speed < 1.0:  # Less than 1 knot
-                if stop_start is None:
-                    stop_start = prev_pos
-            elif stop_start is not None:
-                if pos.timestamp - stop_start.timestamp >= self.min_duration:
-                    stops.append(stop_start)
-                stop_start = None
+    def iter_stop_batches(self, progress: bool = True) -> Generator[StopBatch, None, None]:
+        """Yield vessel stops as compact batches, without creating Position objects."""
+        store = self.store
+        if not len(store):
+            return
 
-            prev_pos = pos
+        vessel_count = store.vessel_count
+        if progress:
+            status(f"\nProcessing {vessel_count:,} vessels...")
 
-        # Check final stop
-        if stop_start is not None and \
-                positions[-1].timestamp - stop_start.timestamp >= self.min_duration:
-            stops.append(stop_start)
+        store.sort()
+        settings = VESSEL_ANALYZER if progress else {**VESSEL_ANALYZER, "disable": True}
+        with progress_bar(total=vessel_count, **settings) as pbar:
+            use_numpy = self.engine == 'numpy' or (self.engine == 'auto' and worth_using(np, len(store)))
+            if self.workers > 1 and len(store) >= PARALLEL_MIN_ROWS:
+                chunks = self._find_episodes_parallel(pbar, use_numpy)
+            elif use_numpy:
+                chunks = self._find_episodes_numpy(pbar)
+            else:
+                chunks = self._find_episodes_python(pbar)
+            rows, columns = [], _episode_arrays()
+            for chunk_rows, chunk_columns in chunks:
+                rows.extend(chunk_rows)
+                for column, values in zip(columns, chunk_columns):
+                    _extend(column, values)
+                if len(rows) >= STOP_BATCH_SIZE:
+                    yield self._stop_batch(rows, columns)
+                    rows, columns = [], _episode_arrays()
+            if rows:
+                yield self._stop_batch(rows, columns)
 
-        return stops
+    def _stop_batch(self, rows: List[int], columns: List[array]) -> StopBatch:
+        """Gather the start rows of stops into a StopBatch with their episode columns."""
+        starts = self.store.take(rows)
+        return StopBatch.from_columns(starts.lat, starts.lon, starts.timestamp, starts.mmsi_ids,
+                                      starts.mmsi_table, columns)
+
+    def _find_episodes_python(self, pbar: 'tqdm') -> Generator[tuple, None, None]:
+        """Find stops one vessel at a time with the scalar loop."""
+        store = self.store
+        for episodes in scan_vessels(store.lat, store.lon, store.timestamp, store.offsets, 0,
+                                     store.vessel_count, self.min_duration, self.speed_threshold,
+                                     self.cleaning):
+            if episodes:
+                rows, *columns = zip(*episodes)
+                yield rows, columns
+            pbar.update(1)
+
+    def _find_episodes_numpy(self, pbar: 'tqdm') -> Generator[tuple, None, None]:
+        """Find stops with the numpy engine, a chunk of whole vessels at a time."""
+        store = self.store
+        lat = np.frombuffer(store.lat, dtype=np.float64)
+        lon = np.frombuffer(store.lon, dtype=np.float64)
+        timestamp = np.frombuffer(store.timestamp, dtype=np.int64)
+        offsets = np.frombuffer(store.offsets, dtype=np.int64)
+
+        for vessel, end_vessel in vessel_chunks(offsets, store.vessel_count):
+            starts, columns = find_chunk_episodes(lat, lon, timestamp, offsets, vessel, end_vessel,
+                                                  self.min_duration, self.speed_threshold, self.cleaning)
+            yield starts.tolist(), columns
+            pbar.update(end_vessel - vessel)
+
+    def _find_episodes_parallel(self, pbar: 'tqdm', use_numpy: bool) -> Generator[tuple, None, None]:
+        """Find stops across a process pool, a range of whole vessels per task."""
+        from .shared import parallel_episodes
+
+        for vessels, rows, columns in parallel_episodes(self.store, self.workers, self.min_duration,
+                                                        self.speed_threshold, self.cleaning, use_numpy):
+            yield rows, columns
+            pbar.update(vessels)
 
-    def find_stops(self) -> List[Position]:
-        """Find vessel stops across all vessels."""
-        if not self.vessel_data:
-            return []
 
-        stops = []
-        vessel_count = len(self.vessel_data)
-        print(f"\nProcessing {vessel_count:,} vessels...")
+def _episode_arrays() -> List[array]:
+    """Empty arrays for the EPISODE_FIELDS columns."""
+    return [array(typecode) for _, typecode in EPISODE_FIELDS]
 
-        with tqdm(self.vessel_data.items(), total=vessel_count, **VESSEL_ANALYZER) as pbar:
-            for mmsi, positions in pbar:
-                vessel_stops = self._analyze_vessel_positions(positions)
-                stops.extend(vessel_stops)
 
-        return stops
\ No newline at end of file
+def _extend(column: array, values) -> None:
+    """Append a sequence or numpy array of values to a typed array."""
+    if is_loaded('numpy') and isinstance(values, np.ndarray):
+        column.frombytes(values.astype(column.typecode, copy=False).tobytes())
+    else:
+        column.extend(values)
@@ -0,0 +1,180 @@
+"""On-disk cache of parsed, vessel-sorted positions keyed by input file fingerprints."""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from ..models.store import PositionStore
+from ..utils.parsing import resolve_backend
+
+CACHE_VERSION = 1
+# Default size limit of all cache entries together
+DEFAULT_MAX_BYTES = 4 << 30
+# Default age in seconds after which an unused entry is evicted
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+# Bytes hashed at each end of an input to recognise its content
+SAMPLE_BYTES = 1 << 20
+ENTRY_SUFFIX = '.vtc'
+
+# Magic, version, rows, vessels, MMSI table bytes, then the parse counters
+_HEADER = struct.Struct('<4sIqqqqqqq')
+_MAGIC = b'VTPC'
+# Parse counters saved with an entry, named as in the run metrics
+COUNTERS = ('lines_read', 'json_errors', 'non_position', 'invalid_positions')
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory ($XDG_CACHE_HOME/vessel_tracker or ~/.cache/vessel_tracker)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'vessel_tracker')
+
+
+def content_sample_hash(path: str) -> str:
+    """Hash the first and last SAMPLE_BYTES of a file."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read(SAMPLE_BYTES))
+        size = f.seek(0, os.SEEK_END)
+        if size > SAMPLE_BYTES:
+            f.seek(max(SAMPLE_BYTES, size - SAMPLE_BYTES))
+            digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def cache_key(input_paths: Iterable[str], decoder: str = 'auto') -> str:
+    """Key identifying the parsed positions of a list of inputs.
+
+    Each input contributes its absolute path, size, modification time and
+    a hash of its first and last megabyte. The resolved JSON backend is
+    included so a change of decoder never serves another backend's result.
+    """
+    inputs = []
+    for path in input_paths:
+        stat = os.stat(path)
+        inputs.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns, content_sample_hash(path)])
+    data = json.dumps({"version": CACHE_VERSION, "decoder": resolve_backend(decoder), "inputs": inputs})
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _pad(offset: int) -> int:
+    return -offset % 8
+
+
+class ParseCache:
+    """Directory of memory-mapped, columnar snapshots of sorted position stores.
+
+    An entry holds a PositionStore after grouping and sorting: the latitude,
+    longitude and timestamp columns, the per-vessel offsets, the vessel ids
+    and the MMSI table, plus the parse counters of the run that wrote it.
+    ``load`` maps the file and wraps the columns without copying them, so a
+    hit skips decompression, JSON decoding, grouping and sorting.
+
+    After each write, entries not used for ``max_age`` seconds are removed,
+    then the least recently used ones until the total is within
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: int = DEFAULT_MAX_AGE):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def path(self, key: str) -> str:
+        """File path of the entry for a key."""
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def load(self, key: str) -> Optional[tuple]:
+        """Return (store, counters) for a key, or None on a miss or an unreadable entry."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapped) < _HEADER.size:
+            return None
+        magic, version, rows, vessels, table_bytes, *counts = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC or version != CACHE_VERSION:
+            return None
+
+        view = memoryview(mapped)
+        offset = _HEADER.size
+        columns = []
+        for code, length in (('d', rows), ('d', rows), ('q', rows), ('q', vessels + 1), ('i', rows)):
+            size = length * array(code).itemsize
+            columns.append(view[offset:offset + size].cast(code))
+            offset += size + _pad(size)
+        if offset + table_bytes > len(mapped):
+            return None
+        table = bytes(view[offset:offset + table_bytes]).decode().split('\n') if vessels else []
+
+        lat, lon, timestamp, offsets, mmsi_ids = columns
+        store = PositionStore.from_columns(lat, lon, timestamp, mmsi_ids, table)
+        store.offsets = offsets
+        store.is_sorted = True
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return store, dict(zip(COUNTERS, counts))
+
+    def save(self, key: str, store: PositionStore, counters: Dict[str, int]) -> str:
+        """Sort a store and write it as the entry for a key; returns the entry path."""
+        store.sort()
+        os.makedirs(self.directory, exist_ok=True)
+        table = '\n'.join(store.mmsi_table).encode()
+        header = _HEADER.pack(_MAGIC, CACHE_VERSION, len(store), store.vessel_count, len(table),
+                              *(counters.get(name, 0) for name in COUNTERS))
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                for column in (store.lat, store.lon, store.timestamp, store.offsets, store.mmsi_ids):
+                    data = memoryview(column).cast('B')
+                    f.write(data)
+                    f.write(bytes(_pad(len(data))))
+                f.write(table)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+        return self.path(key)
+
+    def entries(self) -> List[os.DirEntry]:
+        """Cache entries, least recently used first."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(ENTRY_SUFFIX)]
+        except FileNotFoundError:
+            return []
+        return sorted(entries, key=lambda entry: entry.stat().st_mtime)
+
+    def evict(self) -> int:
+        """Remove expired entries, then the oldest until within the size limit; returns the count removed."""
+        entries = self.entries()
+        now = time.time()
+        total = sum(entry.stat().st_size for entry in entries)
+        removed = 0
+        for entry in entries:
+            stat = entry.stat()
+            if now - stat.st_mtime <= self.max_age and total <= self.max_bytes:
+                continue
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        for entry in self.entries():
+            os.unlink(entry.path)
@@ -0,0 +1,159 @@
+"""Incremental processing of growing input files with persisted checkpoints."""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from ..models.episode import StopEpisode
+from ..utils.filters import PositionFilter
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD
+from ..utils.metrics import Metrics
+from .processor import MessageProcessor
+from .streaming import StreamingStopDetector
+
+CHECKPOINT_VERSION = 4
+# Number of leading input bytes hashed to recognise the same file
+FINGERPRINT_BYTES = 65536
+
+
+def file_fingerprint(path: str, length: int) -> str:
+    """Hash the first ``length`` bytes of a file."""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def run_settings(min_duration: int, reorder_window: int, speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+                 position_filter: Optional[PositionFilter] = None) -> dict:
+    """The settings that decide which stops a run finds, as recorded in its checkpoint."""
+    return {
+        "min_duration": min_duration,
+        "reorder_window": reorder_window,
+        "speed_threshold": speed_threshold,
+        "filter": position_filter.describe() if position_filter is not None else None,
+    }
+
+
+@dataclass
+class Checkpoint:
+    """Where a previous run stopped reading an input and the detector state at that point."""
+    input_path: str
+    offset: int
+    fingerprint: str
+    carry: bytes = b''
+    detector: dict = field(default_factory=dict)
+    settings: dict = field(default_factory=dict)
+
+    def matches(self, input_path: str) -> bool:
+        """Whether this checkpoint was written for this input, as far as it has been read."""
+        if os.path.abspath(input_path) != self.input_path:
+            return False
+        if os.path.getsize(input_path) < self.offset:
+            return False
+        length = min(self.offset, FINGERPRINT_BYTES)
+        return file_fingerprint(input_path, length) == self.fingerprint
+
+
+def load_checkpoint(path: str) -> Optional[Checkpoint]:
+    """Load a checkpoint file, returning None if it doesn't exist or is unreadable."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CHECKPOINT_VERSION:
+        return None
+    return Checkpoint(
+        input_path=data["input_path"],
+        offset=data["offset"],
+        fingerprint=data["fingerprint"],
+        carry=data["carry"].encode('latin-1'),
+        detector=data["detector"],
+        settings=data["settings"]
+    )
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    """Atomically write a checkpoint file as compact JSON."""
+    data = {
+        "version": CHECKPOINT_VERSION,
+        "input_path": checkpoint.input_path,
+        "offset": checkpoint.offset,
+        "fingerprint": checkpoint.fingerprint,
+        "carry": checkpoint.carry.decode('latin-1'),
+        "detector": checkpoint.detector,
+        "settings": checkpoint.settings
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def run_incremental(input_path: str, checkpoint_path: str, min_duration: int = 3600,
+                    reorder_window: int = 0, decoder: str = 'auto',
+                    metrics: Optional[Metrics] = None,
+                    position_filter: Optional[PositionFilter] = None,
+                    speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+                    final: bool = False) -> Tuple[List[StopEpisode], bool, Callable[[], None]]:
+    """Process only the data appended to an input since the last checkpoint.
+
+    Returns the stops that are new since the previous run, whether the run
+    resumed from a checkpoint (False means it started from scratch, so any
+    earlier output should be replaced rather than appended to), and a
+    ``commit`` function. Call it once the stops are safely written: it saves
+    the new checkpoint (or, after a final run, removes it), so a run whose
+    export fails leaves the previous checkpoint and is simply repeated.
+
+    Stops still open at the end of the data are kept in the detector state
+    and reported by the run in which they close, so the combined output of
+    all runs matches a full recompute over the same data. With a reorder
+    window, messages within the window of the end of the data are held over
+    to the next run along with the detector state. A ``final`` run treats
+    the input as complete: it also reports the stops still open at its end
+    and removes the checkpoint.
+
+    Plain inputs may simply be appended to; gzip inputs must grow by
+    appending complete gzip members. ``metrics`` and ``position_filter`` are
+    passed to the processor. Resuming a checkpoint written with a different
+    duration, reorder window, speed threshold or position filter raises
+    ValueError rather than mixing stops found with both.
+    """
+    settings = run_settings(min_duration, reorder_window, speed_threshold, position_filter)
+    checkpoint = load_checkpoint(checkpoint_path)
+    resumed = checkpoint is not None and checkpoint.matches(input_path)
+    if resumed and checkpoint.settings != settings:
+        changed = ', '.join(name for name in settings if checkpoint.settings.get(name) != settings[name])
+        raise ValueError(f"Checkpoint {checkpoint_path} was written with a different {changed}; "
+                         f"rerun with the same settings or start a new checkpoint")
+    if resumed:
+        detector = StreamingStopDetector.from_state(checkpoint.detector)
+        offset, carry = checkpoint.offset, checkpoint.carry
+    else:
+        detector = StreamingStopDetector(min_duration, reorder_window, speed_threshold=speed_threshold)
+        offset, carry = 0, b''
+
+    processor = MessageProcessor(input_path, decoder=decoder, start_offset=offset,
+                                 carry=carry, hold_partial=True, metrics=metrics,
+                                 position_filter=position_filter)
+    stops = []
+    for batch in processor.process_batches():
+        stops.extend(detector.push_batch(batch))
+    if final:
+        stops.extend(detector.flush())
+
+        def commit() -> None:
+            if os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+        return stops, resumed, commit
+
+    end_offset = processor.end_offset
+    new_checkpoint = Checkpoint(
+        input_path=os.path.abspath(input_path),
+        offset=end_offset,
+        fingerprint=file_fingerprint(input_path, min(end_offset, FINGERPRINT_BYTES)),
+        carry=processor.carry,
+        detector=detector.get_state(),
+        settings=settings
+    )
+    return stops, resumed, lambda: save_checkpoint(checkpoint_path, new_checkpoint)
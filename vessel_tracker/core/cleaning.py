@@ -0,0 +1,79 @@
+"""Track cleaning applied to each vessel's fixes before stop detection.
+
+Three optional steps run in order over a vessel's time-sorted fixes:
+
+- ``dedupe`` keeps only the first fix reported for each timestamp, so
+  repeated messages no longer look like zero-speed pairs.
+- ``max_speed`` drops single-fix GPS jumps: an interior fix whose speed from
+  the previous fix and to the next both exceed ``max_speed`` knots, while the
+  speed from the previous to the next fix does not.
+- ``smooth_window`` replaces latitude and longitude by their running median
+  over that many fixes (odd, repeated at the ends of the track).
+
+Each step looks only at the fixes immediately around a row, so the scalar
+version below and ``vectorized.clean_positions`` make the same decisions
+in a single pass.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from ..utils.geo import speed_between
+
+
+@dataclass(frozen=True)
+class Cleaning:
+    """Settings of the cleaning stage; the defaults only remove duplicate timestamps."""
+    dedupe: bool = True
+    max_speed: Optional[float] = None
+    smooth_window: int = 1
+
+    def __post_init__(self):
+        if self.max_speed is not None and self.max_speed <= 0:
+            raise ValueError("max_speed must be positive")
+        if self.smooth_window < 1 or self.smooth_window % 2 == 0:
+            raise ValueError("smooth_window must be a positive odd number")
+
+    @property
+    def active(self) -> bool:
+        """Whether any step is enabled."""
+        return self.dedupe or self.max_speed is not None or self.smooth_window > 1
+
+
+def clean_track(lat: Sequence[float], lon: Sequence[float], timestamp: Sequence[int],
+                start: int, end: int, cleaning: Cleaning) -> Tuple[List[int], List[float], List[float], List[int]]:
+    """Clean the time-sorted rows [start, end) of a single vessel.
+
+    Returns the rows kept and their latitude, longitude and timestamp
+    (latitude and longitude smoothed when asked).
+    """
+    rows = list(range(start, end))
+    if cleaning.dedupe:
+        rows = [i for i in rows if i == start or timestamp[i] != timestamp[i - 1]]
+
+    if cleaning.max_speed is not None and len(rows) >= 3:
+        limit = cleaning.max_speed
+        kept = [rows[0]]
+        for a, b, c in zip(rows, rows[1:], rows[2:]):
+            if not (speed_between(lat[a], lon[a], timestamp[a], lat[b], lon[b], timestamp[b]) > limit
+                    and speed_between(lat[b], lon[b], timestamp[b], lat[c], lon[c], timestamp[c]) > limit
+                    and speed_between(lat[a], lon[a], timestamp[a], lat[c], lon[c], timestamp[c]) <= limit):
+                kept.append(b)
+        kept.append(rows[-1])
+        rows = kept
+
+    track_lat = [lat[i] for i in rows]
+    track_lon = [lon[i] for i in rows]
+    if cleaning.smooth_window > 1:
+        track_lat = running_median(track_lat, cleaning.smooth_window)
+        track_lon = running_median(track_lon, cleaning.smooth_window)
+    return rows, track_lat, track_lon, [timestamp[i] for i in rows]
+
+
+def running_median(values: List[float], window: int) -> List[float]:
+    """Median of each odd-sized window, repeating the first and last values at the ends."""
+    half = window // 2
+    last = len(values) - 1
+    return [
+        sorted(values[min(max(i + k, 0), last)] for k in range(-half, half + 1))[half]
+        for i in range(len(values))
+    ]
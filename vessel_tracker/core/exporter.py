@@ -1,34 +1,430 @@
+import csv
+import gzip
 import json
-from typing import List
-from tqdm import tqdm
+import os
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Dict, Generator, Iterable, Optional, TextIO, Type
 
+from ..models.batch import PositionBatch, StopBatch
+from ..models.episode import EPISODE_FIELDS, StopEpisode
 from ..models.position import Position
 from ..utils.file import ensure_output_dir
-from ..utils.progress import GEOJSON_CREATOR
+from ..utils.geojson import json_number
+from ..utils.progress import GEOJSON_CREATOR, STOP_WRITER, progress_bar, status
 
+# File extensions written as newline-delimited GeoJSONSeq
+SEQUENCE_EXTENSIONS = ('.geojsonl', '.geojsons', '.geojsonseq', '.jsonl', '.ndjson')
+# Number of features written between progress bar updates
+PROGRESS_INTERVAL = 4096
+# Number of stops gathered into each batch for the columnar writers
+BATCH_SIZE = 65536
 
-class GeoJSONExporter:
-    """Exports vessel stops to GeoJSON format."""
+_HEADER = '{"type":"FeatureCollection","features":['
+_FOOTER = ']}\n'
+
+
+def feature_json(stop: Position) -> str:
+    """Serialize a stop as a compact GeoJSON Feature, matching its to_dict()."""
+    episode = ''
+    if isinstance(stop, StopEpisode):
+        episode = (
+            f',"end_timestamp":{int(stop.end_timestamp)},"end_datetime":"{stop.end_datetime.isoformat()}",'
+            f'"duration":{int(stop.duration)},"points":{int(stop.points)},'
+            f'"centroid":[{json_number(stop.centroid_lon)},{json_number(stop.centroid_lat)}],'
+            f'"bbox":[{json_number(stop.min_lon)},{json_number(stop.min_lat)},'
+            f'{json_number(stop.max_lon)},{json_number(stop.max_lat)}]'
+        )
+        if stop.port is not None:
+            episode += f',"port":{json.dumps(stop.port)}'
+    return (
+        '{"type":"Feature","geometry":{"type":"Point","coordinates":['
+        f'{json_number(stop.lon)},{json_number(stop.lat)}]}},'
+        f'"properties":{{"mmsi":{json.dumps(stop.mmsi)},"timestamp":{int(stop.timestamp)},'
+        f'"datetime":"{stop.datetime.isoformat()}"{episode}}}}}'
+    )
+
+
+def batch_positions(stops: Iterable[Position], size: int = BATCH_SIZE) -> Generator[PositionBatch, None, None]:
+    """Group a stream of stops into batches of up to ``size`` rows.
+
+    StopEpisodes are gathered into StopBatches, other positions into
+    PositionBatches.
+    """
+    batch = None
+    for stop in stops:
+        if batch is None:
+            batch = StopBatch() if isinstance(stop, StopEpisode) else PositionBatch()
+        if isinstance(batch, StopBatch):
+            batch.append_episode(stop)
+        else:
+            batch.append(stop.lat, stop.lon, stop.timestamp, stop.mmsi)
+        if len(batch) >= size:
+            yield batch
+            batch = None
+    if batch is not None:
+        yield batch
+
+
+class StopExporter(ABC):
+    """Base class for writers of vessel stops.
+
+    Subclasses implement ``export_batches``, which receives the analyzer's
+    stop batches directly; ``export`` accepts Position objects and batches
+    them first. ``appendable`` tells whether ``append=True`` is supported.
+    """
+
+    appendable = True
 
     def __init__(self, output_path: str):
         self.output_path = output_path
+        self.compress = output_path.endswith('.gz')
+        self.count = 0
+
+    def _open(self, mode: str) -> TextIO:
+        """Open the output file in text mode, compressed if needed."""
+        if self.compress:
+            return gzip.open(self.output_path, mode + 't', newline='')
+        return open(self.output_path, mode, newline='')
+
+    def _prepare(self, append: bool) -> bool:
+        """Create the output directory; returns whether an existing file is appended to."""
+        if append and not self.appendable:
+            raise ValueError(f"{type(self).__name__} does not support appending")
+        # Ensure output directory exists
+        ensure_output_dir(self.output_path)
+        status(f"\nWriting output to {self.output_path}...")
+        return append and os.path.exists(self.output_path)
+
+    def export(self, stops: Iterable[Position], append: bool = False) -> int:
+        """Write stops to the output file and return the number written."""
+        return self.export_batches(batch_positions(stops), append)
+
+    @abstractmethod
+    def export_batches(self, batches: Iterable[PositionBatch], append: bool = False) -> int:
+        """Write batches of stops to the output file and return the number written."""
 
-    def export(self, stops: List[Position]) -> None:
-        """Create GeoJSON output file from list of stops."""
+
+class GeoJSONExporter(StopExporter):
+    """Exports vessel stops to GeoJSON format.
+
+    Features are written one at a time as stops arrive, either as a compact
+    FeatureCollection or, with ``sequence`` (inferred from extensions such as
+    ``.geojsonl``), as newline-delimited GeoJSONSeq. Paths ending in ``.gz``
+    are gzip compressed. ``indent`` restores a pretty-printed
+    FeatureCollection, which is built in memory as before. ``serialize``
+    turns each item into its compact feature JSON.
+    """
+
+    serialize = staticmethod(feature_json)
+
+    def __init__(self, output_path: str, sequence: Optional[bool] = None, indent: Optional[int] = None):
+        super().__init__(output_path)
+        base_path = output_path[:-3] if self.compress else output_path
+        self.sequence = base_path.endswith(SEQUENCE_EXTENSIONS) if sequence is None else sequence
+        self.indent = indent
+
+    def export_batches(self, batches: Iterable[PositionBatch], append: bool = False) -> int:
+        """Write batches of stops to the output file and return the number written."""
+        return self.export((stop for batch in batches for stop in batch.positions()), append)
+
+    def export(self, stops: Iterable[Position], append: bool = False) -> int:
+        """Write stops to the output file and return the number written.
+
+        With ``append``, features already in an existing output file are kept
+        and the new stops are added after them.
+        """
+        exists = self._prepare(append)
+        if self.indent is not None and not self.sequence:
+            return self._export_indented(stops, exists)
+        if self.sequence:
+            with self._open('a' if exists else 'w') as f:
+                return self._write_features(f, stops, '\n', '')
+        if exists and not self.compress and self._reopen_collection():
+            with open(self.output_path, 'a') as f:
+                count = self._write_features(f, stops, '', ',')
+                f.write(_FOOTER)
+                return count
+        if exists:
+            return self._export_rewrite(stops)
+
+        with self._open('w') as f:
+            f.write(_HEADER)
+            count = self._write_features(f, stops, '', '')
+            f.write(_FOOTER)
+        return count
+
+    def _write_features(self, f: TextIO, stops: Iterable[Position], end: str, first_sep: str) -> int:
+        """Stream features to an open file."""
+        count = 0
+        sep = first_sep
+        with progress_bar(**GEOJSON_CREATOR) as pbar:
+            for stop in stops:
+                if self.sequence:
+                    f.write(self.serialize(stop))
+                    f.write(end)
+                else:
+                    f.write(sep)
+                    f.write(self.serialize(stop))
+                    sep = ','
+                count += 1
+                if count % PROGRESS_INTERVAL == 0:
+                    pbar.update(PROGRESS_INTERVAL)
+            pbar.update(count % PROGRESS_INTERVAL)
+        self.count += count
+        return count
+
+    def _reopen_collection(self) -> bool:
+        """Strip the closing brackets of a compact FeatureCollection written by this exporter.
+
+        Returns False if the file isn't in that format, or has no features
+        yet, in which case it has to be rewritten.
+        """
+        with open(self.output_path, 'rb+') as f:
+            head = f.read(len(_HEADER))
+            if head != _HEADER.encode():
+                return False
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            tail_size = len(_FOOTER) + 1
+            if size < len(_HEADER) + tail_size:
+                return False
+            f.seek(size - tail_size)
+            tail = f.read()
+            if tail[1:] != _FOOTER.encode() or tail[:1] != b'}':
+                return False
+            f.truncate(size - len(_FOOTER))
+        return True
+
+    def _export_rewrite(self, stops: Iterable[Position]) -> int:
+        """Append to an existing FeatureCollection by loading and rewriting it."""
+        with self._open('r') as f:
+            features = json.load(f)["features"]
+        with self._open('w') as f:
+            f.write(_HEADER)
+            for i, feature in enumerate(features):
+                if i:
+                    f.write(',')
+                f.write(json.dumps(feature, separators=(',', ':')))
+            count = self._write_features(f, stops, '', ',' if features else '')
+            f.write(_FOOTER)
+        return count
+
+    def _export_indented(self, stops: Iterable[Position], append: bool) -> int:
+        """Build the whole document in memory and write it pretty-printed."""
         features = []
+        if append:
+            with self._open('r') as f:
+                features = json.load(f)["features"]
+        new_features = [stop.to_dict() for stop in stops]
+        features.extend(new_features)
+        with self._open('w') as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, indent=self.indent)
+        self.count += len(new_features)
+        return len(new_features)
 
-        with tqdm(stops, **GEOJSON_CREATOR) as pbar:
-            for stop in pbar:
-                features.append(stop.to_dict())
 
-        geojson = {
-            "type": "FeatureCollection",
-            "features": features
-        }
+class GeoJSONSeqExporter(GeoJSONExporter):
+    """Exports vessel stops as newline-delimited GeoJSONSeq."""
+
+    def __init__(self, output_path: str):
+        super().__init__(output_path, sequence=True)
+
+
+class CSVExporter(StopExporter):
+    """Exports vessel stops as CSV rows of mmsi, timestamp, datetime, lat and lon.
+
+    Stop episodes add end_timestamp, end_datetime, duration and the other
+    episode fields, and labelled stops a port column; the header follows the
+    first batch.
+    """
+
+    columns = ('mmsi', 'timestamp', 'datetime', 'lat', 'lon')
+    episode_columns = ('end_timestamp', 'end_datetime', 'duration') + tuple(
+        name for name, _ in EPISODE_FIELDS[1:])
+
+    def export_batches(self, batches: Iterable[PositionBatch], append: bool = False) -> int:
+        """Write batches of stops as CSV rows and return the number written."""
+        exists = self._prepare(append)
+        count = 0
+        header = not exists
+        with self._open('a' if exists else 'w') as f, progress_bar(**STOP_WRITER) as pbar:
+            writer = csv.writer(f)
+            for batch in batches:
+                episodes = isinstance(batch, StopBatch)
+                if header:
+                    writer.writerow(self.columns + (self.episode_columns if episodes else ())
+                                    + (('port',) if episodes and batch.ports is not None else ()))
+                    header = False
+                if episodes and batch.ports is not None:
+                    writer.writerows(row + (port,) for row, port in zip(self._episode_rows(batch), batch.ports))
+                elif episodes:
+                    writer.writerows(self._episode_rows(batch))
+                else:
+                    writer.writerows(self._rows(batch))
+                count += len(batch)
+                pbar.update(len(batch))
+            if header:
+                writer.writerow(self.columns)
+        self.count += count
+        return count
+
+    @staticmethod
+    def _rows(batch: PositionBatch) -> Iterable[tuple]:
+        table = batch.mmsi_table
+        return (
+            (table[mmsi_id], timestamp, datetime.utcfromtimestamp(timestamp).isoformat(), lat, lon)
+            for lat, lon, timestamp, mmsi_id in zip(batch.lat, batch.lon, batch.timestamp, batch.mmsi_ids)
+        )
+
+    @classmethod
+    def _episode_rows(cls, batch: StopBatch) -> Iterable[tuple]:
+        return (
+            row + (end, datetime.utcfromtimestamp(end).isoformat(), end - row[1], *episode)
+            for row, end, *episode in zip(cls._rows(batch), *batch.episode_columns)
+        )
+
+
+def _import_pyarrow():
+    """Import pyarrow, which the columnar formats need."""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("The arrow and parquet formats require pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+class ArrowExporter(StopExporter):
+    """Exports vessel stops as an Arrow IPC file, one record batch per stop batch.
+
+    Columns are built straight from the batch arrays: mmsi (string),
+    timestamp (int64 seconds), datetime (UTC timestamp), lat and lon. Stop
+    episodes add end_timestamp, points (int64) and the centroid and extent
+    (float64) columns, and labelled stops a port (string) column; the
+    schema follows the first batch.
+    """
+
+    appendable = False
+
+    def __init__(self, output_path: str):
+        super().__init__(output_path)
+        if self.compress:
+            raise ValueError(f"{type(self).__name__} output cannot be gzipped: {output_path}")
+        self.pa = _import_pyarrow()
+        pa = self.pa
+        self.schema = pa.schema([
+            ('mmsi', pa.string()),
+            ('timestamp', pa.int64()),
+            ('datetime', pa.timestamp('s', tz='UTC')),
+            ('lat', pa.float64()),
+            ('lon', pa.float64()),
+        ])
+        self.episode_schema = pa.schema(list(self.schema) + [
+            (name, pa.int64() if code == 'q' else pa.float64()) for name, code in EPISODE_FIELDS
+        ])
+        self.port_schema = pa.schema(list(self.episode_schema) + [('port', pa.string())])
+        self._table_source = None
+        self._table_array = None
+
+    def record_batch(self, batch: PositionBatch):
+        """Convert a PositionBatch into a pyarrow RecordBatch without per-row work."""
+        pa = self.pa
+        n = len(batch)
+        if batch.mmsi_table is not self._table_source or len(self._table_array) != len(batch.mmsi_table):
+            self._table_source = batch.mmsi_table
+            self._table_array = pa.array(batch.mmsi_table, pa.string())
+        ids = pa.Array.from_buffers(pa.int32(), n, [None, pa.py_buffer(batch.mmsi_ids)])
+        timestamps = pa.py_buffer(batch.timestamp)
+        columns = [
+            self._table_array.take(ids),
+            pa.Array.from_buffers(pa.int64(), n, [None, timestamps]),
+            pa.Array.from_buffers(pa.timestamp('s', tz='UTC'), n, [None, timestamps]),
+            pa.Array.from_buffers(pa.float64(), n, [None, pa.py_buffer(batch.lat)]),
+            pa.Array.from_buffers(pa.float64(), n, [None, pa.py_buffer(batch.lon)]),
+        ]
+        if not isinstance(batch, StopBatch):
+            return pa.RecordBatch.from_arrays(columns, schema=self.schema)
+        columns.extend(
+            pa.Array.from_buffers(field.type, n, [None, pa.py_buffer(column)])
+            for field, column in zip(list(self.episode_schema)[len(columns):], batch.episode_columns)
+        )
+        if batch.ports is None:
+            return pa.RecordBatch.from_arrays(columns, schema=self.episode_schema)
+        columns.append(pa.array(batch.ports, pa.string()))
+        return pa.RecordBatch.from_arrays(columns, schema=self.port_schema)
+
+    def _writer(self, schema):
+        """Open the format-specific batch writer."""
+        return self.pa.ipc.new_file(self.output_path, schema)
+
+    def export_batches(self, batches: Iterable[PositionBatch], append: bool = False) -> int:
+        """Write batches of stops and return the number written."""
+        self._prepare(append)
+        count = 0
+        with ExitStack() as stack, progress_bar(**STOP_WRITER) as pbar:
+            writer = None
+            for batch in batches:
+                if not len(batch):
+                    continue
+                record_batch = self.record_batch(batch)
+                if writer is None:
+                    writer = stack.enter_context(self._writer(record_batch.schema))
+                writer.write_batch(record_batch)
+                count += len(batch)
+                pbar.update(len(batch))
+            if writer is None:
+                stack.enter_context(self._writer(self.schema))
+        self.count += count
+        return count
+
+
+class ParquetExporter(ArrowExporter):
+    """Exports vessel stops as a Parquet file, one row group per stop batch."""
+
+    def _writer(self, schema):
+        """Open the format-specific batch writer."""
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.output_path, schema)
+
+
+EXPORTERS: Dict[str, Type[StopExporter]] = {
+    'geojson': GeoJSONExporter,
+    'geojsonseq': GeoJSONSeqExporter,
+    'csv': CSVExporter,
+    'arrow': ArrowExporter,
+    'parquet': ParquetExporter,
+}
+
+FORMAT_EXTENSIONS = {
+    '.csv': 'csv',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.parquet': 'parquet',
+    **{extension: 'geojsonseq' for extension in SEQUENCE_EXTENSIONS},
+}
+
+# File extension written for each format when only the format is known
+FORMAT_SUFFIXES = {
+    'geojson': '.geojson',
+    'geojsonseq': '.geojsonl',
+    'csv': '.csv',
+    'arrow': '.arrow',
+    'parquet': '.parquet',
+}
+
+
+def infer_format(output_path: str) -> str:
+    """Pick an output format from the file extension, defaulting to GeoJSON."""
+    base_path = output_path[:-3] if output_path.endswith('.gz') else output_path
+    extension = os.path.splitext(base_path)[1].lower()
+    return FORMAT_EXTENSIONS.get(extension, 'geojson')
 
-        # Ensure output directory exists
-        ensure_output_dir(self.output_path)
 
-        print(f"\nWriting output to {self.output_path}...")
-        with open(self.output_path, 'w') as f:
-            json.dump(geojson, f, indent=2)
\ No newline at end of file
+def get_exporter(output_path: str, output_format: Optional[str] = None) -> StopExporter:
+    """Create the exporter registered for a format, inferred from the path if not given."""
+    output_format = output_format or infer_format(output_path)
+    if output_format not in EXPORTERS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return EXPORTERS[output_format](output_path)
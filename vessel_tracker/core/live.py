@@ -0,0 +1,342 @@
+"""Asyncio ingest of live, newline-delimited AIS feeds into streaming stop detection.
+
+A reader task takes whatever bytes the source has ready (standard input or
+a TCP connection) and hands complete lines to a bounded queue; when the
+queue is full the reader waits, so a fast source is slowed down by TCP flow
+control or the pipe buffer instead of filling memory. A consumer decodes
+each chunk of lines as one batch and feeds a StreamingStopDetector in a
+worker thread, leaving the event loop free to keep reading. Stops are
+written to a GeoJSONSeq file as they close.
+
+``serve_replay`` is a stand-in for a live feed: a TCP server that streams
+files to each client at a set rate.
+"""
+import asyncio
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple, Union
+
+from ..models.episode import StopEpisode
+from ..utils.file import (
+    STDIN_PATH, TCP_PREFIX, ensure_output_dir, iter_lines, open_file_with_raw, split_lines
+)
+from ..utils.filters import PositionFilter
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD
+from ..utils.metrics import Distribution, Metrics
+from ..utils.parsing import Decoder
+from ..utils.progress import status
+from .exporter import feature_json
+from .parallel import parse_lines
+from .processor import _make_decoder
+from .streaming import StreamingStopDetector
+
+# Most bytes taken from the source at a time; under load this sets the batch size
+READ_BYTES = 1 << 20
+# Default number of chunks of lines waiting to be decoded
+DEFAULT_QUEUE_SIZE = 8
+# Seconds' worth of lines sent between pauses by a rate-limited replay
+REPLAY_GRANULARITY = 0.02
+
+
+def parse_source(source: str) -> Optional[Tuple[str, int]]:
+    """(host, port) of a 'tcp://host:port' source, or None for standard input ('-')."""
+    if source == STDIN_PATH:
+        return None
+    if not source.startswith(TCP_PREFIX):
+        raise ValueError(f"Live sources are '-' or tcp://host:port, not: {source}")
+    host, _, port = source[len(TCP_PREFIX):].rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"Live source needs a host and port: {source}")
+    return host.strip('[]'), int(port)
+
+
+class FileReader:
+    """Reads a regular file (such as redirected standard input) in a thread, like a StreamReader."""
+
+    def __init__(self, f):
+        self.f = f
+
+    async def read(self, n: int) -> bytes:
+        return await asyncio.to_thread(self.f.read1, n)
+
+
+async def open_source(source: str) -> Union[asyncio.StreamReader, FileReader]:
+    """Open standard input or a TCP connection as a stream reader."""
+    address = parse_source(source)
+    if address is not None:
+        reader, writer = await asyncio.open_connection(*address)
+        reader.writer = writer  # closing the writer closes the connection; see close_source
+        return reader
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin.buffer)
+    except ValueError:
+        # Pipes, sockets and terminals only; a redirected file is read in a thread
+        return FileReader(sys.stdin.buffer)
+    return reader
+
+
+async def close_source(reader: Union[asyncio.StreamReader, FileReader]) -> None:
+    """Close the TCP connection of a source opened by open_source, if it has one."""
+    writer = getattr(reader, 'writer', None)
+    if writer is not None:
+        await _close_writer(writer)
+
+
+async def _close_writer(writer: asyncio.StreamWriter) -> None:
+    """Close a connection and wait until its transport is released."""
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass  # the other side already dropped the connection
+
+
+@dataclass
+class LiveStats:
+    """Throughput, backlog and latency counters of a live run.
+
+    Latency runs from the arrival of the chunk holding the message that
+    closed (or released) a stop until the stop is written.
+    """
+    lines: int = 0
+    bytes: int = 0
+    positions: int = 0
+    json_errors: int = 0
+    non_position: int = 0
+    invalid_positions: int = 0
+    filtered: int = 0
+    batches: int = 0
+    stops: int = 0
+    queue_peak: int = 0
+    latency: Distribution = field(default_factory=Distribution)
+    started: float = 0.0
+    elapsed: float = 0.0
+
+    def record_latency(self, seconds: float, count: int) -> None:
+        """Record the latency of ``count`` stops written together."""
+        self.latency.add(seconds, count)
+
+    @property
+    def throughput(self) -> float:
+        """Lines read per second."""
+        elapsed = self.elapsed or (time.monotonic() - self.started)
+        return self.lines / elapsed if elapsed > 0 else 0.0
+
+    def describe(self) -> str:
+        """One-line summary for status reports."""
+        latency = self.latency
+        low, high = (latency.minimum, latency.maximum) if latency.count else (0.0, 0.0)
+        return (f"{self.lines:,} lines ({self.throughput:,.0f}/s), {self.positions:,} positions, "
+                f"{self.stops:,} stops, latency min {low * 1000:.1f} ms mean {latency.mean * 1000:.1f} ms "
+                f"max {high * 1000:.1f} ms, queue peak {self.queue_peak}")
+
+    def record(self, metrics: Metrics) -> None:
+        """Add the counters to run metrics, and the latencies as a distribution in milliseconds."""
+        for name in ('lines', 'bytes', 'positions', 'json_errors', 'non_position', 'invalid_positions',
+                     'filtered', 'batches', 'stops', 'queue_peak'):
+            metrics.count(name if name != 'lines' else 'lines_read', getattr(self, name))
+        metrics.distribution("latency_ms").merge(self.latency, 1000)
+
+
+class GeoJSONSeqSink:
+    """Writes stops to a GeoJSONSeq file, one flushed line per feature.
+
+    The file is overwritten unless ``append`` is set.
+    """
+
+    def __init__(self, output_path: str, append: bool = False):
+        if output_path.endswith('.gz'):
+            raise ValueError("Live output cannot be gzipped")
+        ensure_output_dir(output_path)
+        self.output_path = output_path
+        self._file = open(output_path, 'a' if append else 'w')
+        self.count = 0
+
+    def write(self, stops: Sequence[StopEpisode]) -> int:
+        """Write stops and flush them to the file; returns the number written."""
+        if stops:
+            self._file.write(''.join(feature_json(stop) + '\n' for stop in stops))
+            self._file.flush()
+            self.count += len(stops)
+        return len(stops)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class LiveIngest:
+    """Feeds a stream of JSON lines through a StreamingStopDetector into a sink.
+
+    ``queue_size`` bounds the chunks of lines read but not yet decoded.
+    With ``stats_interval`` the counters are reported as a status line
+    every that many seconds.
+    """
+
+    def __init__(self, detector: StreamingStopDetector, sink: GeoJSONSeqSink,
+                 decoder: Union[str, Decoder] = 'auto', position_filter: Optional[PositionFilter] = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, stats_interval: Optional[float] = None):
+        self.detector = detector
+        self.sink = sink
+        self.decoder = decoder if isinstance(decoder, Decoder) else _make_decoder(decoder, position_filter)
+        self.queue_size = queue_size
+        self.stats_interval = stats_interval
+        self.stats = LiveStats()
+
+    async def run(self, reader: Union[asyncio.StreamReader, FileReader]) -> LiveStats:
+        """Ingest until the source ends, then close the remaining stops."""
+        self.stats.started = time.monotonic()
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        reporter = asyncio.create_task(self._report()) if self.stats_interval else None
+        tasks = [asyncio.create_task(self._read(reader, queue)), asyncio.create_task(self._consume(queue))]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if reporter is not None:
+                reporter.cancel()
+        self.stats.elapsed = time.monotonic() - self.stats.started
+        return self.stats
+
+    async def _read(self, reader: Union[asyncio.StreamReader, FileReader], queue: asyncio.Queue) -> None:
+        """Queue the complete lines of each chunk read, then None at the end of the source."""
+        stats = self.stats
+        carry = b''
+        while True:
+            data = await reader.read(READ_BYTES)
+            if not data:
+                break
+            received = time.monotonic()
+            stats.bytes += len(data)
+            data = carry + data
+            end = data.rfind(b'\n') + 1
+            carry = data[end:]
+            if end:
+                await queue.put((received, split_lines(data[:end])))
+                stats.queue_peak = max(stats.queue_peak, queue.qsize())
+        if carry:
+            await queue.put((time.monotonic(), [carry]))
+        await queue.put(None)
+
+    async def _consume(self, queue: asyncio.Queue) -> None:
+        """Decode and detect each queued chunk in a worker thread, in arrival order."""
+        while True:
+            item = await queue.get()
+            if item is None:
+                await asyncio.to_thread(self._finish)
+                return
+            await asyncio.to_thread(self._process, *item)
+
+    def _process(self, received: float, lines: List[bytes]) -> None:
+        """Decode one chunk of lines, advance the detector and write the stops it closes."""
+        batch = parse_lines(lines, self.decoder)
+        stats = self.stats
+        stats.batches += 1
+        stats.lines += batch.lines
+        stats.positions += len(batch)
+        stats.json_errors += batch.errors
+        stats.non_position += batch.non_position
+        stats.invalid_positions += batch.invalid
+        stats.filtered += batch.filtered
+        self._write(self.detector.push_batch(batch), received)
+
+    def _finish(self) -> None:
+        """End of the source: close every open stop."""
+        self._write(self.detector.flush(), time.monotonic())
+
+    def _write(self, stops: List[StopEpisode], received: float) -> None:
+        count = self.sink.write(stops)
+        if count:
+            self.stats.stops += count
+            self.stats.record_latency(time.monotonic() - received, count)
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            status(self.stats.describe())
+
+
+def run_live(source: str, output_path: str, min_duration: int = 3600, reorder_window: int = 0,
+             idle_timeout: Optional[int] = None, speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+             decoder: str = 'auto', position_filter: Optional[PositionFilter] = None,
+             queue_size: int = DEFAULT_QUEUE_SIZE, stats_interval: Optional[float] = None,
+             append: bool = False, metrics: Optional[Metrics] = None) -> LiveStats:
+    """Detect stops on a live feed ('-' or tcp://host:port) until it ends.
+
+    Stops are written to the GeoJSONSeq ``output_path`` (after its existing
+    stops with ``append``) as they close, and the open ones when the feed
+    ends. ``idle_timeout`` finalizes vessels silent for that many seconds of
+    stream time, bounding memory on an unbounded feed.
+    """
+    parse_source(source)  # reject a bad source before the output is truncated
+    detector = StreamingStopDetector(min_duration, reorder_window, idle_timeout, speed_threshold)
+    sink = GeoJSONSeqSink(output_path, append)
+
+    async def main() -> LiveStats:
+        reader = await open_source(source)
+        try:
+            ingest = LiveIngest(detector, sink, decoder, position_filter, queue_size, stats_interval)
+            return await ingest.run(reader)
+        finally:
+            await close_source(reader)
+
+    try:
+        stats = asyncio.run(main())
+    finally:
+        sink.close()
+    if metrics is not None:
+        stats.record(metrics)
+        metrics.count("vessels", len(detector.vessels))
+        metrics.count("late_messages", detector.late_messages)
+    return stats
+
+
+async def replay(paths: Sequence[str], writer: asyncio.StreamWriter, rate: Optional[float] = None) -> int:
+    """Send the lines of files to a stream, at ``rate`` lines per second if given; returns lines sent."""
+    loop = asyncio.get_running_loop()
+    step = max(1, int(rate * REPLAY_GRANULARITY)) if rate else 1024
+    start = loop.time()
+    sent = 0
+    for path in paths:
+        f, raw = open_file_with_raw(path)
+        try:
+            for line in iter_lines(f):
+                writer.write(line if line.endswith(b'\n') else line + b'\n')
+                sent += 1
+                if sent % step == 0:
+                    if writer.is_closing():
+                        return sent
+                    await writer.drain()
+                    if rate:
+                        delay = start + sent / rate - loop.time()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+        finally:
+            f.close()
+            if raw is not f:
+                raw.close()
+    await writer.drain()
+    return sent
+
+
+async def serve_replay(paths: Sequence[str], host: str = '127.0.0.1', port: int = 0,
+                       rate: Optional[float] = None) -> asyncio.AbstractServer:
+    """Start a TCP server replaying files to each client, then closing the connection.
+
+    ``port`` 0 picks a free port; read it from ``server.sockets[0].getsockname()``.
+    """
+    paths = [os.fspath(path) for path in paths]
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await replay(paths, writer, rate)
+        except ConnectionError:
+            pass
+        finally:
+            await _close_writer(writer)
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,159 @@
+"""Process-pool ingest engine for parsing AIS messages on multiple cores."""
+import mmap
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Generator, Iterable, List, Tuple, Union
+
+from ..models.batch import PositionBatch
+from ..utils.file import iter_lines, open_file_with_raw, read_blocks, split_lines
+from ..utils.parsing import Decoder, resolve_decoder
+
+# Size of the byte ranges handed to workers for plain JSON input
+CHUNK_BYTES = 16 * 1024 * 1024
+# Size of the decompressed blocks streamed to workers for gzip input
+BLOCK_BYTES = 8 * 1024 * 1024
+# Number of in-flight tasks per worker, bounding memory use
+TASKS_PER_WORKER = 2
+
+
+def parse_lines(lines: Iterable[bytes], decoder: Union[str, Decoder] = 'auto') -> PositionBatch:
+    """Parse JSON lines into a compact position batch.
+
+    ``decoder`` is a backend name or a Decoder, which may carry a position filter.
+    """
+    decoder = resolve_decoder(decoder)
+    parse_fields = decoder.parse_fields
+    non_position, invalid, filtered = decoder.non_position, decoder.invalid, decoder.filtered
+    batch = PositionBatch()
+    count = 0
+    errors = 0
+    for line in lines:
+        count += 1
+        try:
+            fields = parse_fields(line)
+        except ValueError:
+            errors += 1
+            continue
+        if fields is not None:
+            batch.append(*fields)
+    batch.lines = count
+    batch.errors = errors
+    batch.non_position = decoder.non_position - non_position
+    batch.invalid = decoder.invalid - invalid
+    batch.filtered = decoder.filtered - filtered
+    return batch
+
+
+def parse_block(block: bytes, decoder: Union[str, Decoder] = 'auto') -> PositionBatch:
+    """Parse a block of complete, newline-delimited JSON lines."""
+    lines = block.split(b'\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    return parse_lines(lines, decoder)
+
+
+def parse_range(path: str, start: int, end: int, decoder: Union[str, Decoder] = 'auto') -> PositionBatch:
+    """Parse the lines of a plain file whose first byte lies in [start, end).
+
+    The file is memory-mapped and the range's lines split out of a single slice.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse_lines([], decoder)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            first = mapped.find(b'\n', start - 1) + 1 if start > 0 else 0
+            if first == 0 and start > 0 or first >= end:
+                return parse_lines([], decoder)
+            stop = mapped.find(b'\n', end - 1) + 1 or len(mapped)
+            lines = split_lines(mapped[first:stop])
+    return parse_lines(lines, decoder)
+
+
+def parse_file(path: str, decoder: Union[str, Decoder] = 'auto') -> PositionBatch:
+    """Parse a whole input file, plain or gzip, into one batch."""
+    f, raw = open_file_with_raw(path)
+    with raw, f:
+        return parse_lines(iter_lines(f), decoder)
+
+
+def byte_ranges(path: str, chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Split a file into consecutive byte ranges of at most chunk_bytes."""
+    size = os.path.getsize(path)
+    return [(start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+
+def ordered_map(executor: Executor, fn: Callable, tasks: Iterable[tuple],
+                max_pending: int) -> Generator:
+    """Map fn over tasks on an executor, yielding results in submission order.
+
+    At most max_pending tasks are in flight at once, so lazily produced tasks
+    (such as decompressed blocks) are not all held in memory.
+    """
+    pending = deque()
+    for args in tasks:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def parallel_batches(path: str, workers: int, progress: Callable[[int], None] = None,
+                     chunk_bytes: int = None,
+                     decoder: Union[str, Decoder] = 'auto') -> Generator[PositionBatch, None, None]:
+    """Parse an input file across a process pool, yielding batches in file order.
+
+    Plain files are split into byte ranges that each worker reads itself.
+    Gzip files are decompressed here and streamed to workers in blocks.
+    ``progress`` is called with the number of input bytes consumed.
+    ``chunk_bytes`` overrides the default range or block size and ``decoder``
+    is the JSON backend name, or Decoder, used by the workers.
+    """
+    max_pending = workers * TASKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            if path.endswith('.gz'):
+                f, raw = open_file_with_raw(path)
+                with raw, f:
+                    offset = 0
+                    tasks = ((block, decoder) for block in read_blocks(f, chunk_bytes or BLOCK_BYTES))
+                    for batch in ordered_map(executor, parse_block, tasks, max_pending):
+                        if progress:
+                            consumed = raw.tell()
+                            progress(consumed - offset)
+                            offset = consumed
+                        yield batch
+                    if progress:
+                        progress(raw.tell() - offset)
+            else:
+                ranges = byte_ranges(path, chunk_bytes or CHUNK_BYTES)
+                tasks = ((path, start, end, decoder) for start, end in ranges)
+                results = ordered_map(executor, parse_range, tasks, max_pending)
+                for (start, end), batch in zip(ranges, results):
+                    if progress:
+                        progress(end - start)
+                    yield batch
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def parallel_file_batches(paths: List[str], workers: int, progress: Callable[[int], None] = None,
+                          decoder: Union[str, Decoder] = 'auto') -> Generator[PositionBatch, None, None]:
+    """Parse many input files across a process pool, one file per task.
+
+    Yields one batch per file, in the order of ``paths``. ``progress`` is
+    called with each file's size once it has been parsed.
+    """
+    max_pending = workers * TASKS_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            tasks = ((path, decoder) for path in paths)
+            for path, batch in zip(paths, ordered_map(executor, parse_file, tasks, max_pending)):
+                if progress:
+                    progress(os.path.getsize(path))
+                yield batch
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
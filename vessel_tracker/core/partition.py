@@ -0,0 +1,329 @@
+"""Out-of-core stop detection over hash partitions spilled to disk."""
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Generator, Iterable, List, Optional, Tuple
+
+from ..models.batch import PositionBatch, StopBatch
+from ..models.episode import StopEpisode
+from ..models.position import Position
+from ..models.store import PositionStore
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD
+from ..utils.optional import optional_module, worth_using
+from ..utils.progress import PARTITION_ANALYZER, progress_bar, status
+from .analyzer import STOP_BATCH_SIZE, VesselAnalyzer, _episode_arrays
+from .cleaning import Cleaning
+from .parallel import TASKS_PER_WORKER, ordered_map
+
+np = optional_module('numpy')
+
+DEFAULT_PARTITIONS = 16
+# Rows buffered across all partitions before they are spilled
+SPILL_ROWS = 1 << 20
+# Bytes of spilled data per row: lat, lon, timestamp and vessel id
+ROW_BYTES = 28
+# Approximate peak bytes per row while a partition is sorted and analyzed
+ANALYSIS_BYTES_PER_ROW = 72
+# Deepest re-partitioning of a partition that exceeds the memory budget
+MAX_SPLIT_DEPTH = 4
+
+_BLOCK_HEADER = struct.Struct('<q')
+Columns = Tuple[array, array, array, array]
+
+
+def _empty_columns() -> Columns:
+    return array('d'), array('d'), array('q'), array('i')
+
+
+def write_block(f: BinaryIO, columns: Columns) -> None:
+    """Append a block of rows: a row count followed by the lat, lon, timestamp and id columns."""
+    f.write(_BLOCK_HEADER.pack(len(columns[2])))
+    for column in columns:
+        column.tofile(f)
+
+
+def read_partition(path: str) -> Columns:
+    """Read every block of a partition file back into column arrays."""
+    columns = _empty_columns()
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if not header:
+                break
+            count, = _BLOCK_HEADER.unpack(header)
+            for column in columns:
+                column.fromfile(f, count)
+    return columns
+
+
+def partition_of(mmsi: str, partitions: int, salt: int = 0) -> int:
+    """Partition a vessel hashes to; ``salt`` gives an independent hash for re-partitioning."""
+    return zlib.crc32(mmsi.encode(), salt) % partitions
+
+
+def split_rows(columns: Columns, parts: array, partitions: int) -> List[Columns]:
+    """Split column arrays into one set per partition, keeping row order."""
+    if worth_using(np, len(columns[0])):
+        part = np.frombuffer(parts, dtype=np.int32)[np.frombuffer(columns[3], dtype=np.int32)]
+        order = np.argsort(part, kind='stable')
+        bounds = np.searchsorted(part[order], np.arange(partitions + 1))
+        views = [np.frombuffer(column, dtype=dtype)[order] for column, dtype in
+                 zip(columns, (np.float64, np.float64, np.int64, np.int32))]
+        result = []
+        for p in range(partitions):
+            lo, hi = bounds[p], bounds[p + 1]
+            split = _empty_columns()
+            for column, view in zip(split, views):
+                column.frombytes(view[lo:hi].tobytes())
+            result.append(split)
+        return result
+
+    result = [_empty_columns() for _ in range(partitions)]
+    for lat, lon, timestamp, vessel in zip(*columns):
+        split = result[parts[vessel]]
+        split[0].append(lat)
+        split[1].append(lon)
+        split[2].append(timestamp)
+        split[3].append(vessel)
+    return result
+
+
+def analyze_partition(path: str, min_duration: int, engine: str = 'auto',
+                      speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+                      cleaning: Optional[Cleaning] = None) -> List[array]:
+    """Find the stops in one partition file.
+
+    Vessel ids are global; the returned stop columns (lat, lon, timestamp,
+    vessel id, then the episode columns) are ordered by vessel id and then
+    time.
+    """
+    lat, lon, timestamp, vessels = read_partition(path)
+    if worth_using(np, len(vessels)):
+        uniques, local = np.unique(np.frombuffer(vessels, dtype=np.int32), return_inverse=True)
+        table = uniques.tolist()
+        mmsi_ids = array('i')
+        mmsi_ids.frombytes(local.astype(np.int32).tobytes())
+    else:
+        table = sorted(set(vessels))
+        index = {vessel: i for i, vessel in enumerate(table)}
+        mmsi_ids = array('i', (index[vessel] for vessel in vessels))
+    del vessels
+
+    analyzer = VesselAnalyzer(min_duration=min_duration, engine=engine, speed_threshold=speed_threshold,
+                              cleaning=cleaning)
+    analyzer.store = PositionStore.from_columns(lat, lon, timestamp, mmsi_ids, table)
+    stops = list(_empty_columns()) + _episode_arrays()
+    for batch in analyzer.iter_stop_batches(progress=False):
+        stops[0].extend(batch.lat)
+        stops[1].extend(batch.lon)
+        stops[2].extend(batch.timestamp)
+        stops[3].extend(table[i] for i in batch.mmsi_ids)
+        for column, values in zip(stops[4:], batch.episode_columns):
+            column.extend(values)
+    return stops
+
+
+class PartitionedAnalyzer:
+    """Finds vessel stops out of core by hash-partitioning positions on disk.
+
+    ``group_batches`` spills positions to ``partitions`` files keyed by a
+    hash of the MMSI, so each vessel lives in exactly one partition. Stops
+    are then found one partition at a time (``workers`` at a time in a
+    process pool), and a partition whose analysis would exceed
+    ``memory_budget`` bytes is first re-partitioned with a different hash.
+    Stops are yielded in the same order as VesselAnalyzer's: vessels in
+    order of first appearance, each vessel's stops in time order.
+
+    Spill files live in a temporary directory under ``spill_dir`` that is
+    removed by ``close`` (or on leaving a ``with`` block).
+    """
+
+    def __init__(self, min_duration: int = 3600, partitions: int = DEFAULT_PARTITIONS,
+                 memory_budget: Optional[int] = None, workers: int = 1,
+                 spill_dir: Optional[str] = None, engine: str = 'auto',
+                 speed_threshold: float = DEFAULT_SPEED_THRESHOLD, cleaning: Optional[Cleaning] = None):
+        if partitions < 1:
+            raise ValueError("partitions must be at least 1")
+        self.min_duration = min_duration
+        self.partitions = partitions
+        self.memory_budget = memory_budget
+        self.workers = workers
+        self.engine = engine
+        self.speed_threshold = speed_threshold
+        self.cleaning = cleaning
+        self.mmsi_table: List[str] = []
+        self._mmsi_index: Dict[str, int] = {}
+        self._parts = array('i')
+        self._buffers = [_empty_columns() for _ in range(partitions)]
+        self._buffered = 0
+        self.rows = 0
+        self.directory = tempfile.mkdtemp(prefix='vessel_tracker-', dir=spill_dir)
+        self.paths = [os.path.join(self.directory, f"part-{p:04d}.bin") for p in range(partitions)]
+
+    def __enter__(self) -> 'PartitionedAnalyzer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Remove the spill files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _intern(self, mmsi: str) -> int:
+        vessel = self._mmsi_index.get(mmsi)
+        if vessel is None:
+            vessel = self._mmsi_index[mmsi] = len(self.mmsi_table)
+            self.mmsi_table.append(mmsi)
+            self._parts.append(partition_of(mmsi, self.partitions))
+        return vessel
+
+    def group_positions(self, positions: Iterable[Position]) -> None:
+        """Spill positions to their partitions."""
+        batch = PositionBatch()
+        for pos in positions:
+            batch.append(pos.lat, pos.lon, pos.timestamp, pos.mmsi)
+            if len(batch) >= SPILL_ROWS:
+                self.add_batch(batch)
+                batch = PositionBatch()
+        self.add_batch(batch)
+        self.flush()
+
+    def group_batches(self, batches: Iterable[PositionBatch]) -> None:
+        """Spill position batches to their partitions."""
+        status("\nPartitioning positions by vessel...")
+        for batch in batches:
+            self.add_batch(batch)
+        self.flush()
+
+    def add_batch(self, batch: PositionBatch) -> None:
+        """Buffer a batch of positions, spilling once enough rows are buffered."""
+        if not len(batch):
+            return
+        remap = [self._intern(mmsi) for mmsi in batch.mmsi_table]
+        if worth_using(np, len(batch)):
+            vessels = array('i')
+            vessels.frombytes(np.asarray(remap, dtype=np.int32)[
+                np.frombuffer(batch.mmsi_ids, dtype=np.int32)].tobytes())
+        else:
+            vessels = array('i', (remap[i] for i in batch.mmsi_ids))
+
+        splits = split_rows((batch.lat, batch.lon, batch.timestamp, vessels), self._parts, self.partitions)
+        for buffer, split in zip(self._buffers, splits):
+            for column, values in zip(buffer, split):
+                column.extend(values)
+        self._buffered += len(batch)
+        self.rows += len(batch)
+        if self._buffered >= SPILL_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows to the partition files."""
+        for p, buffer in enumerate(self._buffers):
+            if len(buffer[2]):
+                with open(self.paths[p], 'ab') as f:
+                    write_block(f, buffer)
+                self._buffers[p] = _empty_columns()
+        self._buffered = 0
+
+    def _fits(self, path: str) -> bool:
+        """Whether analyzing a partition file stays within the memory budget."""
+        if self.memory_budget is None:
+            return True
+        rows = os.path.getsize(path) // ROW_BYTES
+        return rows * ANALYSIS_BYTES_PER_ROW <= self.memory_budget
+
+    def _split(self, path: str, depth: int) -> List[str]:
+        """Re-partition a file that exceeds the budget into files that fit, where possible."""
+        if self._fits(path) or depth > MAX_SPLIT_DEPTH:
+            return [path]
+        rows = os.path.getsize(path) // ROW_BYTES
+        count = -(-rows * ANALYSIS_BYTES_PER_ROW // self.memory_budget) * 2
+        parts = array('i', (partition_of(mmsi, count, depth) for mmsi in self.mmsi_table))
+        paths = [f"{path}.{p}" for p in range(count)]
+
+        # Split block by block so the oversized partition is never fully loaded
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(_BLOCK_HEADER.size)
+                if not header:
+                    break
+                block_rows, = _BLOCK_HEADER.unpack(header)
+                columns = _empty_columns()
+                for column in columns:
+                    column.fromfile(f, block_rows)
+                for sub_path, split in zip(paths, split_rows(columns, parts, count)):
+                    if len(split[2]):
+                        with open(sub_path, 'ab') as out:
+                            write_block(out, split)
+        os.remove(path)
+
+        paths = [sub_path for sub_path in paths if os.path.exists(sub_path)]
+        if len(paths) == 1:
+            # Most likely a single vessel, which cannot be split further
+            return paths
+        result = []
+        for sub_path in paths:
+            result.extend(self._split(sub_path, depth + 1))
+        return result
+
+    def _partition_files(self) -> List[str]:
+        """Spilled partition files, re-partitioned to fit the memory budget."""
+        self.flush()
+        files = []
+        for path in self.paths:
+            if os.path.exists(path):
+                files.extend(self._split(path, 1))
+        return files
+
+    def _analyze(self, files: List[str]) -> Generator[List[array], None, None]:
+        """Find the stops of each partition file, serially or in a process pool."""
+        if self.workers > 1 and len(files) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                tasks = ((path, self.min_duration, self.engine, self.speed_threshold, self.cleaning)
+                         for path in files)
+                yield from ordered_map(executor, analyze_partition, tasks,
+                                       self.workers * TASKS_PER_WORKER)
+        else:
+            for path in files:
+                yield analyze_partition(path, self.min_duration, self.engine, self.speed_threshold,
+                                        self.cleaning)
+
+    def find_stops(self) -> List[StopEpisode]:
+        """Find vessel stops across all partitions."""
+        return list(self.iter_stops())
+
+    def iter_stops(self) -> Generator[StopEpisode, None, None]:
+        """Yield vessel stops across all partitions."""
+        for batch in self.iter_stop_batches():
+            yield from batch.positions()
+
+    def iter_stop_batches(self) -> Generator[StopBatch, None, None]:
+        """Yield vessel stops as compact batches once every partition has been analyzed."""
+        files = self._partition_files()
+        if not files:
+            return
+        status(f"\nProcessing {len(self.mmsi_table):,} vessels in {len(files)} partitions...")
+
+        stops = list(_empty_columns()) + _episode_arrays()
+        with progress_bar(total=len(files), **PARTITION_ANALYZER) as pbar:
+            for found in self._analyze(files):
+                for column, values in zip(stops, found):
+                    column.extend(values)
+                pbar.update(1)
+
+        # Each vessel's stops come from a single partition, already in time
+        # order, so a stable sort by vessel id restores the in-memory order
+        vessels = stops[3]
+        if worth_using(np, len(vessels)):
+            order = np.argsort(np.frombuffer(vessels, dtype=np.int32), kind='stable')
+        else:
+            order = sorted(range(len(vessels)), key=vessels.__getitem__)
+        for start in range(0, len(order), STOP_BATCH_SIZE):
+            rows = order[start:start + STOP_BATCH_SIZE]
+            columns = [array(column.typecode, (column[i] for i in rows)) for column in stops]
+            yield StopBatch.from_columns(*columns[:4], self.mmsi_table, columns[4:])
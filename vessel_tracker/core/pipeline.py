@@ -0,0 +1,333 @@
+"""End-to-end runs: read the input, find stops (or tracks) and export them."""
+import os
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
+
+from .analyzer import STOP_BATCH_SIZE, VesselAnalyzer
+from .cache import ParseCache, cache_key
+from .cleaning import Cleaning
+from .exporter import FORMAT_SUFFIXES, batch_positions, get_exporter
+from .processor import MessageProcessor, MultiFileProcessor
+from ..models.store import PositionStore
+from ..utils.file import STDIN_PATH, expand_inputs
+from ..utils.filters import PositionFilter
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD
+from ..utils.metrics import Metrics
+from ..utils.progress import status
+
+if TYPE_CHECKING:
+    from .ports import PortIndex, PortLabeler
+    from .sweep import SweepResult
+    from .tracks import Simplification
+
+
+def process_vessel_data(
+    input_path: Union[str, Sequence[str]],
+    output_path: str,
+    min_stop_duration: int = 3600,
+    exact_count: bool = False,
+    write_sidecar: bool = False,
+    workers: int = 1,
+    decoder: str = 'auto',
+    streaming: bool = False,
+    reorder_window: int = 0,
+    checkpoint_path: str = None,
+    output_format: str = None,
+    metrics: Optional[Metrics] = None,
+    partitions: int = 0,
+    memory_budget: Optional[int] = None,
+    spill_dir: Optional[str] = None,
+    position_filter: Optional[PositionFilter] = None,
+    cache: Optional[ParseCache] = None,
+    speed_threshold: float = DEFAULT_SPEED_THRESHOLD,
+    cleaning: Optional[Cleaning] = None,
+    ports: Optional['PortIndex'] = None,
+    port_summary: Optional[str] = None,
+    finalize: bool = False
+) -> None:
+    """Main function to process vessel data and identify stops.
+
+    Each option corresponds to a command-line flag; see ``--help`` and the
+    readme for what it does.
+    """
+    if streaming and (partitions or memory_budget):
+        raise ValueError("Streaming and partitioned analysis cannot be combined")
+    if cleaning is not None and cleaning.active and (streaming or checkpoint_path):
+        raise ValueError("Track cleaning is not available in streaming or incremental runs")
+    if port_summary and ports is None:
+        raise ValueError("A port summary needs a port index")
+    if finalize and not checkpoint_path:
+        raise ValueError("Finalizing needs a checkpoint")
+
+    input_paths = expand_inputs([input_path] if isinstance(input_path, str) else input_path)
+    if not input_paths:
+        raise FileNotFoundError(f"No input files found in: {input_path}")
+
+    exporter = get_exporter(output_path, output_format)
+    if metrics is None:
+        metrics = Metrics()
+    labeler = None
+    if ports is not None:
+        from .ports import PortLabeler
+        labeler = PortLabeler(ports)
+
+    def label(batches):
+        """Label the stop batches on their way to the exporter when a port index is given."""
+        return metrics.timed("label", labeler.label(batches)) if labeler else batches
+
+    def export_stops(stops, append=False):
+        """Export StopEpisodes, batching them first when they are to be labelled."""
+        if labeler is None:
+            return exporter.export(stops, append)
+        return exporter.export_batches(label(batch_positions(stops)), append)
+
+    if len(input_paths) == 1:
+        status(f"\nProcessing input file: {input_paths[0]}")
+    else:
+        status(f"\nProcessing {len(input_paths):,} input files")
+    status(f"Output will be written to: {output_path}\n")
+
+    if checkpoint_path:
+        if not exporter.appendable:
+            raise ValueError("Incremental runs need an output format that can be appended to")
+        if len(input_paths) > 1:
+            raise ValueError("Incremental runs take a single input file")
+        from .checkpoint import run_incremental
+        with metrics.stage("detect"):
+            stops, resumed, commit = run_incremental(input_paths[0], checkpoint_path, min_stop_duration,
+                                                     reorder_window, decoder, metrics, position_filter,
+                                                     speed_threshold, finalize)
+        with metrics.stage("export"):
+            count = export_stops(stops, append=resumed)
+        # Only move the checkpoint past these stops once they are written
+        commit()
+        metrics.count("stops", count)
+        _finish_ports(labeler, port_summary, metrics)
+        status(f"\nProcessing complete. Found {count:,} new stops.")
+        return
+
+    # Process messages
+    processor = _make_processor(input_paths, exact_count, write_sidecar, workers, decoder,
+                                metrics, position_filter)
+    batches = metrics.timed("parse", processor.process_batches())
+
+    # Analyze vessel stops and export results as they are found
+    if streaming:
+        from .streaming import detect_stops
+        stops = detect_stops(batches, min_stop_duration, reorder_window, metrics, speed_threshold)
+        with metrics.stage("export"):
+            count = export_stops(metrics.timed("detect", stops))
+    elif partitions or memory_budget:
+        from .partition import DEFAULT_PARTITIONS, PartitionedAnalyzer
+        with PartitionedAnalyzer(min_stop_duration, partitions or DEFAULT_PARTITIONS, memory_budget,
+                                 workers, spill_dir, speed_threshold=speed_threshold,
+                                 cleaning=cleaning) as analyzer:
+            with metrics.stage("group"):
+                analyzer.group_batches(batches)
+            metrics.count("vessels", len(analyzer.mmsi_table))
+            with metrics.stage("export"):
+                stop_batches = metrics.timed("analyze", analyzer.iter_stop_batches())
+                count = exporter.export_batches(label(stop_batches))
+    else:
+        analyzer = VesselAnalyzer(min_duration=min_stop_duration, speed_threshold=speed_threshold,
+                                  cleaning=cleaning, workers=workers)
+        analyzer.store = _load_store(processor, batches, input_paths, decoder, position_filter,
+                                     cache, metrics)
+        metrics.count("vessels", analyzer.store.vessel_count)
+        with metrics.stage("export"):
+            stop_batches = metrics.timed("analyze", analyzer.iter_stop_batches())
+            count = exporter.export_batches(label(stop_batches))
+    metrics.count("stops", count)
+    _finish_ports(labeler, port_summary, metrics)
+
+    status(f"\nProcessing complete. Found {count:,} stops.")
+
+
+def sweep_vessel_data(
+    input_path: Union[str, Sequence[str]],
+    output_path: str,
+    speed_thresholds: Sequence[float] = (DEFAULT_SPEED_THRESHOLD,),
+    min_durations: Sequence[int] = (3600,),
+    stops_dir: Optional[str] = None,
+    output_format: Optional[str] = None,
+    exact_count: bool = False,
+    write_sidecar: bool = False,
+    workers: int = 1,
+    decoder: str = 'auto',
+    metrics: Optional[Metrics] = None,
+    position_filter: Optional[PositionFilter] = None,
+    cache: Optional[ParseCache] = None
+) -> List['SweepResult']:
+    """Count vessel stops for every combination of speed threshold and minimum duration.
+
+    The input is parsed and grouped once and the stops of all settings are
+    found in a single pass over the vessels (see ``core.sweep``). A summary
+    of stop and vessel counts per setting is written to ``output_path``, as
+    CSV for a ``.csv`` path and JSON otherwise. With ``stops_dir`` the stops
+    of each setting are also exported there, one file per setting in
+    ``output_format`` (GeoJSON by default). The other arguments are as for
+    ``process_vessel_data``.
+    """
+    from .sweep import sweep_stops, write_sweep_summary
+
+    input_paths = expand_inputs([input_path] if isinstance(input_path, str) else input_path)
+    if not input_paths:
+        raise FileNotFoundError(f"No input files found in: {input_path}")
+    if metrics is None:
+        metrics = Metrics()
+
+    processor = _make_processor(input_paths, exact_count, write_sidecar, workers, decoder,
+                                metrics, position_filter)
+    batches = metrics.timed("parse", processor.process_batches())
+    store = _load_store(processor, batches, input_paths, decoder, position_filter, cache, metrics)
+    metrics.count("vessels", store.vessel_count)
+
+    with metrics.stage("analyze"):
+        results = sweep_stops(store, speed_thresholds, min_durations, keep_stops=stops_dir is not None)
+    with metrics.stage("export"):
+        write_sweep_summary(results, output_path)
+        if stops_dir is not None:
+            output_format = output_format or 'geojson'
+            extension = FORMAT_SUFFIXES.get(output_format, '')
+            for result in results:
+                path = os.path.join(stops_dir, f"stops-{result.speed_threshold:g}kn-"
+                                               f"{result.min_duration}s{extension}")
+                exporter = get_exporter(path, output_format)
+                exporter.export_batches(store.take(result.stop_rows[start:start + STOP_BATCH_SIZE])
+                                        for start in range(0, len(result.stop_rows), STOP_BATCH_SIZE))
+    metrics.count("settings", len(results))
+
+    status(f"\nSweep complete. Summary written to: {output_path}")
+    return results
+
+
+def export_tracks(
+    input_path: Union[str, Sequence[str]],
+    output_path: str,
+    simplification: Optional['Simplification'] = None,
+    output_format: Optional[str] = None,
+    exact_count: bool = False,
+    write_sidecar: bool = False,
+    workers: int = 1,
+    decoder: str = 'auto',
+    metrics: Optional[Metrics] = None,
+    position_filter: Optional[PositionFilter] = None,
+    cache: Optional[ParseCache] = None,
+    cleaning: Optional[Cleaning] = None
+) -> int:
+    """Write each vessel's track as a simplified GeoJSON LineString; returns the number written.
+
+    Tracks are simplified to ``simplification`` (see ``core.tracks``; by
+    default a 50 m Douglas-Peucker tolerance) and
+    written one vessel at a time, as a FeatureCollection or, for
+    ``output_format`` 'geojsonseq' or a sequence extension such as
+    ``.geojsonl``, as GeoJSONSeq (``.gz`` compresses either). Each feature's
+    ``timestamps`` property gives the time of each vertex. ``cleaning``
+    cleans each track first; the other arguments are as for
+    ``process_vessel_data``.
+    """
+    from .tracks import Simplification, TrackExporter, iter_tracks
+
+    if output_format not in (None, 'geojson', 'geojsonseq'):
+        raise ValueError("Tracks are written as GeoJSON or GeoJSONSeq")
+    input_paths = expand_inputs([input_path] if isinstance(input_path, str) else input_path)
+    if not input_paths:
+        raise FileNotFoundError(f"No input files found in: {input_path}")
+    if metrics is None:
+        metrics = Metrics()
+    exporter = TrackExporter(output_path, sequence=True if output_format == 'geojsonseq' else None)
+
+    processor = _make_processor(input_paths, exact_count, write_sidecar, workers, decoder,
+                                metrics, position_filter)
+    batches = metrics.timed("parse", processor.process_batches())
+    store = _load_store(processor, batches, input_paths, decoder, position_filter, cache, metrics)
+    metrics.count("vessels", store.vessel_count)
+
+    vertices = 0
+
+    def count_vertices(tracks):
+        nonlocal vertices
+        for track in tracks:
+            vertices += len(track.timestamp)
+            yield track
+
+    with metrics.stage("export"):
+        status(f"\nSimplifying the tracks of {store.vessel_count:,} vessels...")
+        tracks = metrics.timed("simplify", iter_tracks(store, simplification or Simplification(),
+                                                       cleaning=cleaning))
+        count = exporter.export(count_vertices(tracks))
+    metrics.count("tracks", count)
+    metrics.count("vertices", vertices)
+
+    status(f"\nTrack export complete. Wrote {count:,} tracks with {vertices:,} vertices "
+           f"from {len(store):,} positions.")
+    return count
+
+
+def _finish_ports(labeler: Optional['PortLabeler'], port_summary: Optional[str], metrics: Metrics) -> None:
+    """Count the labelled stops and write the per-port summary, if asked."""
+    if labeler is None:
+        return
+    stats = labeler.summary()
+    metrics.count("ports_with_stops", len(stats))
+    metrics.count("unlabeled_stops", labeler.unlabeled)
+    if port_summary:
+        from .ports import write_port_summary
+        write_port_summary(stats, port_summary)
+        status(f"Port summary written to: {port_summary}")
+
+
+def _make_processor(input_paths: List[str], exact_count: bool, write_sidecar: bool, workers: int,
+                    decoder: str, metrics: Metrics, position_filter: Optional[PositionFilter]):
+    """Create the processor that reads one input file or several."""
+    if len(input_paths) > 1:
+        return MultiFileProcessor(
+            input_paths,
+            exact_count=exact_count,
+            write_sidecar=write_sidecar,
+            workers=workers,
+            decoder=decoder,
+            metrics=metrics,
+            position_filter=position_filter
+        )
+    return MessageProcessor(
+        input_paths[0],
+        exact_count=exact_count,
+        write_sidecar=write_sidecar,
+        workers=workers,
+        decoder=decoder,
+        metrics=metrics,
+        position_filter=position_filter
+    )
+
+
+def _load_store(processor, batches, input_paths: List[str], decoder: str,
+                position_filter: Optional[PositionFilter], cache: Optional[ParseCache],
+                metrics: Metrics) -> PositionStore:
+    """Group the parsed positions into a store, from the cache when it holds them."""
+    key = None
+    if cache is not None and position_filter is None and STDIN_PATH not in input_paths:
+        key = cache_key(input_paths, decoder)
+    cached = cache.load(key) if key else None
+    if cached is not None:
+        store, counters = cached
+        status("Loaded parsed positions from cache")
+        metrics.count("cache_hits")
+        for name, value in counters.items():
+            metrics.count(name, value)
+        metrics.count("positions", len(store))
+        return store
+
+    store = PositionStore()
+    with metrics.stage("group"):
+        status("\nGrouping positions by vessel...")
+        for batch in batches:
+            store.extend_batch(batch)
+    if key:
+        with metrics.stage("cache"):
+            cache.save(key, store, {
+                "lines_read": processor.lines_read,
+                "json_errors": processor.json_errors,
+                "non_position": processor.non_position,
+                "invalid_positions": processor.invalid,
+            })
+    return store
@@ -0,0 +1,135 @@
+"""Port and anchorage labels for stops, and dwell statistics per port.
+
+A PortIndex is loaded once from a GeoJSON file of port polygons and labels
+whole stop batches with a single grid lookup per stop, so labelling costs
+about the same with ten polygons as with thousands. A PortLabeler sits
+between the analyzer and the exporter, labelling each batch as it passes
+and tallying stops, vessels and dwell time per port.
+"""
+import csv
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Generator, Iterable, List, Optional, Set
+
+from ..models.batch import PositionBatch, StopBatch
+from ..utils.file import ensure_output_dir
+from ..utils.spatial import GridIndex, Polygon, load_polygons
+
+# Feature property holding the name of each port by default
+DEFAULT_NAME_FIELD = 'name'
+PORT_SUMMARY_FIELDS = ('port', 'stops', 'vessels', 'dwell', 'mean_dwell')
+
+
+class PortIndex:
+    """Grid index over port and anchorage polygons, labelled by a feature property.
+
+    Polygons are tested smallest first, so an anchorage or berth lying
+    inside a larger port area takes precedence over it. Features without
+    ``name_field`` are labelled by their position in the file. The grid
+    cell size follows the polygons' typical extent unless ``cell_size``
+    (in degrees) is given.
+    """
+
+    def __init__(self, polygons: List[Polygon], name_field: str = DEFAULT_NAME_FIELD,
+                 cell_size: Optional[float] = None):
+        order = sorted(range(len(polygons)), key=lambda i: polygons[i].area)
+        self.labels = [str(polygons[i].properties.get(name_field, i)) for i in order]
+        self.grid = GridIndex([polygons[i] for i in order], cell_size)
+
+    @classmethod
+    def from_file(cls, path: str, name_field: str = DEFAULT_NAME_FIELD,
+                  cell_size: Optional[float] = None) -> 'PortIndex':
+        """Build an index over the polygons of a GeoJSON file."""
+        return cls(load_polygons(path), name_field, cell_size)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def label(self, lat: float, lon: float) -> Optional[str]:
+        """Label of the port containing a point, or None."""
+        i = self.grid.locate(lat, lon)
+        return self.labels[i] if i >= 0 else None
+
+    def label_batch(self, batch: PositionBatch) -> List[Optional[str]]:
+        """Label each stop of a batch, at its centroid for stop episodes and its position otherwise."""
+        if isinstance(batch, StopBatch):
+            found = self.grid.locate_many(batch.centroid_lat, batch.centroid_lon)
+        else:
+            found = self.grid.locate_many(batch.lat, batch.lon)
+        labels = self.labels
+        return [labels[i] if i >= 0 else None for i in found]
+
+
+@dataclass
+class PortStats:
+    """Stops in one port: how many, by how many vessels, and their total dwell in seconds."""
+    port: str
+    stops: int = 0
+    vessels: int = 0
+    dwell: int = 0
+    mmsis: Set[str] = field(default_factory=set, repr=False)
+
+    @property
+    def mean_dwell(self) -> float:
+        """Mean seconds per stop."""
+        return self.dwell / self.stops if self.stops else 0.0
+
+    def summary(self) -> dict:
+        """The statistics without the set of vessels."""
+        data = asdict(self)
+        del data['mmsis']
+        data['mean_dwell'] = round(self.mean_dwell, 1)
+        return data
+
+
+class PortLabeler:
+    """Labels stop batches on their way to an exporter and tallies statistics per port.
+
+    Dwell is the duration of each stop episode; stops without episode
+    columns count towards stops and vessels only.
+    """
+
+    def __init__(self, index: PortIndex):
+        self.index = index
+        self.ports: Dict[str, PortStats] = {}
+        self.unlabeled = 0
+
+    def label(self, batches: Iterable[PositionBatch]) -> Generator[PositionBatch, None, None]:
+        """Yield the batches with their stops labelled (``StopBatch.ports``), tallying as they pass."""
+        for batch in batches:
+            labels = self.index.label_batch(batch)
+            episodes = isinstance(batch, StopBatch)
+            if episodes:
+                batch.ports = labels
+            table = batch.mmsi_table
+            for row, port in enumerate(labels):
+                if port is None:
+                    self.unlabeled += 1
+                    continue
+                stats = self.ports.get(port)
+                if stats is None:
+                    stats = self.ports[port] = PortStats(port)
+                stats.stops += 1
+                stats.mmsis.add(table[batch.mmsi_ids[row]])
+                if episodes:
+                    stats.dwell += batch.end_timestamp[row] - batch.timestamp[row]
+            yield batch
+
+    def summary(self) -> List[PortStats]:
+        """Statistics of the ports with stops, busiest first."""
+        for stats in self.ports.values():
+            stats.vessels = len(stats.mmsis)
+        return sorted(self.ports.values(), key=lambda stats: (-stats.stops, stats.port))
+
+
+def write_port_summary(stats: Iterable[PortStats], output_path: str) -> None:
+    """Write the statistics per port as CSV (for a .csv path) or JSON."""
+    ensure_output_dir(output_path)
+    if output_path.endswith('.csv'):
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=PORT_SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(port.summary() for port in stats)
+    else:
+        with open(output_path, 'w') as f:
+            json.dump([port.summary() for port in stats], f, indent=2)
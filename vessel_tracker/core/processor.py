@@ -1,19 +1,100 @@
-import json
-from typing import Generator
-from tqdm import tqdm
+import os
+from itertools import chain
+from typing import TYPE_CHECKING, Generator, Iterator, List, Optional, Union
 
+from ..models.batch import PositionBatch
 from ..models.position import Position
-from ..utils.file import open_file, count_lines
-from ..utils.parsing import parse_position_message
-from ..utils.progress import MESSAGE_PROCESSOR
+from .parallel import parallel_batches, parallel_file_batches
+from ..utils.file import (
+    open_file_with_raw,
+    iter_line_chunks,
+    count_lines,
+    read_sidecar_count,
+    write_sidecar_count,
+    STDIN_PATH
+)
+from ..utils.metrics import Metrics
+from ..utils.filters import PositionFilter
+from ..utils.parsing import Decoder, get_decoder
+from ..utils.progress import MESSAGE_BYTES, MESSAGE_PROCESSOR, progress_bar
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+# Number of lines read between progress bar updates in byte mode
+PROGRESS_INTERVAL = 4096
+# Number of positions collected before a batch is handed on
+BATCH_SIZE = 65536
+# Approximate number of bytes of lines read from the input at a time
+READ_HINT = 1 << 20
+
+
+def _make_decoder(decoder: str, position_filter: Optional[PositionFilter]) -> Decoder:
+    """Shared decoder for a backend, or a private one carrying a position filter."""
+    if position_filter is None:
+        return get_decoder(decoder)
+    return Decoder(decoder, position_filter=position_filter)
+
+
+def _record_counts(processor, metrics: Metrics) -> None:
+    """Add a processor's line counters to a metrics collector."""
+    metrics.count("lines_read", processor.lines_read)
+    metrics.count("json_errors", processor.json_errors)
+    metrics.count("non_position", processor.non_position)
+    metrics.count("invalid_positions", processor.invalid)
+    metrics.count("filtered", processor.filtered)
+    metrics.count("positions", processor.positions)
 
 
 class MessageProcessor:
-    """Processes AIS messages from input file."""
+    """Processes AIS messages from input file.
+
+    By default the input is read in a single pass and progress is reported
+    by compressed bytes consumed, or by the line count from a sidecar index
+    when one exists. Set ``exact_count`` to pre-scan the file for an exact
+    message count instead, at the cost of reading it twice.
+
+    With ``workers`` greater than one, parsing is spread over a process pool
+    and positions are yielded in the same order as the serial path.
+
+    ``decoder`` selects the JSON backend (see ``utils.parsing.Decoder``) and
+    ``position_filter`` drops positions while decoding (see
+    ``utils.filters.PositionFilter``). An input path of '-' reads from standard input.
 
-    def __init__(self, input_path: str):
+    To resume a previous read, pass the raw ``start_offset`` it ended at and
+    the ``carry`` bytes of any incomplete line it held back. With
+    ``hold_partial`` set, a final line without a newline is not parsed but
+    kept in ``carry``; ``end_offset`` records where reading stopped.
+    Resuming always reads serially.
+
+    After processing, ``lines_read``, ``json_errors``, ``non_position``,
+    ``invalid``, ``filtered`` and ``positions`` count what the input contained. With
+    ``metrics`` the counts are also added to it, and time spent reading
+    (decompressing and splitting lines) is charged to its 'read' stage.
+    """
+
+    def __init__(self, input_path: str, exact_count: bool = False, write_sidecar: bool = False,
+                 workers: int = 1, decoder: str = 'auto', start_offset: int = 0,
+                 carry: bytes = b'', hold_partial: bool = False, metrics: Optional[Metrics] = None,
+                 position_filter: Optional[PositionFilter] = None):
         self.input_path = input_path
+        self.exact_count = exact_count
+        self.write_sidecar = write_sidecar
+        self.workers = workers
+        self.position_filter = position_filter
+        self.decoder = _make_decoder(decoder, position_filter)
+        self.start_offset = start_offset
+        self.carry = carry
+        self.hold_partial = hold_partial
+        self.end_offset = start_offset
+        self.metrics = metrics
         self._total_messages = None
+        self.lines_read = 0
+        self.json_errors = 0
+        self.non_position = 0
+        self.invalid = 0
+        self.filtered = 0
+        self.positions = 0
 
     @property
     def total_messages(self) -> int:
@@ -22,14 +103,202 @@ class MessageProcessor:
             self._total_messages = count_lines(self.input_path)
         return self._total_messages
 
+    @property
+    def is_stdin(self) -> bool:
+        """Whether the input is read from standard input."""
+        return self.input_path == STDIN_PATH
+
+    def _known_total(self) -> Optional[int]:
+        """Message count to report progress against, if available without a pre-scan."""
+        if self.is_stdin:
+            return None
+        if self.exact_count:
+            return self.total_messages
+        return read_sidecar_count(self.input_path)
+
     def process_messages(self) -> Generator[Position, None, None]:
         """Process input file and yield valid position reports."""
-        with open_file(self.input_path) as f:
-            for line in tqdm(f, total=self.total_messages, **MESSAGE_PROCESSOR):
-                try:
-                    message = json.loads(line)
-                    position = parse_position_message(message)
-                    if position:
-                        yield position
-                except json.JSONDecodeError:
-                    continue
\ No newline at end of file
+        for batch in self.process_batches():
+            yield from batch.positions()
+
+    def process_batches(self) -> Generator[PositionBatch, None, None]:
+        """Process input file and yield valid position reports in compact batches."""
+        if self.workers > 1 and not self.is_stdin and not self.start_offset:
+            yield from self._process_parallel()
+        else:
+            yield from self._process_serial()
+
+        if self.metrics is not None:
+            _record_counts(self, self.metrics)
+
+        if self.write_sidecar and not self.is_stdin:
+            write_sidecar_count(self.input_path, self.lines_read)
+
+    def _process_serial(self) -> Generator[PositionBatch, None, None]:
+        """Parse the input in this process."""
+        total = None if self.start_offset else self._known_total()
+        f, raw = open_file_with_raw(self.input_path, self.start_offset)
+        by_bytes = total is None and not self.is_stdin
+        with raw, f:
+            if by_bytes:
+                size = os.path.getsize(self.input_path) - self.start_offset
+                pbar = progress_bar(total=size, **MESSAGE_BYTES)
+            else:
+                pbar = progress_bar(total=total, **MESSAGE_PROCESSOR)
+            with pbar:
+                yield from self._parse_lines(f, raw, pbar, by_bytes=by_bytes)
+
+    def _process_parallel(self) -> Generator[PositionBatch, None, None]:
+        """Parse the input across a process pool, yielding batches in file order."""
+        if not os.path.exists(self.input_path):
+            raise FileNotFoundError(f"Input file not found: {self.input_path}")
+
+        with progress_bar(total=os.path.getsize(self.input_path), **MESSAGE_BYTES) as pbar:
+            for batch in parallel_batches(self.input_path, self.workers, progress=pbar.update,
+                                          decoder=self._task_decoder()):
+                self.lines_read += batch.lines
+                self.json_errors += batch.errors
+                self.non_position += batch.non_position
+                self.invalid += batch.invalid
+                self.filtered += batch.filtered
+                self.positions += len(batch)
+                yield batch
+
+    def _task_decoder(self) -> Union[str, Decoder]:
+        """Decoder to send to worker processes: a backend name unless a filter must travel with it."""
+        return self.decoder.backend if self.position_filter is None else self.decoder
+
+    def _read_lines(self, f) -> Iterator[bytes]:
+        """Iterate over the lines of an open binary file, read about READ_HINT bytes at a time."""
+        chunks = iter_line_chunks(f, READ_HINT)
+        if self.metrics is not None:
+            chunks = self.metrics.timed("read", chunks)
+        return chain.from_iterable(chunks)
+
+    def _parse_lines(self, f, raw, pbar: 'tqdm', by_bytes: bool) -> Generator[PositionBatch, None, None]:
+        """Parse lines from an open file into batches, updating the progress bar periodically."""
+        decoder = self.decoder
+        parse_fields = decoder.parse_fields
+        non_position, invalid, filtered = decoder.non_position, decoder.invalid, decoder.filtered
+        batch = PositionBatch()
+        count = 0
+        errors = 0
+        positions = 0
+        offset = self.start_offset
+        carry, self.carry = self.carry, b''
+        for line in self._read_lines(f):
+            if carry:
+                line, carry = carry + line, b''
+            if self.hold_partial and not line.endswith(b'\n'):
+                self.carry = line
+                break
+            count += 1
+            if count % PROGRESS_INTERVAL == 0:
+                if by_bytes:
+                    consumed = raw.tell()
+                    pbar.update(consumed - offset)
+                    offset = consumed
+                else:
+                    pbar.update(PROGRESS_INTERVAL)
+                if len(batch) >= BATCH_SIZE:
+                    positions += len(batch)
+                    yield batch
+                    batch = PositionBatch()
+            try:
+                fields = parse_fields(line)
+            except ValueError:
+                errors += 1
+                continue
+            if fields is not None:
+                batch.append(*fields)
+
+        if carry:
+            self.carry = carry
+        if by_bytes:
+            pbar.update(raw.tell() - offset)
+        else:
+            pbar.update(count % PROGRESS_INTERVAL)
+        if not self.is_stdin:
+            self.end_offset = raw.tell()
+        self.lines_read = count
+        self.json_errors = errors
+        self.non_position = decoder.non_position - non_position
+        self.invalid = decoder.invalid - invalid
+        self.filtered = decoder.filtered - filtered
+        self.positions = positions + len(batch)
+        if len(batch):
+            yield batch
+
+
+class MultiFileProcessor:
+    """Processes AIS messages from several input files as one stream.
+
+    Batches are yielded in the order of ``input_paths``. With ``workers``
+    greater than one, whole files are parsed in parallel, one file per task;
+    otherwise each file is read in turn by a MessageProcessor. Counters have
+    the same names as MessageProcessor's and cover all files, and
+    ``position_filter`` applies to every file.
+    """
+
+    def __init__(self, input_paths: List[str], exact_count: bool = False, write_sidecar: bool = False,
+                 workers: int = 1, decoder: str = 'auto', metrics: Optional[Metrics] = None,
+                 position_filter: Optional[PositionFilter] = None):
+        self.input_paths = input_paths
+        self.exact_count = exact_count
+        self.write_sidecar = write_sidecar
+        self.workers = workers
+        self.decoder = decoder
+        self.position_filter = position_filter
+        self.metrics = metrics
+        self.lines_read = 0
+        self.json_errors = 0
+        self.non_position = 0
+        self.invalid = 0
+        self.filtered = 0
+        self.positions = 0
+
+    def process_messages(self) -> Generator[Position, None, None]:
+        """Process all input files and yield valid position reports."""
+        for batch in self.process_batches():
+            yield from batch.positions()
+
+    def process_batches(self) -> Generator[PositionBatch, None, None]:
+        """Process all input files and yield valid position reports in compact batches."""
+        if self.workers > 1 and STDIN_PATH not in self.input_paths:
+            yield from self._process_parallel()
+            return
+        for path in self.input_paths:
+            processor = MessageProcessor(path, exact_count=self.exact_count, write_sidecar=self.write_sidecar,
+                                         decoder=self.decoder, metrics=self.metrics,
+                                         position_filter=self.position_filter)
+            yield from processor.process_batches()
+            self.lines_read += processor.lines_read
+            self.json_errors += processor.json_errors
+            self.non_position += processor.non_position
+            self.invalid += processor.invalid
+            self.filtered += processor.filtered
+            self.positions += processor.positions
+
+    def _task_decoder(self) -> Union[str, Decoder]:
+        """Decoder to send to worker processes: a backend name unless a filter must travel with it."""
+        return self.decoder if self.position_filter is None else _make_decoder(self.decoder, self.position_filter)
+
+    def _process_parallel(self) -> Generator[PositionBatch, None, None]:
+        """Parse the input files across a process pool, yielding one batch per file."""
+        total = sum(os.path.getsize(path) for path in self.input_paths)
+        with progress_bar(total=total, **MESSAGE_BYTES) as pbar:
+            batches = parallel_file_batches(self.input_paths, self.workers, progress=pbar.update,
+                                            decoder=self._task_decoder())
+            for path, batch in zip(self.input_paths, batches):
+                if self.write_sidecar:
+                    write_sidecar_count(path, batch.lines)
+                self.lines_read += batch.lines
+                self.json_errors += batch.errors
+                self.non_position += batch.non_position
+                self.invalid += batch.invalid
+                self.filtered += batch.filtered
+                self.positions += len(batch)
+                yield batch
+
+        if self.metrics is not None:
+            _record_counts(self, self.metrics)
@@ -0,0 +1,150 @@
+"""Stop detection across a process pool over memory-mapped position columns.
+
+The sorted latitude, longitude, timestamp and vessel offset columns of a
+store are written once to a temporary file (in /dev/shm where available,
+so it never reaches a disk, or the temporary directory if it is full),
+which each worker maps read-only instead of receiving a pickled copy.
+Workers are handed consecutive ranges of vessels of about equal position
+counts and return the stops of their range as compact columns; the ranges
+are collected in order, so the stops are the same, in the same order, as
+a single process finds.
+"""
+import math
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Generator, List, Optional, Tuple
+
+from ..models.episode import EPISODE_FIELDS
+from ..models.store import PositionStore
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD
+from ..utils.optional import optional_module
+from .analyzer import CHUNK_ROWS, find_chunk_episodes, scan_vessels, vessel_chunks
+from .cleaning import Cleaning
+from .parallel import TASKS_PER_WORKER, ordered_map
+
+np = optional_module('numpy')
+
+# Vessel ranges per worker, so that one slow range does not leave the other workers idle
+RANGES_PER_WORKER = 4
+# Directory of the column files; a tmpfs keeps them in memory
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Rows and vessels, followed by the lat, lon, timestamp and offsets columns
+_HEADER = struct.Struct('<qq')
+# Column views of the files mapped by this process, by path
+_mapped: Dict[str, tuple] = {}
+
+
+class SharedColumns:
+    """The columns a worker needs from a sorted store, in a temporary file it can map.
+
+    Use as a context manager; the file is removed on exit.
+    """
+
+    def __init__(self, store: PositionStore, directory: Optional[str] = SHARED_DIR):
+        store.sort()
+        try:
+            self.path = _write_columns(store, directory)
+        except OSError:
+            if directory is None or directory != SHARED_DIR:
+                raise
+            # /dev/shm is small in containers (64 MB by default under Docker)
+            self.path = _write_columns(store, tempfile.gettempdir())
+
+    def __enter__(self) -> 'SharedColumns':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Remove the file; workers that mapped it keep their mapping."""
+        _mapped.pop(self.path, None)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _write_columns(store: PositionStore, directory: Optional[str]) -> str:
+    """Write the columns of a sorted store to a new file in directory, removing it on failure."""
+    fd, path = tempfile.mkstemp(prefix='vessel-tracker-', suffix='.columns', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(len(store), store.vessel_count))
+            for column in (store.lat, store.lon, store.timestamp, store.offsets):
+                f.write(column)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def map_columns(path: str) -> Tuple[memoryview, memoryview, memoryview, memoryview]:
+    """Read-only lat, lon, timestamp and offsets views of a SharedColumns file, mapped once per process."""
+    columns = _mapped.get(path)
+    if columns is None:
+        with open(path, 'rb') as f:
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        rows, vessels = _HEADER.unpack_from(data)
+        columns, offset = [], _HEADER.size
+        for typecode, count in (('d', rows), ('d', rows), ('q', rows), ('q', vessels + 1)):
+            columns.append(data[offset:offset + 8 * count].cast(typecode))
+            offset += 8 * count
+        # Only the latest file is kept mapped; earlier ones belong to finished runs
+        _mapped.clear()
+        columns = _mapped[path] = tuple(columns)
+    return columns
+
+
+def find_range(path: str, first: int, last: int, min_duration: int,
+               speed_threshold: float = DEFAULT_SPEED_THRESHOLD, cleaning: Optional[Cleaning] = None,
+               use_numpy: bool = False) -> Tuple[array, List[array]]:
+    """Find the stops of vessels [first, last) of a SharedColumns file.
+
+    Returns the start rows of the stops and their EPISODE_FIELDS columns.
+    """
+    lat, lon, timestamp, offsets = map_columns(path)
+    rows, columns = array('q'), [array(typecode) for _, typecode in EPISODE_FIELDS]
+    if use_numpy:
+        views = [np.frombuffer(column, dtype=dtype) for column, dtype in
+                 ((lat, np.float64), (lon, np.float64), (timestamp, np.int64), (offsets, np.int64))]
+        starts, found = find_chunk_episodes(*views, first, last, min_duration, speed_threshold, cleaning)
+        rows.frombytes(starts.astype(np.int64).tobytes())
+        for column, values in zip(columns, found):
+            column.frombytes(values.astype(column.typecode, copy=False).tobytes())
+    else:
+        for episodes in scan_vessels(lat, lon, timestamp, offsets, first, last, min_duration,
+                                     speed_threshold, cleaning):
+            for row, *fields in episodes:
+                rows.append(row)
+                for column, value in zip(columns, fields):
+                    column.append(value)
+    return rows, columns
+
+
+def parallel_episodes(store: PositionStore, workers: int, min_duration: int,
+                      speed_threshold: float = DEFAULT_SPEED_THRESHOLD, cleaning: Optional[Cleaning] = None,
+                      use_numpy: bool = False) -> Generator[Tuple[int, array, List[array]], None, None]:
+    """Find the stops of a store on ``workers`` processes.
+
+    Yields (vessels, start rows, episode columns) for consecutive ranges of
+    vessels, in vessel order. Each range holds about an equal share of the
+    rows (RANGES_PER_WORKER per worker, and at most CHUNK_ROWS), except that
+    a vessel is never split.
+    """
+    store.sort()
+    chunk_rows = min(CHUNK_ROWS, math.ceil(len(store) / (workers * RANGES_PER_WORKER)))
+    ranges = list(vessel_chunks(store.offsets, store.vessel_count, chunk_rows))
+    with SharedColumns(store) as shared, ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            tasks = ((shared.path, first, last, min_duration, speed_threshold, cleaning, use_numpy)
+                     for first, last in ranges)
+            results = ordered_map(executor, find_range, tasks, workers * TASKS_PER_WORKER)
+            for (first, last), (rows, columns) in zip(ranges, results):
+                yield last - first, rows, columns
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
@@ -0,0 +1,256 @@
+"""Streaming stop detection for roughly time-ordered feeds."""
+import heapq
+import math
+from typing import Dict, Generator, Iterable, List, Optional
+
+from ..models.batch import PositionBatch
+from ..models.episode import StopEpisode
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD, speed_between
+from ..utils.metrics import Metrics
+
+# Number of pushes between sweeps for idle vessels
+IDLE_SWEEP_INTERVAL = 65536
+
+
+def add_exact(partials: List[float], value: float) -> None:
+    """Add a value to a running sum kept as non-overlapping partials.
+
+    ``math.fsum(partials)`` is then the exactly rounded sum of every value
+    added, the same as math.fsum over the values themselves (Shewchuk's
+    algorithm, as used by fsum).
+    """
+    i = 0
+    for partial in partials:
+        if abs(value) < abs(partial):
+            value, partial = partial, value
+        high = value + partial
+        low = partial - (high - value)
+        if low:
+            partials[i] = low
+            i += 1
+        value = high
+    partials[i:] = [value]
+
+
+class VesselState:
+    """Per-vessel state: the previous fix and the start of any open stop.
+
+    While a stop is open its point count, coordinate sums and extent are
+    accumulated.
+    """
+
+    __slots__ = ('prev_lat', 'prev_lon', 'prev_ts', 'start_lat', 'start_lon', 'start_ts', 'points',
+                 'lat_sum', 'lon_sum', 'min_lat', 'min_lon', 'max_lat', 'max_lon')
+
+    def __init__(self, lat: float, lon: float, timestamp: int):
+        self.prev_lat = lat
+        self.prev_lon = lon
+        self.prev_ts = timestamp
+        self.start_lat = 0.0
+        self.start_lon = 0.0
+        self.start_ts: Optional[int] = None
+        self.points = 0
+        self.lat_sum: List[float] = []
+        self.lon_sum: List[float] = []
+        self.min_lat = self.min_lon = self.max_lat = self.max_lon = 0.0
+
+    def open_stop(self) -> None:
+        """Start a stop at the previous fix."""
+        self.start_lat = self.min_lat = self.max_lat = self.prev_lat
+        self.start_lon = self.min_lon = self.max_lon = self.prev_lon
+        self.start_ts = self.prev_ts
+        self.points = 1
+        self.lat_sum = [self.prev_lat]
+        self.lon_sum = [self.prev_lon]
+
+    def add_point(self, lat: float, lon: float) -> None:
+        """Add a fix to the open stop."""
+        self.points += 1
+        add_exact(self.lat_sum, lat)
+        add_exact(self.lon_sum, lon)
+        self.min_lat, self.max_lat = min(self.min_lat, lat), max(self.max_lat, lat)
+        self.min_lon, self.max_lon = min(self.min_lon, lon), max(self.max_lon, lon)
+
+    def episode(self, mmsi: str, end_timestamp: int) -> StopEpisode:
+        """The open stop as an episode closed at ``end_timestamp``."""
+        return StopEpisode(
+            lat=self.start_lat, lon=self.start_lon, timestamp=self.start_ts, mmsi=mmsi,
+            end_timestamp=end_timestamp, points=self.points,
+            centroid_lat=math.fsum(self.lat_sum) / self.points,
+            centroid_lon=math.fsum(self.lon_sum) / self.points,
+            min_lat=self.min_lat, min_lon=self.min_lon, max_lat=self.max_lat, max_lon=self.max_lon
+        )
+
+    def to_list(self) -> list:
+        """Serialize the state to a compact list."""
+        return [self.prev_lat, self.prev_lon, self.prev_ts,
+                self.start_lat, self.start_lon, self.start_ts, self.points, self.lat_sum, self.lon_sum,
+                self.min_lat, self.min_lon, self.max_lat, self.max_lon]
+
+    @classmethod
+    def from_list(cls, values: list) -> 'VesselState':
+        """Restore a state serialized with to_list."""
+        state = cls(values[0], values[1], values[2])
+        (state.start_lat, state.start_lon, state.start_ts, state.points,
+         state.lat_sum, state.lon_sum, state.min_lat, state.min_lon, state.max_lat, state.max_lon) = values[3:]
+        return state
+
+
+class StreamingStopDetector:
+    """Detects vessel stops one message at a time.
+
+    Keeps only the previous fix and open stop start per vessel and returns
+    stops as soon as they close, so memory depends on the number of vessels
+    rather than the number of messages. Stops are the same StopEpisodes as
+    VesselAnalyzer finds for the same data, although they are emitted in
+    closing order.
+
+    Messages are held back for ``reorder_window`` seconds of stream time and
+    released in timestamp order, which absorbs late or out-of-order arrivals.
+    A message older than the last one already applied to its vessel is
+    dropped and counted in ``late_messages``. With ``idle_timeout`` set,
+    vessels silent for that many seconds of stream time are finalized and
+    forgotten, bounding memory on unbounded feeds. A vessel is stopped while
+    moving slower than ``speed_threshold`` knots.
+    """
+
+    def __init__(self, min_duration: int = 3600, reorder_window: int = 0,
+                 idle_timeout: Optional[int] = None,
+                 speed_threshold: float = DEFAULT_SPEED_THRESHOLD):
+        self.min_duration = min_duration
+        self.speed_threshold = speed_threshold
+        self.reorder_window = reorder_window
+        self.idle_timeout = idle_timeout
+        self.vessels: Dict[str, VesselState] = {}
+        self.late_messages = 0
+        self._pending = []
+        self._sequence = 0
+        self._latest = None
+        self._pushes = 0
+
+    def push(self, lat: float, lon: float, timestamp: int, mmsi: str) -> List[StopEpisode]:
+        """Add a position and return any stops that it closes."""
+        stops = []
+        if self._latest is None or timestamp > self._latest:
+            self._latest = timestamp
+
+        if self.reorder_window:
+            heapq.heappush(self._pending, (timestamp, self._sequence, lat, lon, mmsi))
+            self._sequence += 1
+            self._release(self._latest - self.reorder_window, stops)
+        else:
+            self._apply(lat, lon, timestamp, mmsi, stops)
+
+        if self.idle_timeout is not None:
+            self._pushes += 1
+            if self._pushes % IDLE_SWEEP_INTERVAL == 0:
+                self._evict_idle(stops)
+        return stops
+
+    def push_batch(self, batch: PositionBatch) -> List[StopEpisode]:
+        """Add a batch of positions and return the stops they close."""
+        stops = []
+        table = batch.mmsi_table
+        for lat, lon, timestamp, mmsi_id in zip(batch.lat, batch.lon, batch.timestamp, batch.mmsi_ids):
+            stops.extend(self.push(lat, lon, timestamp, table[mmsi_id]))
+        return stops
+
+    def flush(self) -> List[StopEpisode]:
+        """End of stream: release held messages and close any open stops."""
+        stops = []
+        self._release(None, stops)
+        for mmsi, state in self.vessels.items():
+            self._finalize(mmsi, state, stops)
+        self.vessels = {}
+        return stops
+
+    def get_state(self) -> dict:
+        """Serialize the detector to plain JSON-compatible data."""
+        return {
+            "min_duration": self.min_duration,
+            "reorder_window": self.reorder_window,
+            "speed_threshold": self.speed_threshold,
+            "latest": self._latest,
+            "sequence": self._sequence,
+            "late_messages": self.late_messages,
+            "vessels": [[mmsi] + state.to_list() for mmsi, state in self.vessels.items()],
+            "pending": [list(item) for item in self._pending],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, idle_timeout: Optional[int] = None) -> 'StreamingStopDetector':
+        """Restore a detector serialized with get_state."""
+        detector = cls(state["min_duration"], state["reorder_window"], idle_timeout,
+                       state.get("speed_threshold", DEFAULT_SPEED_THRESHOLD))
+        detector._latest = state["latest"]
+        detector._sequence = state["sequence"]
+        detector.late_messages = state["late_messages"]
+        detector.vessels = {values[0]: VesselState.from_list(values[1:]) for values in state["vessels"]}
+        detector._pending = [tuple(item) for item in state["pending"]]
+        heapq.heapify(detector._pending)
+        return detector
+
+    def _release(self, up_to: Optional[int], stops: List[StopEpisode]) -> None:
+        """Apply held messages with timestamps up to ``up_to`` (all when None)."""
+        pending = self._pending
+        while pending and (up_to is None or pending[0][0] <= up_to):
+            timestamp, _, lat, lon, mmsi = heapq.heappop(pending)
+            self._apply(lat, lon, timestamp, mmsi, stops)
+
+    def _apply(self, lat: float, lon: float, timestamp: int, mmsi: str,
+               stops: List[StopEpisode]) -> None:
+        """Advance one vessel's state machine by a single fix."""
+        state = self.vessels.get(mmsi)
+        if state is None:
+            self.vessels[mmsi] = VesselState(lat, lon, timestamp)
+            return
+        if timestamp < state.prev_ts:
+            self.late_messages += 1
+            return
+
+        speed = speed_between(state.prev_lat, state.prev_lon, state.prev_ts, lat, lon, timestamp)
+
+        if speed < self.speed_threshold:
+            if state.start_ts is None:
+                state.open_stop()
+            state.add_point(lat, lon)
+        elif state.start_ts is not None:
+            if timestamp - state.start_ts >= self.min_duration:
+                stops.append(state.episode(mmsi, timestamp))
+            state.start_ts = None
+
+        state.prev_lat = lat
+        state.prev_lon = lon
+        state.prev_ts = timestamp
+
+    def _finalize(self, mmsi: str, state: VesselState, stops: List[StopEpisode]) -> None:
+        """Apply the trailing-stop check to a vessel."""
+        if state.start_ts is not None and state.prev_ts - state.start_ts >= self.min_duration:
+            stops.append(state.episode(mmsi, state.prev_ts))
+
+    def _evict_idle(self, stops: List[StopEpisode]) -> None:
+        """Finalize and drop vessels that have been silent for idle_timeout."""
+        cutoff = self._latest - self.idle_timeout - self.reorder_window
+        idle = [mmsi for mmsi, state in self.vessels.items() if state.prev_ts < cutoff]
+        for mmsi in idle:
+            self._finalize(mmsi, self.vessels.pop(mmsi), stops)
+
+
+def detect_stops(batches: Iterable[PositionBatch], min_duration: int = 3600,
+                 reorder_window: int = 0, metrics: Optional[Metrics] = None,
+                 speed_threshold: float = DEFAULT_SPEED_THRESHOLD) -> Generator[StopEpisode, None, None]:
+    """Run streaming stop detection over position batches, yielding stops as they close.
+
+    With ``metrics``, the number of vessels seen and of late messages dropped
+    are counted once the stream ends.
+    """
+    detector = StreamingStopDetector(min_duration, reorder_window, speed_threshold=speed_threshold)
+    for batch in batches:
+        yield from detector.push_batch(batch)
+    stops = []
+    detector._release(None, stops)
+    if metrics is not None:
+        metrics.count("vessels", len(detector.vessels))
+        metrics.count("late_messages", detector.late_messages)
+    yield from stops
+    yield from detector.flush()
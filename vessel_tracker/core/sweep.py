@@ -0,0 +1,152 @@
+"""Stop detection over a grid of speed thresholds and minimum durations in one pass."""
+import csv
+import json
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+
+from ..models.store import PositionStore
+from ..utils.file import ensure_output_dir
+from ..utils.geo import speed_between
+from ..utils.optional import optional_module, worth_using
+from ..utils.progress import VESSEL_ANALYZER, progress_bar, status
+from .analyzer import ENGINES, vessel_chunks
+
+np = optional_module('numpy')
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+SUMMARY_FIELDS = ('speed_threshold', 'min_duration', 'stops', 'vessels')
+
+
+@dataclass
+class SweepResult:
+    """Stops found with one speed threshold and minimum duration.
+
+    ``vessels`` counts the vessels with at least one stop. ``stop_rows``
+    holds the store rows where the stops start, in the order VesselAnalyzer
+    would report them, when the sweep was asked to keep them.
+    """
+    speed_threshold: float
+    min_duration: int
+    stops: int = 0
+    vessels: int = 0
+    stop_rows: List[int] = field(default_factory=list, repr=False)
+
+    def summary(self) -> dict:
+        """The result without its stop rows."""
+        data = asdict(self)
+        del data['stop_rows']
+        return data
+
+
+def scan_runs(speeds: Sequence[float], timestamp: Sequence[int], start: int,
+              end: int, speed_threshold: float) -> List[Tuple[int, int]]:
+    """Candidate stops of one vessel as (start row, duration), whatever their duration.
+
+    ``speeds`` holds the speed of each pair of consecutive rows in [start,
+    end); the runs are those ``analyzer.scan_episodes`` would consider.
+    """
+    runs = []
+    stop_start = -1
+    for i in range(start + 1, end):
+        if speeds[i - start - 1] < speed_threshold:
+            if stop_start < 0:
+                stop_start = i - 1
+        elif stop_start >= 0:
+            runs.append((stop_start, timestamp[i] - timestamp[stop_start]))
+            stop_start = -1
+    if stop_start >= 0:
+        runs.append((stop_start, timestamp[end - 1] - timestamp[stop_start]))
+    return runs
+
+
+def sweep_stops(store: PositionStore, speed_thresholds: Sequence[float], min_durations: Sequence[int],
+                engine: str = 'auto', keep_stops: bool = False, progress: bool = True) -> List[SweepResult]:
+    """Find stops for every combination of speed threshold and minimum duration.
+
+    Pair speeds are computed once per vessel and the runs of slow pairs once
+    per threshold; each duration then only filters those runs. Results are
+    ordered by threshold, then duration, as given.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == 'numpy' and np is None:
+        raise ImportError("The numpy engine requires numpy to be installed")
+    if engine == 'auto':
+        engine = 'numpy' if worth_using(np, len(store)) else 'python'
+
+    results = [[SweepResult(threshold, duration) for duration in min_durations]
+               for threshold in speed_thresholds]
+    if not len(store):
+        return [result for row in results for result in row]
+
+    if progress:
+        status(f"\nSweeping {len(speed_thresholds) * len(min_durations)} settings over "
+               f"{store.vessel_count:,} vessels...")
+    store.sort()
+    settings = VESSEL_ANALYZER if progress else {**VESSEL_ANALYZER, "disable": True}
+    with progress_bar(total=store.vessel_count, **settings) as pbar:
+        if engine == 'numpy':
+            _sweep_numpy(store, speed_thresholds, min_durations, results, keep_stops, pbar)
+        else:
+            _sweep_python(store, speed_thresholds, min_durations, results, keep_stops, pbar)
+    return [result for row in results for result in row]
+
+
+def _sweep_python(store: PositionStore, speed_thresholds: Sequence[float], min_durations: Sequence[int],
+                  results: List[List[SweepResult]], keep_stops: bool, pbar: 'tqdm') -> None:
+    """Sweep one vessel at a time with the scalar loop."""
+    lat, lon, timestamp = store.lat, store.lon, store.timestamp
+    for mmsi, start, end in store.vessels():
+        speeds = [speed_between(lat[i - 1], lon[i - 1], timestamp[i - 1], lat[i], lon[i], timestamp[i])
+                  for i in range(start + 1, end)]
+        for threshold, row in zip(speed_thresholds, results):
+            runs = scan_runs(speeds, timestamp, start, end, threshold)
+            for duration, result in zip(min_durations, row):
+                rows = [run_start for run_start, length in runs if length >= duration]
+                if rows:
+                    result.stops += len(rows)
+                    result.vessels += 1
+                    if keep_stops:
+                        result.stop_rows.extend(rows)
+        pbar.update(1)
+
+
+def _sweep_numpy(store: PositionStore, speed_thresholds: Sequence[float], min_durations: Sequence[int],
+                 results: List[List[SweepResult]], keep_stops: bool, pbar: 'tqdm') -> None:
+    """Sweep a chunk of whole vessels at a time with numpy."""
+    from .vectorized import pair_speeds, stop_runs
+
+    lat = np.frombuffer(store.lat, dtype=np.float64)
+    lon = np.frombuffer(store.lon, dtype=np.float64)
+    timestamp = np.frombuffer(store.timestamp, dtype=np.int64)
+    offsets = np.frombuffer(store.offsets, dtype=np.int64)
+
+    for vessel, end_vessel in vessel_chunks(offsets, store.vessel_count):
+        lo, hi = offsets[vessel], offsets[end_vessel]
+        chunk_offsets = offsets[vessel:end_vessel + 1] - lo
+        if hi - lo >= 2:
+            speeds = pair_speeds(lat[lo:hi], lon[lo:hi], timestamp[lo:hi])
+            for threshold, row in zip(speed_thresholds, results):
+                run_starts, durations, vessels = stop_runs(speeds < threshold, timestamp[lo:hi], chunk_offsets)
+                for duration, result in zip(min_durations, row):
+                    long_enough = durations >= duration
+                    result.stops += int(np.count_nonzero(long_enough))
+                    result.vessels += len(np.unique(vessels[long_enough]))
+                    if keep_stops:
+                        result.stop_rows.extend((run_starts[long_enough] + lo).tolist())
+        pbar.update(end_vessel - vessel)
+
+
+def write_sweep_summary(results: Sequence[SweepResult], output_path: str) -> None:
+    """Write the stop counts per setting as CSV (for a .csv path) or JSON."""
+    ensure_output_dir(output_path)
+    if output_path.endswith('.csv'):
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(result.summary() for result in results)
+    else:
+        with open(output_path, 'w') as f:
+            json.dump([result.summary() for result in results], f, indent=2)
@@ -0,0 +1,271 @@
+"""Per-vessel tracks as LineStrings simplified to a requested fidelity.
+
+Each vessel's time-sorted fixes are optionally thinned to the first fix of
+every ``interval`` seconds, then simplified with the Douglas-Peucker
+algorithm: a fix is kept only when the simplified line would otherwise pass
+more than ``tolerance`` metres from it. The distance from a fix to a segment
+is measured in a local equirectangular projection around the segment's
+first fix, which is within a fraction of a percent of the great-circle
+distance over the segment lengths a tolerance of metres to kilometres keeps.
+
+The number of vertices written depends on the tolerance and interval and on
+how much the vessels turn, not on how often they report. Both engines keep
+the same fixes.
+"""
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generator, List, Optional, Sequence
+
+from ..models.store import PositionStore
+from ..utils.geo import EARTH_RADIUS, haversine_distance, haversine_distance_array
+from ..utils.geojson import json_number
+from ..utils.optional import optional_module, worth_using
+from ..utils.progress import VESSEL_ANALYZER, progress_bar
+from .analyzer import ENGINES
+from .cleaning import Cleaning, clean_track
+from .exporter import GeoJSONExporter
+
+np = optional_module('numpy')
+
+# Default simplification tolerance in metres
+DEFAULT_TOLERANCE = 50.0
+# Fixes in a Douglas-Peucker split above which the numpy engine measures them together
+NUMPY_SPLIT_ROWS = 32
+RADIANS = math.pi / 180
+METRES_PER_DEGREE = EARTH_RADIUS * RADIANS
+
+
+@dataclass(frozen=True)
+class Simplification:
+    """How far tracks are simplified.
+
+    ``tolerance`` is in metres (0 keeps every fix) and ``interval``, when
+    set, keeps only the first fix of each bucket of that many seconds.
+    """
+    tolerance: float = DEFAULT_TOLERANCE
+    interval: Optional[int] = None
+
+    def __post_init__(self):
+        if self.tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+        if self.interval is not None and self.interval <= 0:
+            raise ValueError("interval must be positive")
+
+
+@dataclass
+class Track:
+    """A vessel's simplified track.
+
+    ``points`` counts the fixes before simplification and ``length`` is the
+    distance in metres along all of them.
+    """
+    mmsi: str
+    lat: List[float]
+    lon: List[float]
+    timestamp: List[int]
+    points: int
+    length: float
+
+    def to_dict(self) -> dict:
+        """Convert the track to a GeoJSON LineString Feature; ``timestamps`` align with the coordinates."""
+        return {
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[x, y] for x, y in zip(self.lon, self.lat)]},
+            "properties": {
+                "mmsi": self.mmsi,
+                "start_datetime": datetime.utcfromtimestamp(self.timestamp[0]).isoformat(),
+                "end_datetime": datetime.utcfromtimestamp(self.timestamp[-1]).isoformat(),
+                "points": self.points,
+                "vertices": len(self.timestamp),
+                "length": self.length,
+                "timestamps": self.timestamp,
+            },
+        }
+
+
+def track_json(track: Track) -> str:
+    """Serialize a track as a compact GeoJSON Feature, matching its to_dict()."""
+    coordinates = ','.join(f'[{json_number(x)},{json_number(y)}]' for x, y in zip(track.lon, track.lat))
+    timestamps = ','.join(str(int(t)) for t in track.timestamp)
+    return (
+        f'{{"type":"Feature","geometry":{{"type":"LineString","coordinates":[{coordinates}]}},'
+        f'"properties":{{"mmsi":{json.dumps(track.mmsi)},'
+        f'"start_datetime":"{datetime.utcfromtimestamp(track.timestamp[0]).isoformat()}",'
+        f'"end_datetime":"{datetime.utcfromtimestamp(track.timestamp[-1]).isoformat()}",'
+        f'"points":{track.points},"vertices":{len(track.timestamp)},"length":{json_number(track.length)},'
+        f'"timestamps":[{timestamps}]}}}}'
+    )
+
+
+class TrackExporter(GeoJSONExporter):
+    """Streams tracks to a GeoJSON FeatureCollection, or GeoJSONSeq for sequence extensions."""
+
+    serialize = staticmethod(track_json)
+
+
+def bucket_rows(timestamp: Sequence[int], rows: Sequence[int], interval: int) -> List[int]:
+    """The first of ``rows`` in each ``interval``-second bucket, plus the last row."""
+    kept = []
+    bucket = None
+    for i in rows:
+        if timestamp[i] // interval != bucket:
+            bucket = timestamp[i] // interval
+            kept.append(i)
+    if rows and kept[-1] != rows[-1]:
+        kept.append(rows[-1])
+    return kept
+
+
+def _wrap(delta: float) -> float:
+    """Longitude difference folded into [-180, 180)."""
+    return (delta + 180) % 360 - 180 if delta >= 180 or delta < -180 else delta
+
+
+def douglas_peucker(lat: Sequence[float], lon: Sequence[float], tolerance: float) -> List[int]:
+    """Indexes of the fixes kept by Douglas-Peucker with a tolerance in metres."""
+    n = len(lat)
+    if n <= 2 or tolerance <= 0:
+        return list(range(n))
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        farthest, distance = _farthest(lat, lon, first, last)
+        if distance > tolerance:
+            keep[farthest] = True
+            stack.append((farthest, last))
+            stack.append((first, farthest))
+    return [i for i in range(n) if keep[i]]
+
+
+def _segment(lat: Sequence[float], lon: Sequence[float], first: int, last: int) -> tuple:
+    """Projection scale, end point and squared length of the segment from ``first`` to ``last``."""
+    scale = METRES_PER_DEGREE * math.cos(lat[first] * RADIANS)
+    bx = _wrap(lon[last] - lon[first]) * scale
+    by = (lat[last] - lat[first]) * METRES_PER_DEGREE
+    return scale, bx, by, bx * bx + by * by
+
+
+def _farthest(lat: Sequence[float], lon: Sequence[float], first: int, last: int) -> tuple:
+    """The fix strictly between ``first`` and ``last`` farthest from their segment, and its distance."""
+    scale, bx, by, length2 = _segment(lat, lon, first, last)
+    lat0, lon0 = lat[first], lon[first]
+    farthest, distance = -1, -1.0
+    for i in range(first + 1, last):
+        x = _wrap(lon[i] - lon0) * scale
+        y = (lat[i] - lat0) * METRES_PER_DEGREE
+        if length2 > 0:
+            t = min(max((x * bx + y * by) / length2, 0.0), 1.0)
+            x = x - t * bx
+            y = y - t * by
+        d = math.sqrt(x * x + y * y)
+        if d > distance:
+            farthest, distance = i, d
+    return farthest, distance
+
+
+def douglas_peucker_numpy(lat, lon, tolerance: float):
+    """``douglas_peucker`` over numpy arrays.
+
+    Splits of more than NUMPY_SPLIT_ROWS fixes measure all their fixes at
+    once; smaller ones use the scalar loop, whose arithmetic is the same.
+    """
+    n = len(lat)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    lat_list, lon_list = lat.tolist(), lon.tolist()
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        if last - first <= NUMPY_SPLIT_ROWS:
+            farthest, distance = _farthest(lat_list, lon_list, first, last)
+        else:
+            scale, bx, by, length2 = _segment(lat_list, lon_list, first, last)
+            delta = lon[first + 1:last] - lon_list[first]
+            delta = np.where((delta >= 180) | (delta < -180), (delta + 180) % 360 - 180, delta)
+            x = delta * scale
+            y = (lat[first + 1:last] - lat_list[first]) * METRES_PER_DEGREE
+            if length2 > 0:
+                t = np.minimum(np.maximum((x * bx + y * by) / length2, 0.0), 1.0)
+                x = x - t * bx
+                y = y - t * by
+            d = np.sqrt(x * x + y * y)
+            i = int(np.argmax(d))
+            farthest, distance = first + 1 + i, float(d[i])
+        if distance > tolerance:
+            keep[farthest] = True
+            stack.append((farthest, last))
+            stack.append((first, farthest))
+    return np.flatnonzero(keep)
+
+
+def simplify_track(mmsi: str, lat: Sequence[float], lon: Sequence[float], timestamp: Sequence[int],
+                   simplification: Simplification, engine: str = 'python') -> Track:
+    """Simplify one vessel's time-sorted fixes into a Track."""
+    if engine == 'numpy':
+        return _simplify_numpy(mmsi, lat, lon, timestamp, simplification)
+    length = round(math.fsum(haversine_distance(lat[i - 1], lon[i - 1], lat[i], lon[i])
+                             for i in range(1, len(timestamp))), 1)
+    rows = list(range(len(timestamp)))
+    if simplification.interval:
+        rows = bucket_rows(timestamp, rows, simplification.interval)
+    track_lat = [lat[i] for i in rows]
+    track_lon = [lon[i] for i in rows]
+    kept = douglas_peucker(track_lat, track_lon, simplification.tolerance)
+    return Track(mmsi, [track_lat[i] for i in kept], [track_lon[i] for i in kept],
+                 [timestamp[rows[i]] for i in kept], len(timestamp), length)
+
+
+def _simplify_numpy(mmsi: str, lat: Sequence[float], lon: Sequence[float], timestamp: Sequence[int],
+                    simplification: Simplification) -> Track:
+    """``simplify_track`` with the length, buckets and distances computed over numpy arrays."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    timestamp = np.asarray(timestamp, dtype=np.int64)
+    points = len(timestamp)
+    length = round(math.fsum(haversine_distance_array(lat[:-1], lon[:-1], lat[1:], lon[1:]).tolist()), 1)
+    if simplification.interval:
+        bucket = timestamp // simplification.interval
+        rows = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        if rows[-1] != points - 1:
+            rows = np.append(rows, points - 1)
+        lat, lon, timestamp = lat[rows], lon[rows], timestamp[rows]
+    kept = douglas_peucker_numpy(lat, lon, simplification.tolerance)
+    return Track(mmsi, lat[kept].tolist(), lon[kept].tolist(), timestamp[kept].tolist(), points, length)
+
+
+def iter_tracks(store: PositionStore, simplification: Simplification = Simplification(),
+                engine: str = 'auto', cleaning: Optional[Cleaning] = None,
+                progress: bool = True) -> Generator[Track, None, None]:
+    """Yield the simplified track of each vessel with at least two fixes, one vessel at a time.
+
+    With ``cleaning`` each track is cleaned first (see ``core.cleaning``).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == 'numpy' and np is None:
+        raise ImportError("The numpy engine requires numpy to be installed")
+    if engine == 'auto':
+        engine = 'numpy' if worth_using(np, len(store)) else 'python'
+
+    store.sort()
+    lat, lon, timestamp = store.lat, store.lon, store.timestamp
+    settings = VESSEL_ANALYZER if progress else {**VESSEL_ANALYZER, "disable": True}
+    with progress_bar(total=store.vessel_count, **settings) as pbar:
+        for mmsi, start, end in store.vessels():
+            if cleaning is not None and cleaning.active:
+                _, track_lat, track_lon, track_timestamp = clean_track(lat, lon, timestamp, start, end, cleaning)
+            else:
+                track_lat, track_lon, track_timestamp = lat[start:end], lon[start:end], timestamp[start:end]
+            if len(track_timestamp) >= 2:
+                yield simplify_track(mmsi, track_lat, track_lon, track_timestamp, simplification, engine)
+            pbar.update(1)
@@ -0,0 +1,175 @@
+"""NumPy implementation of stop detection over columnar position arrays.
+
+Produces exactly the stops of ``analyzer.scan_episodes``: a stop starts at the
+first fix of a run of consecutive pairs slower than the speed threshold and
+is kept when the fix that ends the run (or the vessel's last fix) is at least
+``min_duration`` seconds later.
+"""
+import math
+
+import numpy as np
+
+from ..utils.geo import DEFAULT_SPEED_THRESHOLD, KNOTS_CONVERSION, haversine_distance_array
+
+
+def pair_speeds(lat: np.ndarray, lon: np.ndarray, timestamp: np.ndarray) -> np.ndarray:
+    """Speed in knots between each pair of consecutive rows (0 for equal timestamps)."""
+    return speeds_between(lat[:-1], lon[:-1], timestamp[:-1], lat[1:], lon[1:], timestamp[1:])
+
+
+def speeds_between(lat1: np.ndarray, lon1: np.ndarray, t1: np.ndarray,
+                   lat2: np.ndarray, lon2: np.ndarray, t2: np.ndarray) -> np.ndarray:
+    """Element-wise ``geo.speed_between`` in knots (0 for equal timestamps)."""
+    distance = haversine_distance_array(lat1, lon1, lat2, lon2)
+    time_diff = t2 - t1
+    moving = time_diff != 0
+    speeds = np.zeros(len(time_diff), dtype=np.float64)
+    speeds[moving] = (distance[moving] / time_diff[moving]) / KNOTS_CONVERSION
+    return speeds
+
+
+def clean_positions(lat: np.ndarray, lon: np.ndarray, timestamp: np.ndarray,
+                    offsets: np.ndarray, cleaning) -> tuple:
+    """Apply a ``cleaning.Cleaning`` to many vessels at once.
+
+    Makes the decisions of ``cleaning.clean_track`` for every vessel in
+    the arrays. Returns the rows kept and the cleaned latitude, longitude,
+    timestamp and vessel offsets.
+    """
+    rows = np.arange(len(timestamp), dtype=np.int64)
+    if cleaning.dedupe and len(timestamp):
+        keep = np.ones(len(timestamp), dtype=bool)
+        keep[1:] = timestamp[1:] != timestamp[:-1]
+        keep[offsets[:-1][offsets[:-1] < len(timestamp)]] = True
+        rows, offsets = rows[keep], _compact(keep, offsets)
+        lat, lon, timestamp = lat[keep], lon[keep], timestamp[keep]
+
+    if cleaning.max_speed is not None and len(timestamp) >= 3:
+        limit = cleaning.max_speed
+        interior = np.ones(len(timestamp), dtype=bool)
+        interior[offsets[:-1][offsets[:-1] < len(timestamp)]] = False
+        interior[offsets[1:][offsets[1:] > 0] - 1] = False
+        speeds = pair_speeds(lat, lon, timestamp)
+        skip = speeds_between(lat[:-2], lon[:-2], timestamp[:-2], lat[2:], lon[2:], timestamp[2:])
+        keep = np.ones(len(timestamp), dtype=bool)
+        keep[1:-1] = ~(interior[1:-1] & (speeds[:-1] > limit) & (speeds[1:] > limit) & (skip <= limit))
+        rows, offsets = rows[keep], _compact(keep, offsets)
+        lat, lon, timestamp = lat[keep], lon[keep], timestamp[keep]
+
+    if cleaning.smooth_window > 1 and len(timestamp):
+        half = cleaning.smooth_window // 2
+        counts = np.diff(offsets)
+        first = np.repeat(offsets[:-1], counts)
+        last = np.repeat(offsets[1:] - 1, counts)
+        window = np.arange(len(timestamp))[:, None] + np.arange(-half, half + 1)
+        window = np.clip(window, first[:, None], last[:, None])
+        lat = np.partition(lat[window], half, axis=1)[:, half]
+        lon = np.partition(lon[window], half, axis=1)[:, half]
+    return rows, lat, lon, timestamp, offsets
+
+
+def _compact(keep: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Vessel offsets after dropping the rows not in ``keep``."""
+    return np.concatenate(([0], np.cumsum(keep)))[offsets]
+
+
+def find_stop_indices(lat: np.ndarray, lon: np.ndarray, timestamp: np.ndarray,
+                      offsets: np.ndarray, min_duration: int,
+                      speed_threshold: float = DEFAULT_SPEED_THRESHOLD) -> np.ndarray:
+    """Find stop start rows across many vessels at once.
+
+    The arrays hold vessels back to back, each sorted by time, with vessel k
+    occupying rows offsets[k]:offsets[k + 1]. Returns ascending row indices.
+    """
+    if len(timestamp) < 2:
+        return np.empty(0, dtype=np.int64)
+
+    slow = pair_speeds(lat, lon, timestamp) < speed_threshold
+    return _stop_starts(slow, timestamp, offsets, min_duration)
+
+
+def find_stop_episodes(lat: np.ndarray, lon: np.ndarray, timestamp: np.ndarray,
+                       offsets: np.ndarray, min_duration: int,
+                       speed_threshold: float = DEFAULT_SPEED_THRESHOLD) -> tuple:
+    """Find stops across many vessels at once, with their episode columns.
+
+    Returns the ascending stop start rows and a list of arrays in
+    ``models.episode.EPISODE_FIELDS`` order, one entry per stop.
+    """
+    if len(timestamp) < 2:
+        starts = np.empty(0, dtype=np.int64)
+        return starts, episode_columns(lat, lon, timestamp, starts, starts, starts)
+
+    slow = pair_speeds(lat, lon, timestamp) < speed_threshold
+    run_starts, last_rows, end_rows, _ = _runs(slow, timestamp, offsets)
+    long_enough = timestamp[end_rows] - timestamp[run_starts] >= min_duration
+    starts = run_starts[long_enough]
+    return starts, episode_columns(lat, lon, timestamp, starts, last_rows[long_enough],
+                                   end_rows[long_enough])
+
+
+def episode_columns(lat: np.ndarray, lon: np.ndarray, timestamp: np.ndarray, starts: np.ndarray,
+                    last_rows: np.ndarray, end_rows: np.ndarray) -> list:
+    """Episode columns of the stops spanning rows [start, last] and closed at ``end_rows``.
+
+    Only the rows of the stops are visited. Centroids are exactly rounded
+    means (math.fsum), so they do not depend on summation order and match
+    the scalar engine's.
+    """
+    points = last_rows - starts + 1
+    if not len(starts):
+        empty = np.empty(0, dtype=np.float64)
+        return [timestamp[end_rows], points] + [empty] * 6
+
+    # Segment boundaries for reduceat: [start, last + 1) for each stop, with a
+    # padding row so that a stop ending on the final row has a valid bound
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = last_rows + 1
+    padded_lat = np.append(lat, 0.0)
+    padded_lon = np.append(lon, 0.0)
+    segments = list(zip(starts.tolist(), (last_rows + 1).tolist()))
+    return [
+        timestamp[end_rows],
+        points,
+        np.array([math.fsum(lat[a:b]) for a, b in segments]) / points,
+        np.array([math.fsum(lon[a:b]) for a, b in segments]) / points,
+        np.minimum.reduceat(padded_lat, bounds)[0::2],
+        np.minimum.reduceat(padded_lon, bounds)[0::2],
+        np.maximum.reduceat(padded_lat, bounds)[0::2],
+        np.maximum.reduceat(padded_lon, bounds)[0::2],
+    ]
+
+
+def _stop_starts(slow: np.ndarray, timestamp: np.ndarray, offsets: np.ndarray,
+                 min_duration: int) -> np.ndarray:
+    """Turn a per-pair slow mask into stop start rows."""
+    run_starts, durations, _ = stop_runs(slow, timestamp, offsets)
+    return run_starts[durations >= min_duration]
+
+
+def stop_runs(slow: np.ndarray, timestamp: np.ndarray, offsets: np.ndarray) -> tuple:
+    """Find every candidate stop in a per-pair slow mask, whatever its duration.
+
+    Returns the start row, duration and vessel of each run of slow pairs.
+    The mask is modified in place.
+    """
+    run_starts, _, end_rows, vessel = _runs(slow, timestamp, offsets)
+    return run_starts, timestamp[end_rows] - timestamp[run_starts], vessel
+
+
+def _runs(slow: np.ndarray, timestamp: np.ndarray, offsets: np.ndarray) -> tuple:
+    """Start row, last slow row, closing row and vessel of each run of slow pairs."""
+    # Pairs spanning two vessels never belong to a stop
+    boundaries = offsets[1:-1]
+    slow[boundaries[(boundaries > 0) & (boundaries < len(timestamp))] - 1] = False
+
+    edges = np.diff(slow.astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1) - 1
+
+    # The run is closed by the fix after its last slow pair, or by the
+    # vessel's final fix when the run reaches the end of the track
+    vessel = np.searchsorted(offsets, run_ends, side='right') - 1
+    end_rows = np.minimum(run_ends + 2, offsets[vessel + 1] - 1)
+    return run_starts, run_ends + 1, end_rows, vessel
@@ -1,4 +1,7 @@
 """Data models for vessel tracking."""
 from vessel_tracker.models.position import Position
+from vessel_tracker.models.episode import StopEpisode
+from vessel_tracker.models.batch import PositionBatch, StopBatch
+from vessel_tracker.models.store import PositionStore
 
-__all__ = ['Position']
\ No newline at end of file
+__all__ = ['Position', 'StopEpisode', 'PositionBatch', 'StopBatch', 'PositionStore']
\ No newline at end of file
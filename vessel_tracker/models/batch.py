@@ -0,0 +1,134 @@
+from array import array
+from typing import Dict, Generator, List, Optional, Sequence
+
+from .episode import EPISODE_FIELDS, StopEpisode
+from .position import Position
+
+
+class PositionBatch:
+    """Compact column-oriented batch of positions.
+
+    Coordinates and timestamps are kept in typed arrays and MMSIs are stored
+    once per batch in a lookup table, so a batch pickles to a few flat buffers
+    instead of one object per position. Batches parsed from input also carry
+    the number of lines read and of lines rejected as invalid JSON
+    (``errors``), non-position messages, invalid position reports or by a
+    position filter (``filtered``).
+    """
+
+    __slots__ = ('lat', 'lon', 'timestamp', 'mmsi_ids', 'mmsi_table', 'lines',
+                 'errors', 'non_position', 'invalid', 'filtered', '_mmsi_index')
+
+    def __init__(self):
+        self.lat = array('d')
+        self.lon = array('d')
+        self.timestamp = array('q')
+        self.mmsi_ids = array('i')
+        self.mmsi_table: List[str] = []
+        self.lines = 0
+        self.errors = 0
+        self.non_position = 0
+        self.invalid = 0
+        self.filtered = 0
+        self._mmsi_index: Optional[Dict[str, int]] = {}
+
+    @classmethod
+    def from_columns(cls, lat: array, lon: array, timestamp: array, mmsi_ids: array,
+                     mmsi_table: List[str]) -> 'PositionBatch':
+        """Wrap existing column arrays, sharing the given MMSI table."""
+        batch = cls()
+        batch.lat, batch.lon, batch.timestamp, batch.mmsi_ids = lat, lon, timestamp, mmsi_ids
+        batch.mmsi_table = mmsi_table
+        batch._mmsi_index = None
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getstate__(self):
+        return (self.lat, self.lon, self.timestamp, self.mmsi_ids, self.mmsi_table,
+                self.lines, self.errors, self.non_position, self.invalid, self.filtered)
+
+    def __setstate__(self, state):
+        (self.lat, self.lon, self.timestamp, self.mmsi_ids, self.mmsi_table,
+         self.lines, self.errors, self.non_position, self.invalid, self.filtered) = state
+        self._mmsi_index = None
+
+    def append(self, lat: float, lon: float, timestamp: int, mmsi: str) -> None:
+        """Append a single position to the batch."""
+        index = self._mmsi_index
+        if index is None:
+            index = self._mmsi_index = {mmsi: i for i, mmsi in enumerate(self.mmsi_table)}
+        mmsi_id = index.get(mmsi)
+        if mmsi_id is None:
+            mmsi_id = index[mmsi] = len(self.mmsi_table)
+            self.mmsi_table.append(mmsi)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.timestamp.append(timestamp)
+        self.mmsi_ids.append(mmsi_id)
+
+    def positions(self) -> Generator[Position, None, None]:
+        """Yield the batch contents as Position objects, in order."""
+        table = self.mmsi_table
+        for lat, lon, timestamp, mmsi_id in zip(self.lat, self.lon, self.timestamp, self.mmsi_ids):
+            yield Position(lat=lat, lon=lon, timestamp=timestamp, mmsi=table[mmsi_id])
+
+
+class StopBatch(PositionBatch):
+    """PositionBatch of stop start positions with their episode columns.
+
+    Each field of EPISODE_FIELDS is kept in a typed array of the same name,
+    one entry per stop, and ``positions`` yields StopEpisode objects.
+    ``ports`` is None, or the port label of each stop once labelled.
+    """
+
+    __slots__ = tuple(name for name, _ in EPISODE_FIELDS) + ('ports',)
+
+    def __init__(self):
+        super().__init__()
+        for name, typecode in EPISODE_FIELDS:
+            setattr(self, name, array(typecode))
+        self.ports: Optional[List[Optional[str]]] = None
+
+    @classmethod
+    def from_columns(cls, lat: array, lon: array, timestamp: array, mmsi_ids: array,
+                     mmsi_table: List[str], episode: Sequence[array] = ()) -> 'StopBatch':
+        """Wrap existing start and episode column arrays, sharing the given MMSI table."""
+        batch = super().from_columns(lat, lon, timestamp, mmsi_ids, mmsi_table)
+        for (name, _), column in zip(EPISODE_FIELDS, episode):
+            setattr(batch, name, column)
+        return batch
+
+    @property
+    def episode_columns(self) -> List[array]:
+        """The episode columns in EPISODE_FIELDS order."""
+        return [getattr(self, name) for name, _ in EPISODE_FIELDS]
+
+    def __getstate__(self):
+        return super().__getstate__() + tuple(self.episode_columns) + (self.ports,)
+
+    def __setstate__(self, state):
+        count = len(EPISODE_FIELDS) + 1
+        super().__setstate__(state[:-count])
+        for (name, _), column in zip(EPISODE_FIELDS, state[-count:]):
+            setattr(self, name, column)
+        self.ports = state[-1]
+
+    def append_episode(self, episode: StopEpisode) -> None:
+        """Append a single stop episode to the batch."""
+        if episode.port is not None and self.ports is None:
+            self.ports = [None] * len(self)
+        self.append(episode.lat, episode.lon, episode.timestamp, episode.mmsi)
+        for name, _ in EPISODE_FIELDS:
+            getattr(self, name).append(getattr(episode, name))
+        if self.ports is not None:
+            self.ports.append(episode.port)
+
+    def positions(self) -> Generator[StopEpisode, None, None]:
+        """Yield the batch contents as StopEpisode objects, in order."""
+        table = self.mmsi_table
+        ports = self.ports if self.ports is not None else [None] * len(self)
+        for lat, lon, timestamp, mmsi_id, port, *episode in zip(self.lat, self.lon, self.timestamp,
+                                                               self.mmsi_ids, ports, *self.episode_columns):
+            yield StopEpisode(lat, lon, timestamp, table[mmsi_id], *episode, port=port)
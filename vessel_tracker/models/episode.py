@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Union
+
+from .position import Position, intern_mmsi
+
+# Episode fields beyond the start position, with their array typecodes
+EPISODE_FIELDS = (
+    ('end_timestamp', 'q'),
+    ('points', 'q'),
+    ('centroid_lat', 'd'),
+    ('centroid_lon', 'd'),
+    ('min_lat', 'd'),
+    ('min_lon', 'd'),
+    ('max_lat', 'd'),
+    ('max_lon', 'd'),
+)
+
+
+@dataclass(slots=True, init=False, repr=False)
+class StopEpisode(Position):
+    """A vessel stop: its start position plus when it ended and where the vessel dwelt.
+
+    ``end_timestamp`` is the fix that closed the stop (the first fix after
+    the vessel moved off, or its last fix), so ``duration`` is the value
+    compared against the minimum stop duration. ``points``, the centroid
+    and the extent cover the fixes of the stop itself, from its start to
+    the last slow fix. ``port`` is the label of the port or anchorage the
+    stop lies in, when stops were labelled (see ``core.ports``).
+    """
+    end_timestamp: int = 0
+    points: int = 0
+    centroid_lat: float = 0.0
+    centroid_lon: float = 0.0
+    min_lat: float = 0.0
+    min_lon: float = 0.0
+    max_lat: float = 0.0
+    max_lon: float = 0.0
+    port: Optional[str] = None
+
+    def __init__(self, lat: float, lon: float, timestamp: int, mmsi: Union[str, int],
+                 end_timestamp: int = 0, points: int = 0, centroid_lat: float = 0.0,
+                 centroid_lon: float = 0.0, min_lat: float = 0.0, min_lon: float = 0.0,
+                 max_lat: float = 0.0, max_lon: float = 0.0, port: Optional[str] = None):
+        self.lat = lat
+        self.lon = lon
+        self.timestamp = timestamp
+        self.mmsi_id = intern_mmsi(mmsi)
+        self.end_timestamp = end_timestamp
+        self.points = points
+        self.centroid_lat = centroid_lat
+        self.centroid_lon = centroid_lon
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.max_lat = max_lat
+        self.max_lon = max_lon
+        self.port = port
+
+    def __reduce__(self):
+        return type(self), (self.lat, self.lon, self.timestamp, self.mmsi, self.end_timestamp, self.points,
+                            self.centroid_lat, self.centroid_lon, self.min_lat, self.min_lon,
+                            self.max_lat, self.max_lon, self.port)
+
+    @property
+    def duration(self) -> int:
+        """Seconds from the start of the stop to the fix that closed it."""
+        return self.end_timestamp - self.timestamp
+
+    @property
+    def end_datetime(self) -> datetime:
+        """Convert the end timestamp to a datetime object."""
+        return datetime.utcfromtimestamp(self.end_timestamp)
+
+    @property
+    def start(self) -> Position:
+        """The position where the stop started."""
+        return Position(lat=self.lat, lon=self.lon, timestamp=self.timestamp, mmsi=self.mmsi)
+
+    def to_dict(self) -> dict:
+        """Convert the episode to a GeoJSON Feature at its start position."""
+        # Zero-argument super() does not work in slotted dataclasses
+        feature = Position.to_dict(self)
+        feature["properties"].update({
+            "end_timestamp": self.end_timestamp,
+            "end_datetime": self.end_datetime.isoformat(),
+            "duration": self.duration,
+            "points": self.points,
+            "centroid": [self.centroid_lon, self.centroid_lat],
+            "bbox": [self.min_lon, self.min_lat, self.max_lon, self.max_lat],
+        })
+        if self.port is not None:
+            feature["properties"]["port"] = self.port
+        return feature
@@ -1,13 +1,41 @@
+import threading
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Dict, List, Union
 
-@dataclass
-class Position:
-    """Represents a vessel's position at a specific time."""
-    lat: float
-    lon: float
-    timestamp: int
-    mmsi: str
+# MMSI of each interned id, in order of first appearance in this process.
+# It holds one entry per distinct MMSI seen, and is never cleared since
+# live positions keep their ids.
+MMSI_TABLE: List[str] = []
+# Interned id of each MMSI text
+_MMSI_IDS: Dict[str, int] = {}
+# Serializes insertions, since live mode parses on a worker thread
+_MMSI_LOCK = threading.Lock()
+
+
+def intern_mmsi(mmsi: Union[str, int]) -> int:
+    """Id of an MMSI's text in MMSI_TABLE, adding it on first sight."""
+    text = str(mmsi)
+    mmsi_id = _MMSI_IDS.get(text)
+    if mmsi_id is None:
+        with _MMSI_LOCK:
+            mmsi_id = _MMSI_IDS.get(text)
+            if mmsi_id is None:
+                # Append first so that any id a reader finds is already in the table
+                MMSI_TABLE.append(text)
+                mmsi_id = _MMSI_IDS[text] = len(MMSI_TABLE) - 1
+    return mmsi_id
+
+
+class _PositionMethods:
+    """Accessors shared by Position and FrozenPosition."""
+
+    __slots__ = ()
+
+    @property
+    def mmsi(self) -> str:
+        """The vessel's MMSI as text."""
+        return MMSI_TABLE[self.mmsi_id]
 
     @property
     def datetime(self) -> datetime:
@@ -27,4 +55,51 @@ class Position:
                 "timestamp": self.timestamp,
                 "datetime": self.datetime.isoformat()
             }
-        }
\ No newline at end of file
+        }
+
+    def __repr__(self) -> str:
+        return (f"{type(self).__name__}(lat={self.lat!r}, lon={self.lon!r}, "
+                f"timestamp={self.timestamp!r}, mmsi={self.mmsi!r})")
+
+    def __reduce__(self):
+        # Ids are only meaningful within one process, so pickle the MMSI itself
+        return type(self), (self.lat, self.lon, self.timestamp, self.mmsi)
+
+
+@dataclass(slots=True, init=False, repr=False)
+class Position(_PositionMethods):
+    """Represents a vessel's position at a specific time.
+
+    Positions have no per-instance ``__dict__`` and hold their MMSI as an
+    id into the process-wide MMSI_TABLE, so a vessel's MMSI is stored once
+    however many positions it reports; ``mmsi`` returns it as text.
+    """
+    lat: float
+    lon: float
+    timestamp: int
+    mmsi_id: int
+
+    def __init__(self, lat: float, lon: float, timestamp: int, mmsi: Union[str, int]):
+        self.lat = lat
+        self.lon = lon
+        self.timestamp = timestamp
+        self.mmsi_id = intern_mmsi(mmsi)
+
+    def frozen(self) -> 'FrozenPosition':
+        """An immutable, hashable copy, e.g. to use as a dict key or set member."""
+        return FrozenPosition(self.lat, self.lon, self.timestamp, self.mmsi)
+
+
+@dataclass(slots=True, frozen=True, init=False, repr=False)
+class FrozenPosition(_PositionMethods):
+    """An immutable, hashable Position."""
+    lat: float
+    lon: float
+    timestamp: int
+    mmsi_id: int
+
+    def __init__(self, lat: float, lon: float, timestamp: int, mmsi: Union[str, int]):
+        object.__setattr__(self, 'lat', lat)
+        object.__setattr__(self, 'lon', lon)
+        object.__setattr__(self, 'timestamp', timestamp)
+        object.__setattr__(self, 'mmsi_id', intern_mmsi(mmsi))
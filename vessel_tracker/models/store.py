@@ -0,0 +1,176 @@
+from array import array
+from typing import Dict, Generator, Iterable, List, Tuple
+
+from .batch import PositionBatch
+from .position import Position
+from ..utils.optional import optional_module, worth_using
+
+np = optional_module('numpy')
+
+
+class PositionStore:
+    """Columnar, array-backed store of positions for many vessels.
+
+    Latitude and longitude are kept as contiguous float64 arrays, timestamps
+    as int64 and MMSIs as int32 ids into an interning table. ``sort`` orders
+    the columns by (vessel, timestamp) and builds an offsets index, after
+    which each vessel's positions occupy one contiguous slice. A sorted store
+    may also wrap read-only memoryviews, e.g. of a memory-mapped cache entry.
+    """
+
+    def __init__(self):
+        self.lat = array('d')
+        self.lon = array('d')
+        self.timestamp = array('q')
+        self.mmsi_ids = array('i')
+        self.mmsi_table: List[str] = []
+        self._mmsi_index: Dict[str, int] = {}
+        self.offsets = array('q', [0])
+        self.is_sorted = True
+
+    @classmethod
+    def from_columns(cls, lat: array, lon: array, timestamp: array, mmsi_ids: array,
+                     mmsi_table: List[str]) -> 'PositionStore':
+        """Wrap existing column arrays whose ids index ``mmsi_table``."""
+        store = cls()
+        store.lat, store.lon, store.timestamp, store.mmsi_ids = lat, lon, timestamp, mmsi_ids
+        store.mmsi_table = mmsi_table
+        store._mmsi_index = {mmsi: i for i, mmsi in enumerate(mmsi_table)}
+        store.is_sorted = not len(timestamp)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    @property
+    def vessel_count(self) -> int:
+        """Number of distinct vessels in the store."""
+        return len(self.mmsi_table)
+
+    def intern(self, mmsi: str) -> int:
+        """Return the integer id for an MMSI, assigning one on first sight."""
+        mmsi_id = self._mmsi_index.get(mmsi)
+        if mmsi_id is None:
+            mmsi_id = self._mmsi_index[mmsi] = len(self.mmsi_table)
+            self.mmsi_table.append(mmsi)
+        return mmsi_id
+
+    def append(self, lat: float, lon: float, timestamp: int, mmsi: str) -> None:
+        """Append a single position."""
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.timestamp.append(timestamp)
+        self.mmsi_ids.append(self.intern(mmsi))
+        self.is_sorted = False
+
+    def extend(self, positions: Iterable[Position]) -> None:
+        """Append Position objects."""
+        for pos in positions:
+            self.append(pos.lat, pos.lon, pos.timestamp, pos.mmsi)
+
+    def extend_batch(self, batch: PositionBatch) -> None:
+        """Append a position batch, remapping its MMSI ids onto this store's table."""
+        if not len(batch):
+            return
+        remap = [self.intern(mmsi) for mmsi in batch.mmsi_table]
+        self.lat.extend(batch.lat)
+        self.lon.extend(batch.lon)
+        self.timestamp.extend(batch.timestamp)
+        if worth_using(np, len(self)):
+            ids = np.asarray(remap, dtype=np.int32)[np.frombuffer(batch.mmsi_ids, dtype=np.int32)]
+            self.mmsi_ids.frombytes(ids.tobytes())
+        else:
+            self.mmsi_ids.extend(remap[i] for i in batch.mmsi_ids)
+        self.is_sorted = False
+
+    def sort(self) -> None:
+        """Order the columns by (vessel id, timestamp) and rebuild the offsets index.
+
+        The sort is stable, so positions with equal timestamps keep their
+        insertion order. Vessel ids follow first appearance in the input.
+        """
+        if self.is_sorted:
+            return
+        if worth_using(np, len(self)):
+            self._sort_numpy()
+        else:
+            self._sort_python()
+        self.is_sorted = True
+
+    def _sort_numpy(self) -> None:
+        """Sort the columns in place using numpy."""
+        ids = np.frombuffer(self.mmsi_ids, dtype=np.int32)
+        timestamps = np.frombuffer(self.timestamp, dtype=np.int64)
+        order = np.lexsort((timestamps, ids))
+        for column, dtype in ((self.lat, np.float64), (self.lon, np.float64),
+                              (self.timestamp, np.int64), (self.mmsi_ids, np.int32)):
+            values = np.frombuffer(column, dtype=dtype)
+            values[:] = values[order]
+            del values
+        del ids, timestamps
+        counts = np.bincount(np.frombuffer(self.mmsi_ids, dtype=np.int32), minlength=self.vessel_count)
+        self.offsets = array('q', [0])
+        self.offsets.frombytes(np.cumsum(counts, dtype=np.int64).tobytes())
+
+    def _sort_python(self) -> None:
+        """Sort the columns with a counting sort on vessel id then a per-vessel sort."""
+        counts = [0] * self.vessel_count
+        for mmsi_id in self.mmsi_ids:
+            counts[mmsi_id] += 1
+        offsets = array('q', [0])
+        for count in counts:
+            offsets.append(offsets[-1] + count)
+
+        order = array('q', bytes(8 * len(self)))
+        cursor = list(offsets[:-1])
+        for i, mmsi_id in enumerate(self.mmsi_ids):
+            order[cursor[mmsi_id]] = i
+            cursor[mmsi_id] += 1
+
+        timestamps = self.timestamp
+        for start, end in zip(offsets, offsets[1:]):
+            order[start:end] = array('q', sorted(order[start:end], key=timestamps.__getitem__))
+
+        self.lat = array('d', (self.lat[i] for i in order))
+        self.lon = array('d', (self.lon[i] for i in order))
+        self.timestamp = array('q', (timestamps[i] for i in order))
+        self.mmsi_ids = array('i', (self.mmsi_ids[i] for i in order))
+        self.offsets = offsets
+
+    def vessels(self) -> Generator[Tuple[str, int, int], None, None]:
+        """Yield (mmsi, start, end) slices for each vessel, in first-appearance order."""
+        self.sort()
+        offsets = self.offsets
+        for mmsi_id, mmsi in enumerate(self.mmsi_table):
+            yield mmsi, offsets[mmsi_id], offsets[mmsi_id + 1]
+
+    def position(self, index: int) -> Position:
+        """Create a Position object for a single row."""
+        return Position(
+            lat=self.lat[index],
+            lon=self.lon[index],
+            timestamp=self.timestamp[index],
+            mmsi=self.mmsi_table[self.mmsi_ids[index]]
+        )
+
+    def take(self, indices: List[int]) -> PositionBatch:
+        """Gather the given rows into a PositionBatch sharing this store's MMSI table."""
+        if worth_using(np, len(indices)):
+            rows = np.asarray(indices, dtype=np.int64)
+            columns = []
+            for column, typecode, dtype in ((self.lat, 'd', np.float64), (self.lon, 'd', np.float64),
+                                            (self.timestamp, 'q', np.int64), (self.mmsi_ids, 'i', np.int32)):
+                taken = array(typecode)
+                taken.frombytes(np.frombuffer(column, dtype=dtype)[rows].tobytes())
+                columns.append(taken)
+        else:
+            columns = [array(typecode, (column[i] for i in indices)) for column, typecode in
+                       ((self.lat, 'd'), (self.lon, 'd'), (self.timestamp, 'q'), (self.mmsi_ids, 'i'))]
+        return PositionBatch.from_columns(*columns, self.mmsi_table)
+
+    def to_dict(self) -> Dict[str, List[Position]]:
+        """Materialize the store as time-sorted Position lists keyed by MMSI."""
+        return {
+            mmsi: [self.position(i) for i in range(start, end)]
+            for mmsi, start, end in self.vessels()
+        }
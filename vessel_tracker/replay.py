@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""Replay AIS files over TCP at a set rate, as a stand-in for a live feed."""
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from vessel_tracker.core.live import serve_replay
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Serve AIS files (JSON lines, optionally gzipped) to each TCP client.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("input_files", nargs="+", help="Files replayed in order to every client")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=5631, help="Port to listen on")
+    parser.add_argument("--rate", type=float, help="Lines per second (default: as fast as the client reads)")
+    return parser.parse_args(args)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Serve the input files to every client until interrupted."""
+    server = await serve_replay(args.input_files, args.host, args.port, args.rate)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Replaying {len(args.input_files)} file(s) on tcp://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> int:
+    """Main entry point for the replay server."""
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,57 @@
-"""Utility functions for vessel tracking."""
-from vessel_tracker.utils.geo import haversine_distance, calculate_speed
-from vessel_tracker.utils.file import open_file, count_lines, ensure_output_dir
-from vessel_tracker.utils.parsing import parse_position_message
-from vessel_tracker.utils.progress import (
-    get_progress_bar_settings,
-    MESSAGE_COUNTER,
-    MESSAGE_PROCESSOR,
-    VESSEL_ANALYZER,
-    GEOJSON_CREATOR
-)
+"""Utility functions for vessel tracking.
 
-__all__ = [
-    'haversine_distance',
-    'calculate_speed',
-    'open_file',
-    'count_lines',
-    'ensure_output_dir',
-    'parse_position_message',
-    'get_progress_bar_settings',
-    'MESSAGE_COUNTER',
-    'MESSAGE_PROCESSOR',
-    'VESSEL_ANALYZER',
-    'GEOJSON_CREATOR'
-]
\ No newline at end of file
+The names below are imported from their submodules on first use (see
+``vessel_tracker.core``), so the command line starts without importing
+the JSON, gzip and spatial helpers a run does not need.
+"""
+import importlib
+
+# Public name -> module it is defined in
+_EXPORTS = {
+    'haversine_distance': '.geo',
+    'calculate_speed': '.geo',
+    'json_number': '.geojson',
+    'open_file': '.file',
+    'open_file_with_raw': '.file',
+    'open_gzip': '.file',
+    'iter_lines': '.file',
+    'set_gzip_backend': '.file',
+    'count_lines': '.file',
+    'read_sidecar_count': '.file',
+    'write_sidecar_count': '.file',
+    'ensure_output_dir': '.file',
+    'parse_position_message': '.parsing',
+    'Decoder': '.parsing',
+    'get_decoder': '.parsing',
+    'is_position_candidate': '.parsing',
+    'PositionFilter': '.filters',
+    'parse_bbox': '.filters',
+    'parse_timestamp': '.filters',
+    'load_mmsi_file': '.filters',
+    'Polygon': '.spatial',
+    'GridIndex': '.spatial',
+    'load_polygons': '.spatial',
+    'Metrics': '.metrics',
+    'get_progress_bar_settings': '.progress',
+    'set_quiet': '.progress',
+    'status': '.progress',
+    'MESSAGE_COUNTER': '.progress',
+    'MESSAGE_PROCESSOR': '.progress',
+    'MESSAGE_BYTES': '.progress',
+    'VESSEL_ANALYZER': '.progress',
+    'GEOJSON_CREATOR': '.progress',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
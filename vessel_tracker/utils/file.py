@@ -1,8 +1,210 @@
+import glob
 import gzip
-from typing import TextIO
+import io
+import queue
+import shutil
+import stat
+import subprocess
+import sys
+import threading
+from typing import BinaryIO, Generator, Iterable, List, Optional, TextIO, Tuple
 import os
-from tqdm import tqdm
-from .progress import MESSAGE_COUNTER
+from .progress import MESSAGE_COUNTER, progress_bar
+
+SIDECAR_SUFFIX = '.count'
+STDIN_PATH = '-'
+# Prefix of a live TCP source, as in tcp://host:port
+TCP_PREFIX = 'tcp://'
+GZIP_MAGIC = b'\x1f\x8b'
+# Files picked up when an input is a directory
+INPUT_EXTENSIONS = ('.json', '.json.gz', '.jsonl', '.jsonl.gz')
+# Size of the blocks read from inputs; lines are split out of whole blocks
+READ_BYTES = 1 << 20
+# Decompressed blocks buffered ahead of the parser by the read-ahead thread
+READ_AHEAD_BLOCKS = 4
+# Inflate implementations, fastest first; 'auto' picks the first available
+GZIP_BACKENDS = ('auto', 'isal', 'zlib-ng', 'pigz', 'gzip')
+# Command decompressing standard input to standard output for the pigz backend
+PIGZ_COMMAND = ('pigz', '-dc')
+
+_gzip_backend = 'auto'
+
+
+def set_gzip_backend(backend: str) -> None:
+    """Choose the inflate implementation used for gzip inputs (one of GZIP_BACKENDS)."""
+    global _gzip_backend
+    if backend not in GZIP_BACKENDS:
+        raise ValueError(f"Unknown gzip backend: {backend}")
+    _gzip_backend = backend
+
+
+def resolve_gzip_backend(backend: Optional[str] = None, subprocess_ok: bool = True) -> str:
+    """Resolve a gzip backend name to one that is available.
+
+    'auto' prefers the isal and zlib-ng bindings, then a pigz executable,
+    then the standard library. pigz needs a real file (``subprocess_ok``);
+    otherwise the best in-process backend is used. An unavailable explicit
+    choice raises ImportError.
+    """
+    backend = backend or _gzip_backend
+    if backend == 'pigz' and not subprocess_ok:
+        backend = 'auto'
+    candidates = GZIP_BACKENDS[1:] if backend == 'auto' else (backend,)
+    for name in candidates:
+        if name == 'isal' and _importable('isal.igzip'):
+            return name
+        if name == 'zlib-ng' and _importable('zlib_ng.gzip_ng'):
+            return name
+        if name == 'pigz' and subprocess_ok and shutil.which(PIGZ_COMMAND[0]):
+            return name
+        if name == 'gzip':
+            return name
+    raise ImportError(f"The {backend} gzip backend is not available")
+
+
+def _importable(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+class PigzReader:
+    """Reads the output of a pigz process decompressing a file from its current offset.
+
+    The process shares the file's descriptor, so the file's ``tell()``
+    still reports the compressed bytes consumed.
+    """
+
+    def __init__(self, raw: BinaryIO):
+        self.process = subprocess.Popen(PIGZ_COMMAND, stdin=raw.fileno(), stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+        self._finished = False
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.process.stdout.read(size)
+        if not data and not self._finished:
+            self._finished = True
+            error = self.process.stderr.read().decode(errors='replace').strip()
+            if self.process.wait() != 0:
+                raise OSError(f"{PIGZ_COMMAND[0]} failed: {error}")
+        return data
+
+    def close(self) -> None:
+        self.process.stdout.close()
+        self.process.stderr.close()
+        if self.process.poll() is None:
+            self.process.terminate()
+        self.process.wait()
+
+    def __enter__(self) -> 'PigzReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReadAhead:
+    """Reads blocks from a file in a background thread, a few blocks ahead of the consumer.
+
+    Used for in-process decompression: zlib releases the GIL while
+    inflating, so decompression overlaps with parsing. Errors raised by
+    the reader are re-raised by ``read``.
+    """
+
+    def __init__(self, f: BinaryIO, block_bytes: int = READ_BYTES, depth: int = READ_AHEAD_BLOCKS):
+        self.f = f
+        self.block_bytes = block_bytes
+        self._blocks = queue.Queue(depth)
+        self._buffer = b''
+        self._done = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self) -> None:
+        try:
+            while not self._stop.is_set():
+                block = self.f.read(self.block_bytes)
+                self._blocks.put(block)
+                if not block:
+                    return
+        except BaseException as e:
+            self._blocks.put(e)
+
+    def _next_block(self) -> bytes:
+        if self._done:
+            return b''
+        block = self._blocks.get()
+        if isinstance(block, BaseException):
+            self._done = True
+            raise block
+        if not block:
+            self._done = True
+        return block
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to ``size`` bytes, fewer only at the end (all remaining when negative)."""
+        parts = []
+        wanted = size
+        while wanted:
+            if not self._buffer:
+                self._buffer = self._next_block()
+                if not self._buffer:
+                    break
+            if wanted < 0 or len(self._buffer) <= wanted:
+                part, self._buffer = self._buffer, b''
+            else:
+                part, self._buffer = self._buffer[:wanted], self._buffer[wanted:]
+            parts.append(part)
+            if wanted > 0:
+                wanted -= len(part)
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    def close(self) -> None:
+        """Stop the reader thread and close the file."""
+        self._stop.set()
+        while self._thread.is_alive():
+            try:
+                self._blocks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.f.close()
+
+    def __enter__(self) -> 'ReadAhead':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_gzip(raw: BinaryIO, backend: Optional[str] = None, read_ahead: bool = True) -> BinaryIO:
+    """Open a decompressing reader over a binary file positioned at a gzip member.
+
+    ``backend`` is one of GZIP_BACKENDS (the ``set_gzip_backend`` choice by
+    default). pigz is only used for real files and decompresses in its own
+    process; in-process backends decompress in a read-ahead thread unless
+    ``read_ahead`` is off.
+    """
+    try:
+        raw.fileno()
+        seekable = raw.seekable() and raw is not sys.stdin.buffer
+    except (AttributeError, OSError, ValueError):
+        seekable = False
+    backend = resolve_gzip_backend(backend, subprocess_ok=seekable)
+    if backend == 'pigz':
+        return PigzReader(raw)
+    if backend == 'isal':
+        from isal import igzip
+        f = igzip.open(raw, 'rb')
+    elif backend == 'zlib-ng':
+        from zlib_ng import gzip_ng
+        f = gzip_ng.open(raw, 'rb')
+    else:
+        f = gzip.GzipFile(fileobj=raw, mode='rb')
+    return ReadAhead(f) if read_ahead else f
+
 
 def open_file(filepath: str) -> TextIO:
     """Open file handling both .gz and regular files."""
@@ -10,14 +212,169 @@ def open_file(filepath: str) -> TextIO:
         return gzip.open(filepath, 'rt')
     return open(filepath, 'r')
 
+
+def open_file_with_raw(filepath: str, offset: int = 0) -> Tuple[BinaryIO, BinaryIO]:
+    """Open file for binary reading and also return the underlying raw file.
+
+    The raw file's offset tells how many (compressed) bytes have been
+    consumed so far, which lets callers report progress without a pre-scan.
+    A path of '-' reads standard input, which may be plain or gzipped.
+    A non-zero ``offset`` starts reading there; for gzip files it must fall
+    on a member boundary, such as the end of the file as previously read.
+    Gzip input is decompressed by ``open_gzip``, so read it in large blocks
+    (see ``iter_lines``) rather than line by line.
+    """
+    if filepath == STDIN_PATH:
+        raw = sys.stdin.buffer
+        if raw.peek(2)[:2] == GZIP_MAGIC:
+            return open_gzip(raw), raw
+        return raw, raw
+
+    raw = open(filepath, 'rb')
+    if offset:
+        raw.seek(offset)
+    if filepath.endswith('.gz'):
+        return open_gzip(raw), raw
+    return raw, raw
+
+
+def read_blocks(f: BinaryIO, block_bytes: int = READ_BYTES,
+                partial: bool = False) -> Generator[bytes, None, None]:
+    """Read a binary stream in blocks that end on a line boundary.
+
+    With ``partial`` each read returns whatever has arrived (``read1``)
+    instead of waiting for a full block, for pipes and sockets.
+    """
+    read = f.read1 if partial else f.read
+    remainder = b''
+    while True:
+        data = read(block_bytes)
+        if not data:
+            break
+        data = remainder + data
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            remainder = data
+            continue
+        remainder = data[cut:]
+        yield data[:cut]
+    if remainder:
+        yield remainder
+
+
+def split_lines(block: bytes) -> List[bytes]:
+    """Split a block into its lines, newline included, breaking only at b'\\n' as ``readlines`` does.
+
+    ``bytes.splitlines`` also breaks at a bare \\r, which JSON allows as whitespace.
+    """
+    return io.BytesIO(block).readlines()
+
+
+def iter_line_chunks(f: BinaryIO, block_bytes: int = READ_BYTES) -> Generator[List[bytes], None, None]:
+    """Yield the lines of a binary stream, newline included, a list of about ``block_bytes`` at a time.
+
+    Buffered regular files use their own ``readlines``; decompressing
+    readers are read in large blocks that the lines are split out of, which
+    is much faster than their line-by-line reads. Pipes and sockets yield
+    the lines that have arrived, so a slow feed is not held back until a
+    whole block has.
+    """
+    if isinstance(f, io.BufferedReader):
+        if _is_regular(f):
+            yield from iter(lambda: f.readlines(block_bytes), [])
+            return
+        blocks = read_blocks(f, block_bytes, partial=True)
+    else:
+        blocks = read_blocks(f, block_bytes)
+    for block in blocks:
+        yield split_lines(block)
+
+
+def _is_regular(f: BinaryIO) -> bool:
+    """Whether a stream reads a regular file (not a pipe, socket or terminal)."""
+    try:
+        return stat.S_ISREG(os.fstat(f.fileno()).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def iter_lines(f: BinaryIO, block_bytes: int = READ_BYTES) -> Generator[bytes, None, None]:
+    """Yield the lines of a binary stream, newline included."""
+    for chunk in iter_line_chunks(f, block_bytes):
+        yield from chunk
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Expand input files, glob patterns and directories into a list of files.
+
+    Directories contribute their JSON files (see INPUT_EXTENSIONS) and globs
+    their matches, each in sorted order; '-' is passed through. Duplicates are
+    dropped, keeping the first occurrence.
+    """
+    paths = []
+    for item in inputs:
+        if item == STDIN_PATH or os.path.isfile(item):
+            paths.append(item)
+        elif os.path.isdir(item):
+            found = sorted(os.path.join(item, name) for name in os.listdir(item)
+                           if name.endswith(INPUT_EXTENSIONS))
+            paths.extend(path for path in found if os.path.isfile(path))
+        elif any(char in item for char in '*?['):
+            matches = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+            if not matches:
+                raise FileNotFoundError(f"No input files match: {item}")
+            paths.extend(matches)
+        else:
+            raise FileNotFoundError(f"Input file not found: {item}")
+    return list(dict.fromkeys(paths))
+
+
 def count_lines(filepath: str) -> int:
     """Count number of lines in a file, handling both .gz and regular files."""
     count = 0
-    with open_file(filepath) as f:
-        for _ in tqdm(f, **MESSAGE_COUNTER):
-            count += 1
+    f, raw = open_file_with_raw(filepath)
+    with raw, f, progress_bar(**MESSAGE_COUNTER) as pbar:
+        for block in read_blocks(f):
+            lines = block.count(b'\n') + (not block.endswith(b'\n'))
+            count += lines
+            pbar.update(lines)
     return count
 
+
+def sidecar_path(filepath: str) -> str:
+    """Path of the optional sidecar index holding a file's line count."""
+    return filepath + SIDECAR_SUFFIX
+
+
+def _file_signature(filepath: str) -> Tuple[int, int]:
+    """Size and modification time (ns) of a file, identifying its current contents."""
+    info = os.stat(filepath)
+    return info.st_size, info.st_mtime_ns
+
+
+def read_sidecar_count(filepath: str) -> Optional[int]:
+    """Read the line count from a sidecar index, if one exists and is valid.
+
+    The index records the size and modification time of the file it was
+    written for; it is ignored once the file has been replaced or appended to.
+    """
+    try:
+        with open(sidecar_path(filepath)) as f:
+            count, size, mtime_ns = (int(field) for field in f.read().split())
+        if (size, mtime_ns) != _file_signature(filepath):
+            return None
+        return count
+    except (OSError, ValueError):
+        return None
+
+
+def write_sidecar_count(filepath: str, count: int) -> None:
+    """Write a sidecar index holding the line count of a file, with its size and modification time."""
+    size, mtime_ns = _file_signature(filepath)
+    with open(sidecar_path(filepath), 'w') as f:
+        f.write(f"{count} {size} {mtime_ns}\n")
+
+
 def ensure_output_dir(filepath: str) -> None:
     """Ensure the output directory exists."""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
\ No newline at end of file
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -0,0 +1,139 @@
+"""Position filters applied while messages are decoded."""
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from typing import FrozenSet, Iterable, Optional, Tuple, Union
+
+from .spatial import GridIndex
+
+BBox = Tuple[float, float, float, float]
+
+# Unambiguous integer UserID / UTCTimeStamp values, e.g. `"UserID": "123456789",`
+_USER_ID_PATTERN = re.compile(rb'"UserID"\s*:\s*("?)(\d+)\1\s*[,}]')
+_USER_ID_KEY = b'"UserID"'
+_TIMESTAMP_PATTERN = re.compile(rb'"UTCTimeStamp"\s*:\s*(-?\d+)\s*[,}]')
+_TIMESTAMP_KEY = b'"UTCTimeStamp"'
+
+
+def _single_match(pattern: re.Pattern, key: bytes, line: bytes) -> Optional[re.Match]:
+    """Match a key's value, or None unless the key occurs exactly once and the value is plain."""
+    match = pattern.search(line)
+    if match is None or line.find(key, match.end()) != -1 or line.find(key, 0, match.start()) != -1:
+        return None
+    return match
+
+
+def parse_timestamp(value: str) -> int:
+    """Parse epoch seconds or an ISO 8601 date/time (UTC unless an offset is given)."""
+    value = value.strip()
+    if re.fullmatch(r'-?\d+', value):
+        return int(value)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def parse_bbox(value: str) -> BBox:
+    """Parse 'min_lon,min_lat,max_lon,max_lat' (GeoJSON order)."""
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError(f"Bounding box needs four numbers: {value}")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lat > max_lat:
+        raise ValueError(f"Bounding box minimum latitude exceeds maximum: {value}")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def load_mmsi_file(path: str) -> FrozenSet[str]:
+    """Read MMSIs separated by newlines, commas or whitespace; '#' starts a comment."""
+    mmsis = set()
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            mmsis.update(token for token in re.split(r'[\s,]+', line) if token)
+    return frozenset(mmsis)
+
+
+class PositionFilter:
+    """Keeps only positions inside a time window, fleet and area.
+
+    ``since`` is inclusive and ``until`` exclusive (epoch seconds). ``mmsis``
+    is a set of allowed MMSIs. ``bbox`` is (min_lon, min_lat, max_lon,
+    max_lat) and may cross the antimeridian (min_lon > max_lon). ``region``
+    is a GridIndex of polygons the position must fall in.
+
+    ``prefilter`` rejects raw lines on MMSI and timestamp before any JSON
+    decoding, when those values can be read unambiguously from the bytes.
+    """
+
+    def __init__(self, bbox: Optional[BBox] = None, since: Optional[int] = None,
+                 until: Optional[int] = None, mmsis: Optional[Iterable[str]] = None,
+                 region: Optional[GridIndex] = None):
+        self.bbox = bbox
+        self.since = since
+        self.until = until
+        self.mmsis = frozenset(mmsis) if mmsis is not None else None
+        self.region = region
+
+    @property
+    def has_prefilter(self) -> bool:
+        """Whether raw lines can be rejected before decoding."""
+        return self.mmsis is not None or self.since is not None or self.until is not None
+
+    def prefilter(self, line: Union[bytes, str]) -> bool:
+        """Return False only for lines that are certain to be rejected."""
+        if not isinstance(line, bytes):
+            return True
+        if self.mmsis is not None:
+            match = _single_match(_USER_ID_PATTERN, _USER_ID_KEY, line)
+            if match is not None and match.group(2).decode() not in self.mmsis:
+                return False
+        if self.since is not None or self.until is not None:
+            match = _single_match(_TIMESTAMP_PATTERN, _TIMESTAMP_KEY, line)
+            if match is not None and not self._in_window(int(match.group(1))):
+                return False
+        return True
+
+    def describe(self) -> dict:
+        """JSON-compatible description of the filter, equal for filters keeping the same positions.
+
+        The MMSI set and region polygons are given as hashes.
+        """
+        region = None
+        if self.region is not None:
+            rings = [[polygon.exterior, polygon.holes] for polygon in self.region.polygons]
+            region = hashlib.sha1(json.dumps(rings).encode()).hexdigest()
+        mmsis = None
+        if self.mmsis is not None:
+            mmsis = hashlib.sha1('\n'.join(sorted(self.mmsis)).encode()).hexdigest()
+        return {
+            "bbox": list(self.bbox) if self.bbox is not None else None,
+            "since": self.since,
+            "until": self.until,
+            "mmsis": mmsis,
+            "region": region,
+        }
+
+    def _in_window(self, timestamp: int) -> bool:
+        if self.since is not None and timestamp < self.since:
+            return False
+        return self.until is None or timestamp < self.until
+
+    def accepts(self, lat: float, lon: float, timestamp: int, mmsi: str) -> bool:
+        """Whether a decoded position passes every filter."""
+        if not self._in_window(timestamp):
+            return False
+        if self.mmsis is not None and mmsi not in self.mmsis:
+            return False
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            if not min_lat <= lat <= max_lat:
+                return False
+            if min_lon <= max_lon:
+                if not min_lon <= lon <= max_lon:
+                    return False
+            elif max_lon < lon < min_lon:
+                return False
+        return self.region is None or self.region.contains(lat, lon)
@@ -3,6 +3,7 @@ from ..models.position import Position
 
 EARTH_RADIUS = 6371e3  # Earth's radius in meters
 KNOTS_CONVERSION = 0.514444  # Conversion factor from m/s to knots
+DEFAULT_SPEED_THRESHOLD = 1.0  # Speed in knots below which a vessel counts as stopped
 
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -20,11 +21,35 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return EARTH_RADIUS * c
 
 
-def calculate_speed(pos1: Position, pos2: Position) -> float:
-    """Calculate speed in knots between two positions."""
-    distance = haversine_distance(pos1.lat, pos1.lon, pos2.lat, pos2.lon)
-    time_diff = pos2.timestamp - pos1.timestamp
+def haversine_distance_array(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance over numpy arrays.
+
+    Evaluates the same expression, in the same order, as haversine_distance.
+    """
+    import numpy as np
+
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = np.radians(lat2 - lat1)
+    delta_lambda = np.radians(lon2 - lon1)
+
+    sin_phi = np.sin(delta_phi / 2)
+    sin_lambda = np.sin(delta_lambda / 2)
+    a = sin_phi * sin_phi + np.cos(phi1) * np.cos(phi2) * sin_lambda * sin_lambda
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS * c
+
+
+def speed_between(lat1: float, lon1: float, t1: int, lat2: float, lon2: float, t2: int) -> float:
+    """Calculate speed in knots between two fixes given as plain values."""
+    time_diff = t2 - t1
     if time_diff == 0:
         return 0
 
-    return (distance / time_diff) / KNOTS_CONVERSION
\ No newline at end of file
+    return (haversine_distance(lat1, lon1, lat2, lon2) / time_diff) / KNOTS_CONVERSION
+
+
+def calculate_speed(pos1: Position, pos2: Position) -> float:
+    """Calculate speed in knots between two positions."""
+    return speed_between(pos1.lat, pos1.lon, pos1.timestamp, pos2.lat, pos2.lon, pos2.timestamp)
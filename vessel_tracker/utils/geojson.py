@@ -0,0 +1,10 @@
+"""Helpers for writing GeoJSON text directly, without building dicts for json.dumps."""
+import json
+import math
+
+
+def json_number(value: float) -> str:
+    """Format a float the way json.dumps does."""
+    if math.isfinite(value):
+        return repr(value)
+    return json.dumps(value)
@@ -0,0 +1,172 @@
+"""Per-stage timers, counters and optional profiling hooks for a pipeline run."""
+import cProfile
+import json
+import math
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Generator, Iterable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Number of allocation sites reported when tracing memory
+TOP_ALLOCATIONS = 10
+
+
+class Distribution:
+    """Count, minimum, mean and maximum of observed values, such as latencies."""
+
+    __slots__ = ('count', 'total', 'minimum', 'maximum')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Observe a value, ``count`` times."""
+        self.count += count
+        self.total += value * count
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other: 'Distribution', scale: float = 1.0) -> None:
+        """Add the observations of another distribution, multiplied by ``scale``."""
+        if other.count:
+            self.count += other.count
+            self.total += other.total * scale
+            self.minimum = min(self.minimum, other.minimum * scale)
+            self.maximum = max(self.maximum, other.maximum * scale)
+
+    @property
+    def mean(self) -> float:
+        """Mean of the observed values (0 when there are none)."""
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        """Plain, JSON-compatible view of the distribution."""
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "min": self.minimum, "mean": self.mean, "max": self.maximum}
+
+
+class Metrics:
+    """Collects wall/CPU time per stage, named counters and distributions.
+
+    Stage times are exclusive: time spent in a stage nested inside another
+    is charged to the inner stage only, so the stages of a generator
+    pipeline add up to the total. Use as a context manager around the whole
+    run to record the total time and, if enabled, to profile the run with
+    cProfile (dumped to ``profile_path``) or trace allocations with
+    tracemalloc (``trace_memory``).
+    """
+
+    def __init__(self, profile_path: Optional[str] = None, trace_memory: bool = False):
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.counters: Dict[str, int] = {}
+        self.distributions: Dict[str, Distribution] = {}
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.total: Dict[str, float] = {}
+        self.memory: Dict[str, object] = {}
+        self._stack = []
+        self._start = None
+        self._profiler = None
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float, count: int = 1) -> None:
+        """Add a value to a distribution, ``count`` times."""
+        self.distribution(name).add(value, count)
+
+    def distribution(self, name: str) -> Distribution:
+        """A named distribution, created empty on first use."""
+        distribution = self.distributions.get(name)
+        if distribution is None:
+            distribution = self.distributions[name] = Distribution()
+        return distribution
+
+    def add_time(self, name: str, wall: float, cpu: float) -> None:
+        """Charge wall and CPU seconds to a stage."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0}
+        stage["wall_seconds"] += wall
+        stage["cpu_seconds"] += cpu
+        stage["calls"] += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        """Time the enclosed block as part of a stage."""
+        frame = [time.perf_counter(), time.process_time(), 0.0, 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            wall = time.perf_counter() - frame[0]
+            cpu = time.process_time() - frame[1]
+            self.add_time(name, wall - frame[2], cpu - frame[3])
+            if self._stack:
+                parent = self._stack[-1]
+                parent[2] += wall
+                parent[3] += cpu
+
+    def timed(self, name: str, iterable: Iterable[T]) -> Generator[T, None, None]:
+        """Yield from an iterable, charging the time spent producing each item to a stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def __enter__(self) -> 'Metrics':
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._start = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.total = {
+            "wall_seconds": time.perf_counter() - self._start[0],
+            "cpu_seconds": time.process_time() - self._start[1],
+        }
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATIONS]
+            tracemalloc.stop()
+            self.memory = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top_allocations": [
+                    {"location": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+                    for stat in top
+                ],
+            }
+
+    def to_dict(self) -> dict:
+        """Plain, JSON-compatible view of the collected metrics."""
+        data = {"total": self.total, "stages": self.stages, "counters": self.counters}
+        if self.distributions:
+            data["distributions"] = {name: d.to_dict() for name, d in self.distributions.items()}
+        if self.memory:
+            data["memory"] = self.memory
+        return data
+
+    def write(self, path: str) -> None:
+        """Write the metrics to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
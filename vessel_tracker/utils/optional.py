@@ -0,0 +1,55 @@
+"""Optional accelerator modules, imported on first use.
+
+``np = optional_module('numpy')`` keeps the usual ``np is None`` test for a
+missing dependency, while an installed one is only imported when one of its
+attributes is first used, so runs that never reach numpy code do not pay
+for importing it. ``worth_using`` keeps small inputs in pure Python, where
+importing numpy (about 0.1 s) would cost more than it saves.
+"""
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Optional
+
+# Rows of work below which an accelerator is only used if already imported
+SMALL_INPUT_ROWS = 20_000
+
+
+class LazyModule(ModuleType):
+    """Stand-in for a module that imports it when an attribute is first looked up.
+
+    The module's namespace is then copied onto the stand-in, so later
+    lookups cost the same as on the module itself.
+    """
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def optional_module(name: str) -> Optional[ModuleType]:
+    """A lazily imported module, or None when it isn't installed."""
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        found = importlib.util.find_spec(name) is not None
+    except ValueError:
+        found = False
+    return LazyModule(name) if found else None
+
+
+def is_loaded(name: str) -> bool:
+    """Whether a module has already been imported, making further use of it free."""
+    return name in sys.modules
+
+
+def worth_using(module: Optional[ModuleType], rows: int) -> bool:
+    """Whether to hand ``rows`` rows of work to an optional module.
+
+    True when it is installed and either already imported or the work is
+    at least SMALL_INPUT_ROWS rows. Callers produce the same results
+    either way.
+    """
+    return module is not None and (rows >= SMALL_INPUT_ROWS or is_loaded(module.__name__))
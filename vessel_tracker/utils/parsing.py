@@ -1,22 +1,169 @@
-from typing import Dict, Union
-from ..models.position import Position
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from ..models.position import MMSI_TABLE, Position, intern_mmsi
+from .filters import PositionFilter
 
 POSITION_MESSAGE_TYPES = {1, 2, 3, 18, 19, 27}
 
-def parse_position_message(message: Dict) -> Union[Position, None]:
-    """Parse AIS message and return Position if it's a position report."""
-    msg_data = message.get('Message', {})
-    msg_id = msg_data.get('MessageID')
+DECODER_BACKENDS = ('auto', 'orjson', 'simdjson', 'json')
 
-    if msg_id not in POSITION_MESSAGE_TYPES:
+# Matches an unambiguous integer MessageID, e.g. `"MessageID": 5,`
+_MESSAGE_ID_PATTERN = re.compile(rb'"MessageID"\s*:\s*(\d+)\s*[,}]')
+_MESSAGE_ID_KEY = b'"MessageID"'
+
+
+def _load_backend(name: str) -> Callable[[Union[bytes, str]], Any]:
+    """Import a JSON backend and return its loads function."""
+    if name == 'orjson':
+        import orjson
+        return orjson.loads
+    if name == 'simdjson':
+        import simdjson
+        return simdjson.loads
+    if name == 'json':
+        return json.loads
+    raise ValueError(f"Unknown decoder backend: {name}")
+
+
+def resolve_backend(name: str = 'auto') -> str:
+    """Resolve 'auto' to the fastest installed JSON backend."""
+    if name != 'auto':
+        return name
+    for candidate in ('orjson', 'simdjson'):
+        try:
+            _load_backend(candidate)
+            return candidate
+        except ImportError:
+            continue
+    return 'json'
+
+
+def is_position_candidate(line: bytes) -> bool:
+    """Cheap bytes-level check whether a line may hold a position report.
+
+    Returns False only when the line has exactly one integer MessageID that
+    is not a position type. Anything unusual is left to the full decode.
+    """
+    match = _MESSAGE_ID_PATTERN.search(line)
+    if match is None or line.find(_MESSAGE_ID_KEY, match.end()) != -1:
+        return True
+    return int(match.group(1)) in POSITION_MESSAGE_TYPES
+
+
+class Decoder:
+    """Decodes raw AIS lines using a pluggable JSON backend.
+
+    ``backend`` is one of DECODER_BACKENDS; 'auto' picks orjson or simdjson
+    when installed and falls back to the standard library. With ``prefilter``
+    enabled, lines whose MessageID is not a position type are skipped before
+    any JSON decoding.
+
+    A ``position_filter`` drops positions outside its time window, fleet or
+    area, rejecting lines on their raw bytes where it can.
+
+    Rejected lines are counted in ``non_position`` (not a position report),
+    ``invalid`` (a position report with missing or malformed fields) and
+    ``filtered`` (rejected by the position filter).
+    """
+
+    def __init__(self, backend: str = 'auto', prefilter: bool = True,
+                 position_filter: Optional[PositionFilter] = None):
+        self.backend = resolve_backend(backend)
+        self.loads = _load_backend(self.backend)
+        self.prefilter = prefilter
+        self.position_filter = position_filter
+        self.non_position = 0
+        self.invalid = 0
+        self.filtered = 0
+
+    def __getstate__(self):
+        return self.backend, self.prefilter, self.position_filter
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def parse_fields(self, line: Union[bytes, str]) -> Union[Tuple[float, float, int, str], None]:
+        """Parse a raw line into (lat, lon, timestamp, mmsi), or None if it isn't a valid position.
+
+        Raises ValueError if the line is not valid JSON.
+        """
+        if self.prefilter and isinstance(line, bytes) and not is_position_candidate(line):
+            self.non_position += 1
+            return None
+        position_filter = self.position_filter
+        if position_filter is not None and position_filter.has_prefilter and \
+                not position_filter.prefilter(line):
+            self.filtered += 1
+            return None
+        message = self.loads(line)
+        msg_data = message.get('Message') if isinstance(message, dict) else None
+        if not isinstance(msg_data, dict) or msg_data.get('MessageID') not in POSITION_MESSAGE_TYPES:
+            self.non_position += 1
+            return None
+        fields = parse_position_fields(message)
+        if fields is None:
+            self.invalid += 1
+        elif position_filter is not None and not position_filter.accepts(*fields):
+            self.filtered += 1
+            return None
+        return fields
+
+    def parse_line(self, line: Union[bytes, str]) -> Union[Position, None]:
+        """Parse a raw line into a Position, or None if it isn't a valid position.
+
+        Raises ValueError if the line is not valid JSON.
+        """
+        fields = self.parse_fields(line)
+        if fields is None:
+            return None
+        lat, lon, timestamp, mmsi = fields
+        return Position(lat=lat, lon=lon, timestamp=timestamp, mmsi=mmsi)
+
+
+@lru_cache(maxsize=None)
+def get_decoder(backend: str = 'auto', prefilter: bool = True) -> Decoder:
+    """Return a shared Decoder for the given settings."""
+    return Decoder(backend, prefilter)
+
+
+def resolve_decoder(decoder: Union[str, Decoder]) -> Decoder:
+    """Return the given Decoder, or the shared one for a backend name."""
+    if isinstance(decoder, Decoder):
+        return decoder
+    return get_decoder(decoder)
+
+
+def parse_position_fields(message: Dict) -> Union[Tuple[float, float, int, str], None]:
+    """Parse AIS message and return (lat, lon, timestamp, mmsi) if it's a position report.
+
+    The MMSI is the interned text of the message's UserID (see
+    ``models.position.intern_mmsi``), so repeated reports from a vessel
+    share one string rather than each allocating its own.
+    """
+    msg_data = message.get('Message')
+    if not isinstance(msg_data, dict) or msg_data.get('MessageID') not in POSITION_MESSAGE_TYPES:
         return None
 
     try:
-        return Position(
-            lat=float(msg_data['Latitude']),
-            lon=float(msg_data['Longitude']),
-            timestamp=int(message['UTCTimeStamp']),
-            mmsi=str(msg_data['UserID'])
+        return (
+            float(msg_data['Latitude']),
+            float(msg_data['Longitude']),
+            int(message['UTCTimeStamp']),
+            MMSI_TABLE[intern_mmsi(msg_data['UserID'])]
         )
-    except (KeyError, ValueError):
-        return None
\ No newline at end of file
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def parse_position_message(message: Dict,
+                           position_filter: Optional[PositionFilter] = None) -> Union[Position, None]:
+    """Parse AIS message and return Position if it's a position report passing the filter."""
+    fields = parse_position_fields(message)
+    if fields is None:
+        return None
+    if position_filter is not None and not position_filter.accepts(*fields):
+        return None
+    lat, lon, timestamp, mmsi = fields
+    return Position(lat=lat, lon=lon, timestamp=timestamp, mmsi=mmsi)
@@ -1,3 +1,4 @@
+"""Progress bar settings and status messages, silenced together by quiet mode."""
 from typing import Dict, Any
 
 def get_progress_bar_settings(desc: str, unit: str, color: str) -> Dict[str, Any]:
@@ -21,10 +22,67 @@ MESSAGE_PROCESSOR = {
     **get_progress_bar_settings("Processing messages", " msgs", "green")
 }
 
+MESSAGE_BYTES = {
+    **get_progress_bar_settings("Processing messages", "B", "green"),
+    "unit_divisor": 1024
+}
+
 VESSEL_ANALYZER = {
     **get_progress_bar_settings("Analyzing vessels", " vessels", "blue")
 }
 
 GEOJSON_CREATOR = {
     **get_progress_bar_settings("Creating GeoJSON features", " features", "magenta")
-}
\ No newline at end of file
+}
+
+STOP_WRITER = {
+    **get_progress_bar_settings("Writing stops", " stops", "magenta")
+}
+
+PARTITION_ANALYZER = {
+    **get_progress_bar_settings("Analyzing partitions", " partitions", "blue"),
+    "unit_scale": False
+}
+
+PROGRESS_BARS = (MESSAGE_COUNTER, MESSAGE_PROCESSOR, MESSAGE_BYTES, VESSEL_ANALYZER,
+                 GEOJSON_CREATOR, STOP_WRITER, PARTITION_ANALYZER)
+
+_quiet = False
+
+
+def set_quiet(quiet: bool) -> None:
+    """Switch progress bars and status messages off (or back on)."""
+    global _quiet
+    _quiet = quiet
+    for settings in PROGRESS_BARS:
+        settings["disable"] = quiet
+
+
+class NullProgressBar:
+    """Stands in for a disabled progress bar, so quiet runs never import tqdm."""
+
+    def update(self, n: int = 1) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'NullProgressBar':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def progress_bar(**settings: Any):
+    """A tqdm progress bar with the given settings; tqdm is imported only when the bar is shown."""
+    if settings.get("disable"):
+        return NullProgressBar()
+    from tqdm import tqdm
+    return tqdm(**settings)
+
+
+def status(message: str) -> None:
+    """Print a status message unless quiet mode is on."""
+    if not _quiet:
+        print(message)
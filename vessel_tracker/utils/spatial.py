@@ -0,0 +1,233 @@
+"""Polygon regions and a grid index for fast point-in-region tests."""
+import json
+import math
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .optional import optional_module, worth_using
+
+np = optional_module('numpy')
+
+Ring = List[Tuple[float, float]]
+
+# Default grid cell size in degrees
+DEFAULT_CELL_SIZE = 1.0
+# Smallest cell size picked for a set of polygons, in degrees
+MIN_CELL_SIZE = 0.001
+# Points in a grid cell from which locate_many tests them together with numpy
+VECTOR_CELL_POINTS = 32
+
+
+def point_in_ring(lon: float, lat: float, ring: Sequence[Tuple[float, float]]) -> bool:
+    """Even-odd ray casting test of a point against a closed ring of (lon, lat) pairs."""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def points_in_ring(lon, lat, ring: Sequence[Tuple[float, float]]):
+    """Vectorized ``point_in_ring`` over numpy arrays of points; same arithmetic, same answers."""
+    inside = np.zeros(len(lon), dtype=bool)
+    x1, y1 = ring[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for x2, y2 in ring:
+            if y1 != y2:
+                inside ^= ((y1 > lat) != (y2 > lat)) & (lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1)
+            x1, y1 = x2, y2
+    return inside
+
+
+def ring_area(ring: Sequence[Tuple[float, float]]) -> float:
+    """Unsigned planar area of a ring in square degrees (shoelace formula)."""
+    x1, y1 = ring[-1]
+    total = 0.0
+    for x2, y2 in ring:
+        total += x1 * y2 - x2 * y1
+        x1, y1 = x2, y2
+    return abs(total) / 2
+
+
+class Polygon:
+    """A polygon with optional holes, in GeoJSON (lon, lat) order.
+
+    ``properties`` holds the properties of the GeoJSON feature it came from.
+    """
+
+    __slots__ = ('exterior', 'holes', 'bbox', 'properties')
+
+    def __init__(self, exterior: Ring, holes: Iterable[Ring] = (), properties: Optional[dict] = None):
+        self.exterior = exterior
+        self.holes = list(holes)
+        lons = [x for x, _ in exterior]
+        lats = [y for _, y in exterior]
+        self.bbox = (min(lons), min(lats), max(lons), max(lats))
+        self.properties = properties or {}
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Whether a point lies inside the polygon and outside its holes."""
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+            return False
+        if not point_in_ring(lon, lat, self.exterior):
+            return False
+        return not any(point_in_ring(lon, lat, hole) for hole in self.holes)
+
+    def contains_many(self, lat, lon):
+        """Boolean numpy array of which points (numpy arrays) lie inside the polygon."""
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        inside = (min_lon <= lon) & (lon <= max_lon) & (min_lat <= lat) & (lat <= max_lat)
+        rows = np.flatnonzero(inside)
+        if len(rows):
+            lat, lon = lat[rows], lon[rows]
+            hit = points_in_ring(lon, lat, self.exterior)
+            for hole in self.holes:
+                hit &= ~points_in_ring(lon, lat, hole)
+            inside[rows] = hit
+        return inside
+
+    @property
+    def area(self) -> float:
+        """Planar area in square degrees, holes excluded."""
+        return ring_area(self.exterior) - sum(ring_area(hole) for hole in self.holes)
+
+
+def polygons_from_geojson(data: dict) -> List[Polygon]:
+    """Extract Polygon and MultiPolygon geometries from GeoJSON data.
+
+    Accepts a FeatureCollection, a Feature or a bare geometry. Each part of a
+    MultiPolygon becomes its own Polygon sharing the feature's properties.
+    """
+    if data.get("type") == "FeatureCollection":
+        features = data.get("features", [])
+    elif data.get("type") == "Feature":
+        features = [data]
+    else:
+        features = [{"type": "Feature", "geometry": data, "properties": {}}]
+
+    polygons = []
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        if geometry.get("type") == "Polygon":
+            parts = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            parts = geometry["coordinates"]
+        else:
+            continue
+        for rings in parts:
+            exterior, *holes = [[(float(x), float(y)) for x, y, *_ in ring] for ring in rings]
+            polygons.append(Polygon(exterior, holes, properties))
+    return polygons
+
+
+def load_polygons(path: str) -> List[Polygon]:
+    """Load the polygons of a GeoJSON file."""
+    with open(path) as f:
+        return polygons_from_geojson(json.load(f))
+
+
+def suggest_cell_size(polygons: Sequence[Polygon]) -> float:
+    """Grid cell size for a set of polygons: the median extent of their bounding boxes.
+
+    Each polygon then spans a few cells and each cell holds a few
+    polygons, however many polygons there are.
+    """
+    if not polygons:
+        return DEFAULT_CELL_SIZE
+    extents = sorted(max(max_lon - min_lon, max_lat - min_lat)
+                     for min_lon, min_lat, max_lon, max_lat in (p.bbox for p in polygons))
+    return max(extents[len(extents) // 2], MIN_CELL_SIZE)
+
+
+class GridIndex:
+    """Regular lat/lon grid mapping each cell to the polygons whose bounding box overlaps it.
+
+    A lookup only tests the few polygons registered in the point's cell, so
+    many-polygon regions cost about as much as a single polygon. A
+    ``cell_size`` of None picks one from the polygons (``suggest_cell_size``).
+    """
+
+    def __init__(self, polygons: List[Polygon], cell_size: Optional[float] = DEFAULT_CELL_SIZE):
+        self.polygons = polygons
+        self.cell_size = cell_size if cell_size is not None else suggest_cell_size(polygons)
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, polygon in enumerate(polygons):
+            min_lon, min_lat, max_lon, max_lat = polygon.bbox
+            for cx in range(self._cell(min_lon), self._cell(max_lon) + 1):
+                for cy in range(self._cell(min_lat), self._cell(max_lat) + 1):
+                    self.cells[(cx, cy)].append(i)
+        self.cells = dict(self.cells)
+
+    @classmethod
+    def from_file(cls, path: str, cell_size: Optional[float] = DEFAULT_CELL_SIZE) -> 'GridIndex':
+        """Build an index over the polygons of a GeoJSON file."""
+        return cls(load_polygons(path), cell_size)
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def locate(self, lat: float, lon: float) -> int:
+        """Index of the first polygon containing the point, or -1."""
+        candidates = self.cells.get((self._cell(lon), self._cell(lat)))
+        if candidates:
+            polygons = self.polygons
+            for i in candidates:
+                if polygons[i].contains(lat, lon):
+                    return i
+        return -1
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Whether any polygon contains the point."""
+        return self.locate(lat, lon) >= 0
+
+    def locate_many(self, lat: Sequence[float], lon: Sequence[float]) -> array:
+        """``locate`` for many points at once, as an array('i') of polygon indexes or -1.
+
+        With numpy, cells holding many points (such as a busy port) have
+        each candidate polygon tested against all their points together;
+        the others are looked up one point at a time.
+        """
+        if len(lat) < VECTOR_CELL_POINTS or not worth_using(np, len(lat)):
+            return array('i', (self.locate(y, x) for y, x in zip(lat, lon)))
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        result = np.full(len(lat), -1, dtype=np.int32)
+        lat_list, lon_list = lat.tolist(), lon.tolist()
+        cx = np.floor(lon / self.cell_size)
+        cy = np.floor(lat / self.cell_size)
+        finite = np.flatnonzero(np.isfinite(cx) & np.isfinite(cy))
+        # One int64 key per cell: column in the high half, row in the low half
+        keys = (cx[finite].astype(np.int64) << 32) + (cy[finite].astype(np.int64) & 0xFFFFFFFF)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        order = finite[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        bounds = np.concatenate([[0], bounds, [len(keys)]])
+        for cell, key in enumerate(keys[bounds[:-1]].tolist()):
+            x, y = key >> 32, key & 0xFFFFFFFF
+            candidates = self.cells.get((x, y - (1 << 32) if y >= 1 << 31 else y))
+            if not candidates:
+                continue
+            rows = order[bounds[cell]:bounds[cell + 1]]
+            if len(rows) < VECTOR_CELL_POINTS:
+                polygons = self.polygons
+                for row in rows.tolist():
+                    point_lat, point_lon = lat_list[row], lon_list[row]
+                    for i in candidates:
+                        if polygons[i].contains(point_lat, point_lon):
+                            result[row] = i
+                            break
+                continue
+            for i in candidates:
+                hit = self.polygons[i].contains_many(lat[rows], lon[rows])
+                if hit.any():
+                    result[rows[hit]] = i
+                    rows = rows[~hit]
+                    if not len(rows):
+                        break
+        return array('i', result.tobytes())